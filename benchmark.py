@@ -0,0 +1,183 @@
+"""Load test for the story API with N concurrent simulated players.
+
+Each player starts a story and keeps picking one of the offered choices
+until the story ends or `--turns` continues were made. Run it against a
+server backed by mock_gemini.py for repeatable numbers:
+
+    python mock_gemini.py --latency lognormal --latency-mean 0.8 &
+    GEMINI_API_URL=http://127.0.0.1:9099/v1beta/models/mock:generateContent python main.py &
+    python benchmark.py --players 50 --turns 5 --output bench/results.json
+
+Latency percentiles, throughput and session-store write amplification (from
+the `/health` counters) are printed and written to a JSON file.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values), max(1, math.ceil(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int) -> Dict[str, Any]:
+    values = sorted(latencies)
+    return {
+        "count": len(values) + errors,
+        "errors": errors,
+        "p50_ms": round(percentile(values, 50) * 1000, 1) if values else None,
+        "p95_ms": round(percentile(values, 95) * 1000, 1) if values else None,
+        "p99_ms": round(percentile(values, 99) * 1000, 1) if values else None,
+        "mean_ms": round(sum(values) / len(values) * 1000, 1) if values else None,
+        "max_ms": round(values[-1] * 1000, 1) if values else None,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Benchmark:
+    """Collects per-endpoint latencies while the simulated players run"""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.latencies: Dict[str, List[float]] = {"start": [], "continue": []}
+        self.errors: Dict[str, int] = {"start": 0, "continue": 0}
+        self.status_codes: Dict[str, int] = {}
+        self.response_bytes = 0
+
+    async def request(self, endpoint: str, path: str, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(path, json=body)
+        except httpx.HTTPError as e:
+            self.errors[endpoint] += 1
+            self.status_codes[type(e).__name__] = self.status_codes.get(type(e).__name__, 0) + 1
+            return None
+        elapsed = time.perf_counter() - started
+        self.status_codes[str(response.status_code)] = self.status_codes.get(str(response.status_code), 0) + 1
+        if response.status_code != 200:
+            self.errors[endpoint] += 1
+            return None
+        self.latencies[endpoint].append(elapsed)
+        self.response_bytes += len(response.content)
+        return response.json()
+
+    async def player(self, index: int):
+        await asyncio.sleep(self.args.ramp * index / max(1, self.args.players))
+        node = await self.request("start", "/stories/start", {
+            "story_name": self.args.story,
+            "max_choices": self.args.max_choices,
+        })
+        session_id = node.get("session_id") if node else None
+        for _ in range(self.args.turns):
+            if not node or not node.get("choices"):
+                return
+            if self.args.think_time:
+                await asyncio.sleep(self.rng.uniform(0, self.args.think_time))
+            node = await self.request("continue", "/stories/continue", {
+                "story_name": self.args.story,
+                "session_id": session_id,
+                "choice_text": self.rng.choice(node["choices"]),
+            })
+
+    async def health(self) -> Dict[str, Any]:
+        response = await self.client.get("/health")
+        return response.json()
+
+    async def run(self) -> Dict[str, Any]:
+        before = (await self.health()).get("session_store") or {}
+        started = time.perf_counter()
+        await asyncio.gather(*(self.player(i) for i in range(self.args.players)))
+        duration = time.perf_counter() - started
+        health = await self.health()
+        after = health.get("session_store") or {}
+
+        # Write amplification: bytes the session store wrote per byte of story returned to players
+        store = {key: after.get(key, 0) - before.get(key, 0) for key in ("commits", "rows_written", "bytes_written")}
+        successful = sum(len(values) for values in self.latencies.values())
+        store["rows_per_request"] = round(store["rows_written"] / successful, 3) if successful else None
+        store["commits_per_request"] = round(store["commits"] / successful, 3) if successful else None
+        store["write_amplification"] = round(store["bytes_written"] / self.response_bytes, 3) if self.response_bytes else None
+
+        total = successful + sum(self.errors.values())
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "git_revision": git_revision(),
+            "config": {key: value for key, value in vars(self.args).items() if key != "output"},
+            "duration_s": round(duration, 3),
+            "requests": total,
+            "requests_per_s": round(total / duration, 2) if duration else None,
+            "endpoints": {
+                endpoint: summarize(self.latencies[endpoint], self.errors[endpoint]) for endpoint in self.latencies
+            },
+            "status_codes": self.status_codes,
+            "session_store": store,
+            "upstream": (health.get("checks") or {}).get("upstream"),
+        }
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.players, max_keepalive_connections=args.players)
+    timeout = httpx.Timeout(args.timeout)
+    if args.in_process:
+        # Drive the ASGI app directly (uses this process's environment for GEMINI_API_URL etc.)
+        import main as server
+
+        async with server.lifespan(server.app):
+            async with httpx.AsyncClient(app=server.app, base_url="http://benchmark", timeout=timeout) as client:
+                return await Benchmark(client, args).run()
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits) as client:
+        return await Benchmark(client, args).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark /stories/start and /stories/continue")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--in-process", action="store_true", help="Run main.app in this process instead of over HTTP")
+    parser.add_argument("--players", type=int, default=20, help="Concurrent simulated players")
+    parser.add_argument("--turns", type=int, default=5, help="Continues per player after the start")
+    parser.add_argument("--story", default="koroghlu")
+    parser.add_argument("--max-choices", type=int, default=10)
+    parser.add_argument("--ramp", type=float, default=0.0, help="Seconds over which players join")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Max random pause between turns (seconds)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=os.path.join("bench", f"results-{datetime.now():%Y%m%d-%H%M%S}.json"))
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{results['requests']} requests in {results['duration_s']}s ({results['requests_per_s']} req/s)")
+    for endpoint, summary in results["endpoints"].items():
+        print(f"  {endpoint:9} n={summary['count']:<5} errors={summary['errors']:<4} "
+              f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms")
+    store = results["session_store"]
+    print(f"  session store: {store['commits']} commits, {store['rows_written']} rows, "
+          f"{store['bytes_written']} bytes (write amplification {store['write_amplification']})")
+    print(f"Results written to {args.output}")
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+import httpx
+
+from gemini_client import GeminiClient
+
+# Statuses Gemini returns for a missing, expired or unusable cachedContent
+CACHE_REJECTED_STATUSES = (400, 403, 404)
+
+
+class _Prefix:
+    def __init__(self, key: str, text: str):
+        self.key = key
+        self.text = text
+        self.name: Optional[str] = None
+        self.expires_at = 0.0
+        self.failed_until = 0.0
+        self.lock = asyncio.Lock()
+        self.refreshing: Optional[asyncio.Task] = None
+
+
+class ContextCache:
+    """Serves registered static prompt prefixes from Gemini cachedContents.
+
+    A story's static context (instructions plus story text) is registered
+    once per key with `register`. `resolve(prompt)` swaps a registered
+    prefix for its cachedContents handle, creating it on first use and
+    extending its TTL in the background shortly before it expires. When
+    caching is unavailable (creation fails, the prefix is too small for the
+    model, the handle is rejected) prompts are sent inline and creation is
+    retried after `failure_backoff` seconds.
+    """
+
+    def __init__(self, client: GeminiClient, ttl: float = 3600, refresh_margin: float = 300,
+                 failure_backoff: float = 600, enabled: bool = True):
+        self.client = client
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.failure_backoff = failure_backoff
+        self.enabled = enabled
+        self._prefixes: Dict[str, _Prefix] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.cached = 0
+        self.inline = 0
+        self.created = 0
+        self.refreshed = 0
+        self.rejected = 0
+        self.failures = 0
+
+    def register(self, key: str, text: str):
+        """Declare the static prefix for `key`; a changed prefix replaces (and deletes) the old handle"""
+        current = self._prefixes.get(key)
+        if current is not None and current.text == text:
+            return
+        self._prefixes[key] = _Prefix(key, text)
+        if current is not None and current.name:
+            self._spawn(self._delete(current.name))
+
+    def usable(self, key: str) -> bool:
+        """False while caching is off or `key` is backing off, so callers can build compact inline prompts"""
+        if not self.enabled or not self.client.configured:
+            return False
+        prefix = self._prefixes.get(key)
+        return prefix is None or bool(prefix.name) or time.monotonic() >= prefix.failed_until
+
+    async def resolve(self, prompt: str) -> Tuple[Optional[str], str]:
+        """Return (cachedContent name, remaining prompt), or (None, prompt) to send it inline"""
+        prefix = self._match(prompt)
+        name = await self._handle(prefix) if prefix is not None else None
+        if name is None:
+            self.inline += 1
+            return None, prompt
+        self.cached += 1
+        return name, prompt[len(prefix.text):]
+
+    def rejected_handle(self, name: Optional[str], error: Exception) -> bool:
+        """True if `error` means the cachedContent `name` is unusable; the prefix then goes inline for a while"""
+        if name is None or not isinstance(error, httpx.HTTPStatusError):
+            return False
+        if error.response.status_code not in CACHE_REJECTED_STATUSES:
+            return False
+        for prefix in self._prefixes.values():
+            if prefix.name == name:
+                prefix.name = None
+                prefix.failed_until = time.monotonic() + self.failure_backoff
+        self.rejected += 1
+        return True
+
+    def _match(self, prompt: str) -> Optional[_Prefix]:
+        if not self.enabled or not self.client.configured:
+            return None
+        for prefix in self._prefixes.values():
+            if prompt.startswith(prefix.text):
+                return prefix
+        return None
+
+    async def _handle(self, prefix: _Prefix) -> Optional[str]:
+        now = time.monotonic()
+        if prefix.name and now < prefix.expires_at:
+            if now > prefix.expires_at - self.refresh_margin and prefix.refreshing is None:
+                prefix.refreshing = self._spawn(self._refresh(prefix))
+            return prefix.name
+        if now < prefix.failed_until:
+            return None
+
+        async with prefix.lock:
+            if prefix.name and time.monotonic() < prefix.expires_at:
+                return prefix.name
+            if time.monotonic() < prefix.failed_until:
+                return None
+            try:
+                result = await self.client.create_cached_content(prefix.text, self.ttl)
+            except (httpx.HTTPError, ValueError, KeyError):
+                self.failures += 1
+                prefix.failed_until = time.monotonic() + self.failure_backoff
+                return None
+            prefix.name = result["name"]
+            prefix.expires_at = time.monotonic() + self.ttl
+            self.created += 1
+            return prefix.name
+
+    async def _refresh(self, prefix: _Prefix):
+        try:
+            await self.client.update_cached_content_ttl(prefix.name, self.ttl)
+            prefix.expires_at = time.monotonic() + self.ttl
+            self.refreshed += 1
+        except (httpx.HTTPError, ValueError):
+            # Keep using the handle until it expires; it is recreated on the next use after that
+            self.failures += 1
+        finally:
+            prefix.refreshing = None
+
+    async def _delete(self, name: str):
+        try:
+            await self.client.delete_cached_content(name)
+        except httpx.HTTPError:
+            pass  # Expires on its own
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def aclose(self):
+        """Delete live handles so they stop accruing storage (called on shutdown)"""
+        for task in list(self._tasks):
+            task.cancel()
+        names = [prefix.name for prefix in self._prefixes.values() if prefix.name]
+        await asyncio.gather(*(self._delete(name) for name in names))
+        for prefix in self._prefixes.values():
+            prefix.name = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.cached + self.inline
+        return {
+            "enabled": self.enabled,
+            "handles": sum(1 for prefix in self._prefixes.values() if prefix.name),
+            "cached": self.cached,
+            "inline": self.inline,
+            "created": self.created,
+            "refreshed": self.refreshed,
+            "rejected": self.rejected,
+            "failures": self.failures,
+            "hit_rate": round(self.cached / lookups, 3) if lookups else None,
+        }
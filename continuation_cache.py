@@ -0,0 +1,85 @@
+import copy
+import hashlib
+import json
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+class ContinuationCache:
+    """Content-addressed cache of generated continuations.
+
+    Entries are keyed by a hash of the normalized story path (story,
+    max_choices, choices_made, previous node text, choice) so every player
+    taking the same branch is served the same node without an LLM call.
+    Eviction is LRU within `max_entries`/`max_bytes`, entries expire after
+    `ttl`, and `freshness_ratio` turns that fraction of hits into misses so
+    popular branches keep getting new variants.
+    """
+
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 64 * 1024 * 1024, ttl: float = 21600,
+                 freshness_ratio: float = 0.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.freshness_ratio = freshness_ratio
+        # key -> (stored at, size in bytes, node)
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.fresh_misses = 0
+        self.evicted = 0
+
+    @staticmethod
+    def make_key(story_name: str, max_choices: int, choices_made: int, node_text: str, choice_text: str) -> str:
+        path = [_normalize(story_name), max_choices, choices_made, _normalize(node_text), _normalize(choice_text)]
+        return hashlib.sha256(json.dumps(path, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        if self.freshness_ratio and random.random() < self.freshness_ratio:
+            self.fresh_misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[2])
+
+    def put(self, key: str, node: Dict[str, Any]):
+        size = len(json.dumps(node, ensure_ascii=False).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic(), size, copy.deepcopy(node))
+        self.size_bytes += size
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evicted += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.fresh_misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "fresh_misses": self.fresh_misses,
+            "evicted": self.evicted,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+
+class GeminiClient:
+    """Async Gemini client sharing one keep-alive connection pool per process"""
+
+    def __init__(
+        self,
+        api_url: Optional[str],
+        api_key: Optional[str],
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        max_concurrency: int = 32,
+    ):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        # Upstream state for readiness checks
+        self.last_success_at: Optional[float] = None
+        self.last_error_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_failures = 0
+
+    @property
+    def stream_url(self) -> Optional[str]:
+        """streamGenerateContent URL for the configured generateContent endpoint"""
+        if not self.api_url:
+            return None
+        return self.api_url.replace(":generateContent", ":streamGenerateContent")
+
+    @property
+    def api_base(self) -> Optional[str]:
+        """API root (e.g. .../v1beta) that cachedContents live under"""
+        if not self.api_url or "/models/" not in self.api_url:
+            return None
+        return self.api_url.split("/models/")[0]
+
+    @property
+    def model(self) -> Optional[str]:
+        """Resource name of the configured model, e.g. models/gemini-2.0-flash"""
+        if not self.api_url or "/models/" not in self.api_url:
+            return None
+        return "models/" + self.api_url.split("/models/")[1].split(":")[0]
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_url and self.api_key)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of upstream calls currently holding a concurrency slot"""
+        return self.max_concurrency - self._semaphore._value
+
+    def record_success(self):
+        self.last_success_at = time.time()
+        self.consecutive_failures = 0
+
+    def record_failure(self, error: Exception):
+        self.last_error_at = time.time()
+        self.last_error = f"{type(error).__name__}: {error}"
+        self.consecutive_failures += 1
+
+    def get_http_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def generate_content(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a generateContent payload and return the decoded JSON body"""
+        async with self._semaphore:
+            try:
+                response = await self.get_http_client().post(
+                    self.api_url,
+                    params={"key": self.api_key},
+                    json=payload,
+                )
+                response.raise_for_status()
+                result = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                self.record_failure(e)
+                raise
+            self.record_success()
+            return result
+
+    async def stream_generate_content(self, payload: Dict[str, Any]) -> AsyncIterator[str]:
+        """POST to streamGenerateContent (SSE) and yield text chunks as they arrive"""
+        async with self._semaphore:
+            try:
+                async with self.get_http_client().stream(
+                    "POST",
+                    self.stream_url,
+                    params={"key": self.api_key, "alt": "sse"},
+                    json=payload,
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        text = extract_candidate_text(json.loads(line[5:]))
+                        if text:
+                            yield text
+            except (httpx.HTTPError, ValueError) as e:
+                self.record_failure(e)
+                raise
+            self.record_success()
+
+    async def create_cached_content(self, text: str, ttl: float) -> Dict[str, Any]:
+        """Register `text` as a cachedContents prefix for the configured model"""
+        response = await self.get_http_client().post(
+            f"{self.api_base}/cachedContents",
+            params={"key": self.api_key},
+            json={
+                "model": self.model,
+                "contents": [{"role": "user", "parts": [{"text": text}]}],
+                "ttl": f"{int(ttl)}s",
+            },
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def update_cached_content_ttl(self, name: str, ttl: float) -> Dict[str, Any]:
+        response = await self.get_http_client().patch(
+            f"{self.api_base}/{name}",
+            params={"key": self.api_key, "updateMask": "ttl"},
+            json={"ttl": f"{int(ttl)}s"},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def delete_cached_content(self, name: str):
+        response = await self.get_http_client().delete(f"{self.api_base}/{name}", params={"key": self.api_key})
+        response.raise_for_status()
+
+    async def aclose(self):
+        """Close pooled connections (called on application shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def extract_candidate_text(result: Dict[str, Any]) -> Optional[str]:
+    """Return the text of the first candidate in a Gemini response, if any"""
+    candidates = result.get("candidates") or []
+    if candidates:
+        content = candidates[0].get("content") or {}
+        parts = content.get("parts") or []
+        if parts and "text" in parts[0]:
+            return parts[0]["text"]
+    return None
@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class QueueFull(Exception):
+    """The queue is at its depth limit; retry after `retry_after` seconds"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Job queue is full, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, lane: str, run: Callable[[], Awaitable[Dict[str, Any]]]):
+        self.id = uuid.uuid4().hex
+        self.lane = lane
+        self.run = run
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[Dict[str, Any]] = None
+        self.created_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"job_id": self.id, "lane": self.lane, "status": self.status}
+        if self.started_at is not None:
+            data["queued_ms"] = round((self.started_at - self.created_at) * 1000, 1)
+        if self.finished_at is not None:
+            data["run_ms"] = round((self.finished_at - self.started_at) * 1000, 1)
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """Bounded worker pool running story turns as jobs, with priority lanes.
+
+    Lanes are served in the order given (e.g. continues before starts, so
+    players already in a story are not starved by a burst of new ones).
+    Submitting beyond `max_depth` queued jobs raises QueueFull with a
+    Retry-After estimate from recent run times. Finished jobs are kept for
+    `result_ttl` seconds so clients can poll or long-poll for the result.
+    `describe_error` turns an exception into the job's {"status_code", "detail"}.
+    `publish`, if given, stores each state of a job where other processes
+    can read it (queued before its id is handed out, then running, then
+    finished), so any worker can answer a status request.
+    """
+
+    def __init__(self, lanes: Sequence[str] = ("continue", "start"), workers: int = 8, max_depth: int = 100,
+                 result_ttl: float = 300, describe_error: Optional[Callable[[Exception], Dict[str, Any]]] = None,
+                 publish: Optional[Callable[[Job], Awaitable[None]]] = None):
+        self.lanes = {lane: priority for priority, lane in enumerate(lanes)}
+        self.workers = workers
+        self.max_depth = max_depth
+        self.result_ttl = result_ttl
+        self.describe_error = describe_error or (lambda e: {"status_code": 500, "detail": str(e)})
+        self.publish = publish
+        self._queue: "asyncio.PriorityQueue[Tuple[int, int, Job]]" = asyncio.PriorityQueue()
+        self._order = itertools.count()
+        self._jobs: Dict[str, Job] = {}
+        self._workers: List[asyncio.Task] = []
+        self._queued = {lane: 0 for lane in self.lanes}
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.publish_errors = 0
+        self._avg_run = 1.0
+
+    def start(self):
+        """Start the worker tasks (inside the running event loop)"""
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def aclose(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @property
+    def depth(self) -> int:
+        return sum(self._queued.values())
+
+    def retry_after(self) -> float:
+        """Rough seconds until a queue slot frees up"""
+        return max(1.0, self._avg_run * self.depth / max(1, self.workers))
+
+    async def submit(self, lane: str, run: Callable[[], Awaitable[Dict[str, Any]]]) -> Job:
+        """Queue `run` in `lane`, or raise QueueFull"""
+        self._expire()
+        if self.depth >= self.max_depth:
+            self.rejected += 1
+            raise QueueFull(self.retry_after())
+        job = Job(lane, run)
+        if self.publish is not None:
+            await self.publish(job)  # A failure here fails the submission; nobody knows the id yet
+        self._jobs[job.id] = job
+        self._queued[lane] += 1
+        self.submitted += 1
+        self._queue.put_nowait((self.lanes[lane], next(self._order), job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Return the job once finished or after `timeout` seconds (long-poll), None if unknown"""
+        job = self.get(job_id)
+        if job is None or timeout <= 0:
+            return job
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            self._queued[job.lane] -= 1
+            self.running += 1
+            job.status = "running"
+            job.started_at = time.monotonic()
+            await self._publish(job)
+            try:
+                job.result = await job.run()
+                job.status = "done"
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.error = self.describe_error(e)
+                job.status = "failed"
+                self.failed += 1
+            finally:
+                self.running -= 1
+                job.finished_at = time.monotonic()
+                job.run = None  # Release the request captured by the closure
+                self._avg_run = 0.8 * self._avg_run + 0.2 * (job.finished_at - job.started_at)
+                job.done.set()
+            await self._publish(job)
+
+    async def _publish(self, job: Job):
+        if self.publish is None:
+            return
+        try:
+            await self.publish(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The job still runs and is served by this process; other processes see its last published state
+            self.publish_errors += 1
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.result_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_depth": self.max_depth,
+            "queued": dict(self._queued),
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "publish_errors": self.publish_errors,
+            "avg_run_ms": round(self._avg_run * 1000, 1),
+        }
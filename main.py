@@ -1,23 +1,81 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
+from contextlib import asynccontextmanager
+import copy
+import hashlib
 import json
+import logging
 import os
+import socket
 import uuid
-import requests
 import asyncio
-from datetime import datetime
-import aiofiles
+import time
+from datetime import datetime, timedelta
+import httpx
 from dotenv import load_dotenv
 
+from gemini_client import GeminiClient, extract_candidate_text
+from session_codec import SessionRecord, dumps, session_document
+from prompt_budget import PromptBudget, PromptBudgeter, TokenEstimator
+from single_flight import SingleFlight
+from session_store import SessionStore, VersionConflict
+from session_redis import RedisSessionStore
+from session_locks import SessionLocks
+from session_archive import SessionArchive, compact_sessions_sync
+from story_corpus import CachedStory, StoryCorpusCache
+from passage_index import PassageIndex, load_or_build_index
+from story_chapters import StoryChapters, load_chapters
+from story_similarity import StorySimilarity, load_or_build_model
+from story_catalog import StoryCatalog
+from story_parser import IncrementalStoryParser, STORY_RESPONSE_SCHEMA, parse_story_response
+from prefetch import ContinuationPrefetcher
+from opening_pool import OpeningPool, PoolKey
+from context_cache import ContextCache
+from continuation_cache import ContinuationCache
+from job_queue import Job, JobQueue, QueueFull
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, ResilientCaller, RetryBudget
+import metrics
+from metrics import MetricsMiddleware, SIZE_BUCKETS, TOKEN_BUCKETS
+
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, story_manager.story_catalog.scan)
+    background_tasks = [
+        asyncio.create_task(story_manager.run_session_compactor()),
+        asyncio.create_task(story_manager.story_catalog.run(STORY_CATALOG_SCAN_INTERVAL, story_manager.on_stories_changed))
+    ]
+    if JOB_MODE_ENABLED:
+        story_manager.job_queue.start()
+    if OPENING_POOL_ENABLED:
+        story_manager.pin_warm_openings()
+        background_tasks.append(asyncio.create_task(
+            story_manager.opening_pool.run(story_manager.generate_opening, OPENING_POOL_REFILL_INTERVAL)
+        ))
+    yield
+    for task in background_tasks + list(story_manager.summary_tasks.values()):
+        task.cancel()
+    await story_manager.job_queue.aclose()
+    await story_manager.context_cache.aclose()
+    await story_manager.gemini_client.aclose()
+    await story_manager.session_store.aclose()
+    story_manager.session_archive.close()
+
 app = FastAPI(
     title="Interactive Storytelling API",
     description="FastAPI application for interactive storytelling with Gemini AI integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -34,7 +92,173 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_API_URL = os.getenv("GEMINI_API_URL")
 STORIES_DIR = os.getenv("STORIES_DIR", "./stories")
 DATA_DIR = os.getenv("DATA_DIR", "./data")
-PREVIOUS_ANSWERS_FILE = os.path.join(DATA_DIR, "previous_answers.json")
+PREVIOUS_ANSWERS_FILE = os.path.join(DATA_DIR, "previous_answers.json")  # Legacy, imported once
+SESSION_DB_FILE = os.getenv("SESSION_DB_FILE", os.path.join(DATA_DIR, "sessions.db"))
+SESSION_COMMIT_INTERVAL = float(os.getenv("SESSION_COMMIT_INTERVAL", 0.01))  # Group commit window (0 = write through)
+CONTINUE_DEDUPE_WINDOW = float(os.getenv("CONTINUE_DEDUPE_WINDOW", 5))  # Seconds a finished turn is shared with retries
+
+# Session backend shared by worker processes ("sqlite" on one host, "redis" across nodes)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+SESSION_REDIS_PREFIX = os.getenv("SESSION_REDIS_PREFIX", "silkscript:")
+SESSION_REDIS_TTL = float(os.getenv("SESSION_REDIS_TTL", 7 * 24 * 3600))  # Redis sessions expire instead of being archived
+
+# Cold archival of completed/idle sessions (TTLs are measured from updated_at)
+SESSION_ARCHIVE_DIR = os.getenv("SESSION_ARCHIVE_DIR", os.path.join(DATA_DIR, "archive"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", 7 * 24 * 3600))
+SESSION_COMPLETED_TTL = float(os.getenv("SESSION_COMPLETED_TTL", 3600))
+SESSION_COMPACT_INTERVAL = float(os.getenv("SESSION_COMPACT_INTERVAL", 300))
+SESSION_ARCHIVE_SEGMENT_BYTES = int(os.getenv("SESSION_ARCHIVE_SEGMENT_BYTES", 64 * 1024 * 1024))
+
+# Story excerpt sizes used by the prompt builders (upper bounds; the prompt token budget may use less)
+START_EXCERPT_CHARS = 3000
+CONTINUE_EXCERPT_CHARS = int(os.getenv("CONTINUE_CONTEXT_CHARS", 2000))
+
+# Prompt token budget per request: instructions and the choice are always sent, history gets up to
+# PROMPT_HISTORY_SHARE of the rest and the story context what remains. While the upstream p95 latency
+# is above GEMINI_LATENCY_SLO seconds the budget shrinks proportionally, down to PROMPT_MIN_TOKENS.
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", 2500))
+PROMPT_MIN_TOKENS = int(os.getenv("PROMPT_MIN_TOKENS", 1000))
+GEMINI_LATENCY_SLO = float(os.getenv("GEMINI_LATENCY_SLO", 8))
+PROMPT_HISTORY_SHARE = float(os.getenv("PROMPT_HISTORY_SHARE", 0.4))
+PROMPT_HISTORY_MAX_STEPS = int(os.getenv("PROMPT_HISTORY_MAX_STEPS", 3))  # Raw steps without a history summary
+STORY_CACHE_CHECK_INTERVAL = float(os.getenv("STORY_CACHE_CHECK_INTERVAL", 1))
+STORY_CACHE_MAX_ENTRIES = int(os.getenv("STORY_CACHE_MAX_ENTRIES", 32))  # Story texts (and their indexes) kept in memory
+
+# Story catalog: every .txt in STORIES_DIR, with aliases/titles from stories/manifest.json
+STORY_CATALOG_INDEX = os.getenv("STORY_CATALOG_INDEX", os.path.join(DATA_DIR, "story_catalog.json"))
+STORY_CATALOG_SCAN_INTERVAL = float(os.getenv("STORY_CATALOG_SCAN_INTERVAL", 5))
+
+# Passage retrieval for continue prompts
+PASSAGE_INDEX_DIR = os.getenv("PASSAGE_INDEX_DIR", os.path.join(DATA_DIR, "passage_index"))
+PASSAGE_CHUNK_CHARS = int(os.getenv("PASSAGE_CHUNK_CHARS", 800))
+PASSAGE_TOP_K = int(os.getenv("PASSAGE_TOP_K", 4))
+
+# Ending similarity: "local" scores the path against a TF-IDF model of the story file, "gemini" asks the model to rate it
+SIMILARITY_SCORER = os.getenv("SIMILARITY_SCORER", "local").lower()
+SIMILARITY_DIR = os.getenv("SIMILARITY_DIR", os.path.join(DATA_DIR, "similarity"))
+
+# Chapter summaries precomputed offline (python story_chapters.py) and added to prompts
+CHAPTERS_DIR = os.getenv("CHAPTERS_DIR", os.path.join(DATA_DIR, "chapters"))
+CHAPTER_SUMMARIES_ENABLED = os.getenv("CHAPTER_SUMMARIES_ENABLED", "True").lower() == "true"
+
+# Speculative prefetch of continuations for offered choices (trades LLM spend for latency)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "False").lower() == "true"
+PREFETCH_MAX_PER_SESSION = int(os.getenv("PREFETCH_MAX_PER_SESSION", 5))
+PREFETCH_MAX_IN_FLIGHT = int(os.getenv("PREFETCH_MAX_IN_FLIGHT", 10))
+PREFETCH_MAX_ENTRIES = int(os.getenv("PREFETCH_MAX_ENTRIES", 500))
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", 900))
+
+# Pool of pre-generated openings for /stories/start, per story and max_choices bucket
+OPENING_POOL_ENABLED = os.getenv("OPENING_POOL_ENABLED", "False").lower() == "true"
+OPENING_POOL_DEPTH = int(os.getenv("OPENING_POOL_DEPTH", 3))
+OPENING_POOL_MAX_AGE = float(os.getenv("OPENING_POOL_MAX_AGE", 3600))
+OPENING_POOL_IDLE_TTL = float(os.getenv("OPENING_POOL_IDLE_TTL", 1800))
+OPENING_POOL_BUCKETS = [int(b) for b in os.getenv("OPENING_POOL_BUCKETS", "10,15,20,30,40,50").split(",") if b.strip()]
+OPENING_POOL_REFILL_INTERVAL = float(os.getenv("OPENING_POOL_REFILL_INTERVAL", 5))
+OPENING_POOL_CONCURRENCY = int(os.getenv("OPENING_POOL_CONCURRENCY", 2))
+OPENING_POOL_WARM = [k.strip() for k in os.getenv("OPENING_POOL_WARM", "").split(",") if k.strip()]  # e.g. koroghlu:15
+
+# Upstream HTTP client tuning
+GEMINI_CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", 5))
+GEMINI_READ_TIMEOUT = float(os.getenv("GEMINI_READ_TIMEOUT", 30))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", 100))
+GEMINI_MAX_KEEPALIVE = int(os.getenv("GEMINI_MAX_KEEPALIVE", 20))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 32))
+
+# Request schema-constrained JSON output (responseMimeType/responseSchema) instead of free text
+GEMINI_JSON_MODE = os.getenv("GEMINI_JSON_MODE", "False").lower() == "true"
+
+# Upstream resilience: overall deadline, hedging after the recent p95, jittered retries within a budget, circuit breaker
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", 25))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", 3))
+GEMINI_RETRY_BASE_DELAY = float(os.getenv("GEMINI_RETRY_BASE_DELAY", 0.25))
+GEMINI_RETRY_MAX_DELAY = float(os.getenv("GEMINI_RETRY_MAX_DELAY", 4))
+GEMINI_RETRY_BUDGET_RATIO = float(os.getenv("GEMINI_RETRY_BUDGET_RATIO", 0.1))  # Retries+hedges per call
+GEMINI_RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("GEMINI_RETRY_BUDGET_MIN_PER_SECOND", 1))
+GEMINI_HEDGE_ENABLED = os.getenv("GEMINI_HEDGE_ENABLED", "True").lower() == "true"
+GEMINI_HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", 95))
+GEMINI_HEDGE_MIN_DELAY = float(os.getenv("GEMINI_HEDGE_MIN_DELAY", 1))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30))
+
+# Single-flight: concurrent identical prompts (e.g. a class starting the same story) share one Gemini call and its node
+GEMINI_SINGLE_FLIGHT_ENABLED = os.getenv("GEMINI_SINGLE_FLIGHT_ENABLED", "True").lower() == "true"
+GEMINI_SINGLE_FLIGHT_MAX_FAN_OUT = int(os.getenv("GEMINI_SINGLE_FLIGHT_MAX_FAN_OUT", 32))  # Callers per upstream call
+
+# Shared cache of continuations keyed by the normalized story path (popular branches skip the LLM)
+CONTINUATION_CACHE_ENABLED = os.getenv("CONTINUATION_CACHE_ENABLED", "True").lower() == "true"
+CONTINUATION_CACHE_MAX_ENTRIES = int(os.getenv("CONTINUATION_CACHE_MAX_ENTRIES", 5000))
+CONTINUATION_CACHE_MAX_BYTES = int(os.getenv("CONTINUATION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CONTINUATION_CACHE_TTL = float(os.getenv("CONTINUATION_CACHE_TTL", 21600))
+CONTINUATION_CACHE_FRESHNESS = float(os.getenv("CONTINUATION_CACHE_FRESHNESS", 0))  # Fraction of hits regenerated for variety
+
+# Rolling per-session summary of older history; continue prompts use it plus the last few raw steps
+HISTORY_SUMMARY_ENABLED = os.getenv("HISTORY_SUMMARY_ENABLED", "True").lower() == "true"
+HISTORY_RECENT_STEPS = int(os.getenv("HISTORY_RECENT_STEPS", 3))
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", 1200))
+
+# Gemini context caching of each story's static prompt prefix (cachedContents API)
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "False").lower() == "true"
+CONTEXT_CACHE_STORY_CHARS = int(os.getenv("CONTEXT_CACHE_STORY_CHARS", 32000))  # Story text in the cached prefix
+CONTEXT_CACHE_TTL = float(os.getenv("CONTEXT_CACHE_TTL", 3600))
+CONTEXT_CACHE_REFRESH_MARGIN = float(os.getenv("CONTEXT_CACHE_REFRESH_MARGIN", 300))  # Extend TTL this long before expiry
+CONTEXT_CACHE_FAILURE_BACKOFF = float(os.getenv("CONTEXT_CACHE_FAILURE_BACKOFF", 600))
+
+# Job mode: start/continue return a job id (202) and run on a bounded worker pool; continues go first
+JOB_MODE_ENABLED = os.getenv("JOB_MODE_ENABLED", "False").lower() == "true"
+JOB_MODE_DEFAULT = os.getenv("JOB_MODE_DEFAULT", "False").lower() == "true"  # Job mode without ?mode=job
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 8))
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", 100))  # Queued jobs before 429 + Retry-After
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", 300))
+JOB_LONG_POLL_MAX = float(os.getenv("JOB_LONG_POLL_MAX", 30))
+JOB_SHARED_POLL_INTERVAL = float(os.getenv("JOB_SHARED_POLL_INTERVAL", 0.25))  # Long-poll on another worker's job
+
+# WebSocket session channel (/stories/ws/{session_id}): idle connections are closed after this many seconds
+WEBSOCKET_IDLE_TIMEOUT = float(os.getenv("WEBSOCKET_IDLE_TIMEOUT", 900))
+
+# Observability: per-stage timings in Server-Timing headers, readiness thresholds for /health
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "False").lower() == "true"
+UPSTREAM_DEGRADED_AFTER = int(os.getenv("UPSTREAM_DEGRADED_AFTER", 3))  # Consecutive Gemini failures
+HEALTH_STORAGE_TIMEOUT = float(os.getenv("HEALTH_STORAGE_TIMEOUT", 2))
+
+app.add_middleware(MetricsMiddleware, server_timing=SERVER_TIMING_ENABLED)
+
+GEMINI_ERRORS = metrics.registry.counter("gemini_errors_total", "Failed Gemini calls by kind", ("kind",))
+PARSE_FALLBACKS = metrics.registry.counter(
+    "story_parse_fallbacks_total", "Gemini responses that could not be parsed and were returned as raw text"
+)
+PROMPT_CHARS = metrics.registry.histogram(
+    "gemini_prompt_chars", "Prompt size sent to Gemini", ("kind",), buckets=SIZE_BUCKETS
+)
+RESPONSE_CHARS = metrics.registry.histogram(
+    "gemini_response_chars", "Response text size received from Gemini", ("kind",), buckets=SIZE_BUCKETS
+)
+PROMPT_TOKENS = metrics.registry.histogram(
+    "gemini_prompt_tokens", "Estimated prompt tokens per request by section", ("kind", "section"), buckets=TOKEN_BUCKETS
+)
+USAGE_TOKENS = metrics.registry.histogram(
+    "gemini_usage_tokens", "Token counts reported by Gemini per call", ("kind",), buckets=TOKEN_BUCKETS
+)
+WEBSOCKET_TURNS = metrics.registry.counter(
+    "story_websocket_turns_total", "Turns played over session WebSockets by outcome", ("outcome",)
+)
+
+def gemini_error_kind(error: Exception) -> str:
+    """Bounded label for a failed Gemini call"""
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"http_{error.response.status_code}"
+    if isinstance(error, httpx.HTTPError):
+        return "transport"
+    return "invalid_response"
+
+def describe_job_error(error: Exception) -> Dict[str, Any]:
+    """Status code and detail a failed job reports, as the synchronous endpoint would have responded"""
+    if isinstance(error, HTTPException):
+        return {"status_code": error.status_code, "detail": error.detail}
+    return {"status_code": 500, "detail": f"Error running story job: {str(error)}"}
 
 # Pydantic models
 class StartStoryRequest(BaseModel):
@@ -45,6 +269,7 @@ class ContinueStoryRequest(BaseModel):
     story_name: str
     session_id: str
     choice_text: str
+    choices_made: Optional[int] = None  # Turn being answered, as the client last saw the session
 
 class StoryResponse(BaseModel):
     introduction: Optional[str] = None
@@ -60,222 +285,555 @@ class ErrorResponse(BaseModel):
     error: str
     message: str
 
-# Available stories mapping
-AVAILABLE_STORIES = {
-    "koroghlu": "koroghlu.txt",
-    "khoroglu": "koroghlu.txt",  # Alternative spelling
-    "dedegorgud": "dedegorgud.txt",
-    "dede_gorgud": "dedegorgud.txt"  # Alternative spelling
-}
-
 class StoryManager:
     def __init__(self):
         self.ensure_data_directory()
+        self.gemini_client = GeminiClient(
+            GEMINI_API_URL,
+            GEMINI_API_KEY,
+            connect_timeout=GEMINI_CONNECT_TIMEOUT,
+            read_timeout=GEMINI_READ_TIMEOUT,
+            max_connections=GEMINI_MAX_CONNECTIONS,
+            max_keepalive_connections=GEMINI_MAX_KEEPALIVE,
+            max_concurrency=GEMINI_MAX_CONCURRENCY
+        )
+        self.resilience = ResilientCaller(
+            deadline=GEMINI_DEADLINE,
+            max_attempts=GEMINI_MAX_ATTEMPTS,
+            base_backoff=GEMINI_RETRY_BASE_DELAY,
+            max_backoff=GEMINI_RETRY_MAX_DELAY,
+            hedge_enabled=GEMINI_HEDGE_ENABLED,
+            hedge_percentile=GEMINI_HEDGE_PERCENTILE,
+            hedge_min_delay=GEMINI_HEDGE_MIN_DELAY,
+            budget=RetryBudget(GEMINI_RETRY_BUDGET_RATIO, min_per_second=GEMINI_RETRY_BUDGET_MIN_PER_SECOND),
+            breaker=CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        )
+        self.single_flight = SingleFlight(max_fan_out=GEMINI_SINGLE_FLIGHT_MAX_FAN_OUT)
+        self.token_estimator = TokenEstimator()
+        self.prompt_budgeter = PromptBudgeter(
+            self.token_estimator,
+            max_tokens=PROMPT_MAX_TOKENS,
+            min_tokens=PROMPT_MIN_TOKENS,
+            latency_slo=GEMINI_LATENCY_SLO,
+            latency_p95=self.upstream_latency_p95
+        )
+        self.story_cache = StoryCorpusCache(
+            excerpt_lengths=(START_EXCERPT_CHARS, CONTINUE_EXCERPT_CHARS, CONTEXT_CACHE_STORY_CHARS),
+            check_interval=STORY_CACHE_CHECK_INTERVAL,
+            max_entries=STORY_CACHE_MAX_ENTRIES
+        )
+        self.story_catalog = StoryCatalog(STORIES_DIR, STORY_CATALOG_INDEX, CHAPTERS_DIR)
+        self.passage_indexes: Dict[str, PassageIndex] = {}
+        self.story_chapters: Dict[str, StoryChapters] = {}
+        self.similarity_models: Dict[str, StorySimilarity] = {}
+        self.summary_tasks: Dict[str, asyncio.Task] = {}
+        self.session_channels: Dict[str, set] = {}  # session_id -> open SessionChannels holding it resident
+        self.job_queue = JobQueue(
+            lanes=("continue", "start"),
+            workers=JOB_WORKERS,
+            max_depth=JOB_QUEUE_MAX_DEPTH,
+            result_ttl=JOB_RESULT_TTL,
+            describe_error=describe_job_error,
+            publish=self.publish_job
+        )
+        self.continuation_cache = ContinuationCache(
+            max_entries=CONTINUATION_CACHE_MAX_ENTRIES,
+            max_bytes=CONTINUATION_CACHE_MAX_BYTES,
+            ttl=CONTINUATION_CACHE_TTL,
+            freshness_ratio=CONTINUATION_CACHE_FRESHNESS
+        )
+        self.context_cache = ContextCache(
+            self.gemini_client,
+            ttl=CONTEXT_CACHE_TTL,
+            refresh_margin=CONTEXT_CACHE_REFRESH_MARGIN,
+            failure_backoff=CONTEXT_CACHE_FAILURE_BACKOFF,
+            enabled=CONTEXT_CACHE_ENABLED
+        )
+        self.prefetcher = ContinuationPrefetcher(
+            max_per_session=PREFETCH_MAX_PER_SESSION,
+            max_in_flight=PREFETCH_MAX_IN_FLIGHT,
+            max_entries=PREFETCH_MAX_ENTRIES,
+            ttl=PREFETCH_TTL
+        )
+        self.opening_pool = OpeningPool(
+            OPENING_POOL_BUCKETS,
+            target_depth=OPENING_POOL_DEPTH,
+            max_age=OPENING_POOL_MAX_AGE,
+            idle_ttl=OPENING_POOL_IDLE_TTL,
+            max_concurrent_refills=OPENING_POOL_CONCURRENCY
+        )
+        self.register_metrics()
+    
+    def register_metrics(self):
+        """Expose the existing cache/store counters on /metrics"""
+        registry = metrics.registry
+        registry.gauge("gemini_in_flight", "Gemini calls currently holding a concurrency slot",
+                       lambda: self.gemini_client.in_flight)
+        registry.gauge("story_cache_lookups_total", "Story file cache lookups",
+                       lambda: {"hit": self.story_cache.hits, "miss": self.story_cache.misses},
+                       ("result",), metric_type="counter")
+        registry.gauge("prefetch_lookups_total", "Prefetched continuation lookups",
+                       lambda: {"hit": self.prefetcher.hits, "miss": self.prefetcher.misses},
+                       ("result",), metric_type="counter")
+        registry.gauge("opening_pool_lookups_total", "Pre-generated opening lookups",
+                       lambda: {"hit": self.opening_pool.hits, "miss": self.opening_pool.misses},
+                       ("result",), metric_type="counter")
+        registry.gauge("context_cache_requests_total", "Gemini calls sent with a cached prefix or inline",
+                       lambda: {"cached": self.context_cache.cached, "inline": self.context_cache.inline},
+                       ("mode",), metric_type="counter")
+        registry.gauge("gemini_prompt_token_budget", "Prompt token budget currently given to each request",
+                       lambda: self.prompt_budgeter.limit())
+        registry.gauge("gemini_circuit_open", "1 while the Gemini circuit breaker is failing fast",
+                       lambda: int(self.resilience.breaker.state == "open"))
+        registry.gauge("gemini_resilience_events_total", "Retries, hedges and deadline expiries of Gemini calls",
+                       lambda: {"retry": self.resilience.retries, "hedge": self.resilience.hedges,
+                                "hedge_win": self.resilience.hedge_wins,
+                                "deadline": self.resilience.deadlines_exceeded,
+                                "circuit_rejected": self.resilience.breaker.rejected},
+                       ("event",), metric_type="counter")
+        registry.gauge("continuation_cache_lookups_total", "Continuation cache lookups (fresh = hit skipped for variety)",
+                       lambda: {"hit": self.continuation_cache.hits, "miss": self.continuation_cache.misses,
+                                "fresh": self.continuation_cache.fresh_misses},
+                       ("result",), metric_type="counter")
+        registry.gauge("continue_deduplicated_total", "Duplicate continue requests served from a shared turn",
+                       lambda: self.session_locks.deduplicated, metric_type="counter")
+        registry.gauge("gemini_single_flight_total", "Gemini calls started, callers coalesced onto one in flight, "
+                       "and calls started because a flight reached its fan-out limit",
+                       lambda: {"started": self.single_flight.flights, "coalesced": self.single_flight.coalesced,
+                                "overflow": self.single_flight.overflows},
+                       ("result",), metric_type="counter")
+        registry.gauge("job_queue_depth", "Queued story jobs per lane", lambda: dict(self.job_queue.stats()["queued"]), ("lane",))
+        registry.gauge("job_queue_running", "Story jobs currently running", lambda: self.job_queue.running)
+        registry.gauge("job_queue_jobs_total", "Story jobs by outcome",
+                       lambda: {"completed": self.job_queue.completed, "failed": self.job_queue.failed,
+                                "rejected": self.job_queue.rejected},
+                       ("outcome",), metric_type="counter")
+        registry.gauge("story_websocket_connections", "Open session WebSockets",
+                       lambda: sum(len(channels) for channels in self.session_channels.values()))
+        registry.gauge("session_store_writes_total", "Session store write activity",
+                       lambda: dict(self.session_store.stats), ("kind",), metric_type="counter")
     
     def ensure_data_directory(self):
-        """Ensure data directory and files exist"""
+        """Ensure data directory and session store exist"""
         os.makedirs(DATA_DIR, exist_ok=True)
-        if not os.path.exists(PREVIOUS_ANSWERS_FILE):
-            with open(PREVIOUS_ANSWERS_FILE, 'w', encoding='utf-8') as f:
-                json.dump({}, f)
+        if SESSION_BACKEND == "redis":
+            self.session_store = RedisSessionStore(REDIS_URL, prefix=SESSION_REDIS_PREFIX, ttl=SESSION_REDIS_TTL)
+        elif SESSION_BACKEND == "sqlite":
+            self.session_store = SessionStore(SESSION_DB_FILE, commit_interval=SESSION_COMMIT_INTERVAL)
+        else:
+            raise ValueError(f"Unknown SESSION_BACKEND '{SESSION_BACKEND}' (expected 'sqlite' or 'redis')")
+        self.session_locks = SessionLocks(dedupe_window=CONTINUE_DEDUPE_WINDOW)
+        self.session_archive = SessionArchive(SESSION_ARCHIVE_DIR, segment_max_bytes=SESSION_ARCHIVE_SEGMENT_BYTES)
+        # One-shot import of the legacy JSON file into the session store (retried on the next start if it fails)
+        if self.session_store.backend == "sqlite" and self.session_store.get_meta("legacy_import") is None:
+            if os.path.exists(PREVIOUS_ANSWERS_FILE):
+                try:
+                    self.session_store.import_json_file(PREVIOUS_ANSWERS_FILE)
+                except (OSError, json.JSONDecodeError) as e:
+                    logger.error("Could not import legacy sessions from %s, will retry on next start: %s",
+                                 PREVIOUS_ANSWERS_FILE, e)
+                    return
+            self.session_store.set_meta("legacy_import", os.path.abspath(PREVIOUS_ANSWERS_FILE))
+    
+    async def on_stories_changed(self, filenames):
+        """Drop cached text, indexes and chapters of story files the catalog saw change"""
+        for filename in filenames:
+            path = os.path.realpath(os.path.join(STORIES_DIR, filename))
+            self.story_cache.invalidate(path)
+            self.passage_indexes.pop(path, None)
+            self.story_chapters.pop(path, None)
+            self.similarity_models.pop(path, None)
+    
+    def remember(self, cache: Dict[str, Any], path: str, value: Any):
+        """Store a per-story object, dropping the oldest ones beyond STORY_CACHE_MAX_ENTRIES"""
+        cache.pop(path, None)
+        cache[path] = value
+        while len(cache) > STORY_CACHE_MAX_ENTRIES:
+            cache.pop(next(iter(cache)))
+    
+    async def get_chapter_context(self, story: CachedStory, query: str = "", progress: float = 0.0) -> Optional[str]:
+        """Summary and key characters of the chapter relevant to the scene (None without a current artifact)"""
+        if not CHAPTER_SUMMARIES_ENABLED:
+            return None
+        chapters = self.story_chapters.get(story.path)
+        if chapters is None or chapters.source_mtime_ns != story.mtime_ns or chapters.source_size != story.size:
+            # Load the artifact on first use; a missing or stale one is remembered until the story changes
+            loop = asyncio.get_running_loop()
+            chapters = await loop.run_in_executor(None, load_chapters, story.path, CHAPTERS_DIR)
+            if chapters is None:
+                chapters = StoryChapters([], story.mtime_ns, story.size)
+            self.remember(self.story_chapters, story.path, chapters)
+        chapter = chapters.locate(query, progress)
+        if chapter is None:
+            return None
+        return f"""Current episode of the epic (chapter {chapter.index + 1} of {len(chapters)}):
+{chapter.summary}
+Key characters: {", ".join(chapter.characters)}"""
+    
+    async def get_continue_context(self, story: CachedStory, query: str) -> str:
+        """Pick the story passages most relevant to the current scene within the context budget"""
+        index = self.passage_indexes.get(story.path)
+        if index is None or index.source_mtime_ns != story.mtime_ns or index.source_size != story.size:
+            # Story changed on disk (or was never indexed): rebuild off the event loop
+            loop = asyncio.get_running_loop()
+            index = await loop.run_in_executor(
+                None, load_or_build_index, story.path, PASSAGE_INDEX_DIR, PASSAGE_CHUNK_CHARS
+            )
+            self.remember(self.passage_indexes, story.path, index)
+        
+        context = index.context_for(query, CONTINUE_EXCERPT_CHARS, PASSAGE_TOP_K)
+        return context or story.excerpt(CONTINUE_EXCERPT_CHARS)
+    
+    async def score_similarity(self, session_data: Dict[str, Any]) -> Optional[float]:
+        """How closely the session's path (history plus current node) followed the original story, 0-1"""
+        story = await self.get_story(session_data["story_name"])
+        model = self.similarity_models.get(story.path)
+        if model is None or model.source_mtime_ns != story.mtime_ns or model.source_size != story.size:
+            loop = asyncio.get_running_loop()
+            model = await loop.run_in_executor(
+                None, load_or_build_model, story.path, SIMILARITY_DIR, PASSAGE_CHUNK_CHARS
+            )
+            self.remember(self.similarity_models, story.path, model)
+        
+        steps = [f"{entry.get('node_text', '')}\n{entry.get('choice_text', '')}" for entry in session_data["history"]]
+        steps.append(session_data["current_node"].get("text", ""))
+        with metrics.stage("similarity"):
+            return model.score(steps)
     
     async def read_story_file(self, story_name: str) -> str:
-        """Read story content from file"""
-        if story_name.lower() not in AVAILABLE_STORIES:
+        """Read story content (served from the story cache)"""
+        story = await self.get_story(story_name)
+        return story.content
+    
+    async def get_story(self, story_name: str) -> CachedStory:
+        """Get the cached story entry, loading it from disk if needed"""
+        entry = self.story_catalog.resolve(story_name)
+        if entry is None:
             raise HTTPException(
                 status_code=404, 
-                detail=f"Story '{story_name}' not found. Available stories: {list(AVAILABLE_STORIES.keys())}"
+                detail=f"Story '{story_name}' not found. Available stories: {self.story_catalog.names()}"
             )
         
-        filename = AVAILABLE_STORIES[story_name.lower()]
-        filepath = os.path.join(STORIES_DIR, filename)
-        
+        filepath = entry.path
         if not os.path.exists(filepath):
             raise HTTPException(
                 status_code=404,
-                detail=f"Story file '{filename}' not found"
+                detail=f"Story file '{entry.filename}' not found"
             )
         
         try:
-            async with aiofiles.open(filepath, 'r', encoding='utf-8') as f:
-                content = await f.read()
-                return content
+            with metrics.stage("read_story"):
+                return await self.story_cache.get(filepath)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Error reading story file: {str(e)}"
             )
     
-    async def load_previous_answers(self) -> Dict[str, Any]:
-        """Load previous answers from JSON file"""
+    async def load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Load a single session from the session store, falling back to the archive"""
         try:
-            async with aiofiles.open(PREVIOUS_ANSWERS_FILE, 'r', encoding='utf-8') as f:
-                content = await f.read()
-                return json.loads(content) if content.strip() else {}
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-    
-    async def save_previous_answers(self, data: Dict[str, Any]):
-        """Save previous answers to JSON file"""
+            with metrics.stage("load_session"):
+                session_data = await self.session_store.get(session_id)
+                if session_data is None:
+                    session_data = await self.session_archive.get(session_id)
+            return session_data
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error loading data: {str(e)}"
+            )
+    
+    async def save_session(self, session_id: str, session_data: Dict[str, Any]):
+        """Save a single session to the session store"""
         try:
-            async with aiofiles.open(PREVIOUS_ANSWERS_FILE, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(data, ensure_ascii=False, indent=2))
+            with metrics.stage("save"):
+                await self.session_store.put(session_id, session_data)
+        except VersionConflict:
+            # Another request or worker process applied a turn since this one read the session
+            raise HTTPException(
+                status_code=409,
+                detail="Session was updated by another request"
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Error saving data: {str(e)}"
             )
+        self.keep_resident(session_id, session_data)
     
-    async def call_gemini_api(self, prompt: str) -> Dict[str, Any]:
-        """Call Gemini API with the given prompt"""
-        if not GEMINI_API_KEY:
+    def keep_resident(self, session_id: str, session_data: Dict[str, Any]):
+        """Hand the latest state to WebSocket channels holding the session (writes from this process only)"""
+        for channel in self.session_channels.get(session_id, ()):
+            channel.session_data = session_data
+    
+    async def remove_session(self, session_id: str) -> bool:
+        """Delete a single session, returning False if it did not exist"""
+        try:
+            deleted = await self.session_store.delete(session_id)
+            archived = await self.session_archive.delete(session_id)
+            return deleted or archived
+        except Exception as e:
             raise HTTPException(
                 status_code=500,
-                detail="Gemini API key not configured"
+                detail=f"Error deleting data: {str(e)}"
             )
-        
-        headers = {
-            "Content-Type": "application/json"
+    
+    async def compact_sessions(self) -> int:
+        """Move completed and idle sessions out of the hot store into archive segments"""
+        # Only one worker process compacts at a time; stores without archival expire sessions themselves
+        if not self.session_store.archivable:
+            return 0
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        if not await self.session_store.acquire_lease("compactor", owner, SESSION_COMPACT_INTERVAL * 2):
+            return 0
+        now = datetime.now()
+        idle_before = (now - timedelta(seconds=SESSION_IDLE_TTL)).isoformat()
+        completed_before = (now - timedelta(seconds=SESSION_COMPLETED_TTL)).isoformat()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, compact_sessions_sync, self.session_store, self.session_archive, idle_before, completed_before
+        )
+    
+    async def run_session_compactor(self):
+        """Background loop running compact_sessions every SESSION_COMPACT_INTERVAL seconds"""
+        while True:
+            try:
+                await self.compact_sessions()
+            except Exception:
+                pass  # Retry on the next interval; hot sessions stay readable meanwhile
+            await asyncio.sleep(SESSION_COMPACT_INTERVAL)
+    
+    async def check_storage(self) -> Dict[str, Any]:
+        """Round-trip the session store and archive index within HEALTH_STORAGE_TIMEOUT"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.session_store.ping(), HEALTH_STORAGE_TIMEOUT)
+            archived = await asyncio.wait_for(loop.run_in_executor(None, self.session_archive.count), HEALTH_STORAGE_TIMEOUT)
+        except Exception as e:
+            return {"status": "unavailable", "error": f"{type(e).__name__}: {e}"}
+        return {
+            "status": "ok",
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "archived_sessions": archived,
         }
-        
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }]
+    
+    def check_upstream(self) -> Dict[str, Any]:
+        """Gemini state from recent calls (no request is sent)"""
+        client = self.gemini_client
+        if not client.configured:
+            status = "unconfigured"
+        elif client.consecutive_failures >= UPSTREAM_DEGRADED_AFTER or self.resilience.breaker.state != "closed":
+            status = "degraded"
+        else:
+            status = "ok"
+        return {
+            "status": status,
+            "in_flight": client.in_flight,
+            "consecutive_failures": client.consecutive_failures,
+            "last_success_at": datetime.fromtimestamp(client.last_success_at).isoformat() if client.last_success_at else None,
+            "last_error_at": datetime.fromtimestamp(client.last_error_at).isoformat() if client.last_error_at else None,
+            "last_error": client.last_error,
+            "resilience": self.resilience.stats()
         }
+    
+    def upstream_latency_p95(self) -> Optional[float]:
+        """Recent p95 of successful Gemini calls, once there are enough samples to trust it"""
+        latency = self.resilience.latency
+        return latency.percentile(95) if len(latency) >= self.resilience.hedge_min_samples else None
+    
+    async def call_gemini_api(self, prompt: str, coalesce: bool = True) -> Dict[str, Any]:
+        """Call Gemini API with the given prompt, sharing the call with identical ones in flight"""
+        if not (coalesce and GEMINI_SINGLE_FLIGHT_ENABLED):
+            return await self.request_gemini(prompt)
+        
+        started = time.perf_counter()
+        result, shared = await self.single_flight.run(self.prompt_key(prompt), lambda: self.request_gemini(prompt))
+        if shared:
+            metrics.record_stage("gemini_shared", time.perf_counter() - started)
+        # Every caller gets its own copy of the node, as from the continuation cache
+        return copy.deepcopy(result)
+    
+    def prompt_key(self, prompt: str) -> str:
+        """Single-flight key: hash of the model URL and the request body (prompt plus generation config)"""
+        body = json.dumps(self.create_gemini_payload(prompt), ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(f"{GEMINI_API_URL}\n{body}".encode("utf-8")).hexdigest()
+    
+    async def request_gemini(self, prompt: str) -> Dict[str, Any]:
+        """One generateContent call for the prompt, parsed into a story node"""
+        if not GEMINI_API_KEY:
+            GEMINI_ERRORS.inc(kind="not_configured")
+            raise HTTPException(
+                status_code=500,
+                detail="Gemini API key not configured"
+            )
         
         try:
-            url = f"{GEMINI_API_URL}?key={GEMINI_API_KEY}"
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            
-            result = response.json()
+            # Deadline, hedging, retries and circuit breaker around the upstream call
+            with metrics.stage("gemini"):
+                result = await self.resilience.call(lambda: self.generate_content(prompt))
+            self.record_usage(prompt, result)
             
             # Extract text from Gemini response
-            if "candidates" in result and len(result["candidates"]) > 0:
-                candidate = result["candidates"][0]
-                if "content" in candidate and "parts" in candidate["content"]:
-                    text = candidate["content"]["parts"][0]["text"]
+            text = extract_candidate_text(result)
+            if text is not None:
+                RESPONSE_CHARS.observe(len(text), kind="generate")
+                with metrics.stage("parse"):
                     return self.parse_gemini_response(text)
             
+            GEMINI_ERRORS.inc(kind="invalid_response")
             raise HTTPException(
                 status_code=500,
                 detail="Invalid response from Gemini API"
             )
             
-        except requests.RequestException as e:
+        except (CircuitOpenError, DeadlineExceeded, httpx.HTTPError, ValueError) as e:
+            raise self.upstream_error(e)
+    
+    def record_usage(self, prompt: str, result: Dict[str, Any]):
+        """Observe the token counts Gemini reports and calibrate the local estimator with them"""
+        usage = result.get("usageMetadata") or {}
+        if usage.get("promptTokenCount"):
+            USAGE_TOKENS.observe(usage["promptTokenCount"], kind="prompt")
+            self.token_estimator.calibrate(prompt, usage["promptTokenCount"])
+        if usage.get("candidatesTokenCount"):
+            USAGE_TOKENS.observe(usage["candidatesTokenCount"], kind="response")
+    
+    def record_prompt_tokens(self, kind: str, budget: PromptBudget):
+        """Report a prompt's estimated tokens per section on /metrics and in the request's Server-Timing"""
+        report = budget.report()
+        for section, tokens in report["sections"].items():
+            PROMPT_TOKENS.observe(tokens, kind=kind, section=section)
+        PROMPT_TOKENS.observe(report["used"], kind=kind, section="total")
+        metrics.annotate("prompt_tokens", report["used"])
+        metrics.annotate("prompt_token_budget", report["budget"])
+    
+    def upstream_error(self, error: Exception) -> HTTPException:
+        """Count a failed Gemini call and map it to the HTTP error returned to the client"""
+        if isinstance(error, CircuitOpenError):
+            GEMINI_ERRORS.inc(kind="circuit_open")
+            return HTTPException(
+                status_code=503,
+                detail="Story generation is temporarily unavailable, please retry shortly",
+                headers={"Retry-After": str(max(1, round(error.retry_after)))}
+            )
+        if isinstance(error, DeadlineExceeded):
+            GEMINI_ERRORS.inc(kind="deadline")
+            return HTTPException(
+                status_code=504,
+                detail=f"Gemini API did not respond in time: {str(error)}"
+            )
+        GEMINI_ERRORS.inc(kind=gemini_error_kind(error))
+        return HTTPException(
+            status_code=500,
+            detail=f"Error calling Gemini API: {str(error)}"
+        )
+    
+    async def generate_content(self, prompt: str) -> Dict[str, Any]:
+        """generateContent with the story prefix served from the context cache when possible"""
+        cached_content, text = await self.context_cache.resolve(prompt)
+        while True:
+            PROMPT_CHARS.observe(len(text), kind="generate")
+            try:
+                return await self.gemini_client.generate_content(self.create_gemini_payload(text, cached_content))
+            except httpx.HTTPStatusError as e:
+                if not self.context_cache.rejected_handle(cached_content, e):
+                    raise
+                # Cached prefix is gone or unusable: retry once with the full inline prompt
+                cached_content, text = None, prompt
+    
+    async def stream_content(self, prompt: str) -> AsyncIterator[str]:
+        """streamGenerateContent with the story prefix served from the context cache when possible"""
+        cached_content, text = await self.context_cache.resolve(prompt)
+        while True:
+            PROMPT_CHARS.observe(len(text), kind="stream")
+            first_chunk = True
+            try:
+                async for chunk in self.gemini_client.stream_generate_content(self.create_gemini_payload(text, cached_content)):
+                    first_chunk = False
+                    yield chunk
+                return
+            except httpx.HTTPStatusError as e:
+                if not first_chunk or not self.context_cache.rejected_handle(cached_content, e):
+                    raise
+                # Cached prefix is gone or unusable: retry once with the full inline prompt
+                cached_content, text = None, prompt
+    
+    async def stream_gemini_api(self, prompt: str) -> AsyncIterator[str]:
+        """Stream raw response text chunks from Gemini's streamGenerateContent"""
+        if not GEMINI_API_KEY:
+            GEMINI_ERRORS.inc(kind="not_configured")
             raise HTTPException(
                 status_code=500,
-                detail=f"Error calling Gemini API: {str(e)}"
+                detail="Gemini API key not configured"
             )
+        
+        started = time.perf_counter()
+        first_chunk = True
+        try:
+            # Deadline (to first chunk), retries before the first chunk and circuit breaker
+            async for chunk in self.resilience.stream(lambda: self.stream_content(prompt)):
+                if first_chunk:
+                    metrics.record_stage("gemini_first_chunk", time.perf_counter() - started)
+                    first_chunk = False
+                yield chunk
+        except (CircuitOpenError, DeadlineExceeded, httpx.HTTPError, ValueError) as e:
+            raise self.upstream_error(e)
+        metrics.record_stage("gemini_stream", time.perf_counter() - started)
+    
+    def create_gemini_payload(self, prompt: str, cached_content: Optional[str] = None) -> Dict[str, Any]:
+        """Build the generateContent request body for a prompt (optionally after a cached prefix)"""
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }]
+        }
+        if cached_content:
+            payload["cachedContent"] = cached_content
+        if GEMINI_JSON_MODE:
+            payload["generationConfig"] = {
+                "responseMimeType": "application/json",
+                "responseSchema": STORY_RESPONSE_SCHEMA
+            }
+        return payload
     
     def parse_gemini_response(self, text: str) -> Dict[str, Any]:
-        """Parse Gemini API response text into structured data"""
+        """Parse Gemini API response text (JSON or `Field: value` format) into structured data"""
         try:
-            # Try to parse as JSON first
-            if text.strip().startswith('{'):
-                return json.loads(text)
-            
-            # If not JSON, parse structured text response
-            lines = text.strip().split('\n')
-            result = {}
-            current_key = None
-            current_value = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Check for key indicators
-                if line.lower().startswith('introduction:'):
-                    if current_key:
-                        result[current_key] = '\n'.join(current_value).strip()
-                    current_key = 'introduction'
-                    current_value = [line.split(':', 1)[1].strip()]
-                elif line.lower().startswith('text:') or line.lower().startswith('story:'):
-                    if current_key:
-                        result[current_key] = '\n'.join(current_value).strip()
-                    current_key = 'text'
-                    current_value = [line.split(':', 1)[1].strip()]
-                elif line.lower().startswith('mood:'):
-                    if current_key:
-                        result[current_key] = '\n'.join(current_value).strip()
-                    current_key = 'mood'
-                    current_value = [line.split(':', 1)[1].strip()]
-                elif line.lower().startswith('choices:'):
-                    if current_key:
-                        result[current_key] = '\n'.join(current_value).strip()
-                    current_key = 'choices'
-                    current_value = []
-                elif line.lower().startswith('cultural_info:') or line.lower().startswith('cultural info:'):
-                    if current_key:
-                        result[current_key] = '\n'.join(current_value).strip()
-                    current_key = 'cultural_info'
-                    current_value = [line.split(':', 1)[1].strip()]
-                elif line.lower().startswith('similarity:') or line.lower().startswith('story_similarity:'):
-                    if current_key:
-                        result[current_key] = '\n'.join(current_value).strip()
-                    # Parse similarity score
-                    similarity_text = line.split(':', 1)[1].strip()
-                    try:
-                        # Extract number from text like "0.75" or "75%" or "7.5/10"
-                        import re
-                        numbers = re.findall(r'(\d+\.?\d*)', similarity_text)
-                        if numbers:
-                            score = float(numbers[0])
-                            if score > 1:  # Handle percentage or /10 scale
-                                score = score / 100 if score <= 100 else score / 10
-                            result['story_similarity'] = min(max(score, 0), 1)  # Clamp 0-1
-                    except:
-                        result['story_similarity'] = 0.5  # Default
-                    current_key = None
-                    current_value = []
-                elif line.startswith('-') or line.startswith('•') or line.startswith('*'):
-                    # Choice item
-                    if current_key == 'choices':
-                        choice = line[1:].strip()
-                        current_value.append(choice)
-                elif current_key:
-                    current_value.append(line)
-            
-            # Add the last key-value pair
-            if current_key:
-                if current_key == 'choices':
-                    result[current_key] = current_value
-                else:
-                    result[current_key] = '\n'.join(current_value).strip()
-
-            # --- Ensure choices is always a list ---
-            if 'choices' in result:
-                if isinstance(result['choices'], str):
-                    # Split by newlines, semicolons, or periods
-                    import re
-                    split_choices = [c.strip('-•* 	') for c in re.split(r'[\n;\.]', result['choices']) if c.strip()]
-                    result['choices'] = [c for c in split_choices if len(c) > 0]
-                elif not isinstance(result['choices'], list):
-                    result['choices'] = []
-
+            result = parse_story_response(text)
+            if not result.get("text"):
+                raise ValueError("No story text in response")
             return result
-        except Exception as e:
+        except Exception:
             # Fallback: return basic structure with the raw text
+            PARSE_FALLBACKS.inc()
             return {
                 "text": text,
                 "mood": "neutral",
                 "choices": []
             }
     
-    def create_start_prompt(self, story_content: str, story_name: str, max_choices: int = 15) -> str:
-        """Create prompt for starting a story (English only, no summary/lesson required)"""
-        mood_options = "neutral, tense, happy"
-        return f"""You are a master storyteller creating an interactive adventure based on the epic tale of {story_name}.
+    def create_story_preamble(self, story: CachedStory, story_name: str) -> Optional[str]:
+        """Static story context shared by every prompt of a story (served from the context cache)"""
+        if not self.context_cache.usable(story.path):
+            return None
+        preamble = f"""You are a master storyteller running interactive adventures based on the epic tale of {self.canonical_story_name(story_name)}.
 
 Story Content:
-{story_content[:3000]}...
+{story.excerpt(CONTEXT_CACHE_STORY_CHARS)}...
 
-The user has selected a total of {max_choices} steps for the story. Plan the story arc so that it feels complete, meaningful, and satisfying within exactly {max_choices} steps (including the ending). The story should have a clear beginning, middle, and end.
+"""
+        self.context_cache.register(story.path, preamble)
+        return preamble
+    
+    def create_start_prompt(self, story_content: str, story_name: str, max_choices: int = 15, preamble: Optional[str] = None, chapter_context: Optional[str] = None, budget: Optional[PromptBudget] = None) -> str:
+        """Create prompt for starting a story (English only, no summary/lesson required)"""
+        budget = budget or self.prompt_budgeter.new_budget()
+        mood_options = "neutral, tense, happy"
+        instructions = f"""The user has selected a total of {max_choices} steps for the story. Plan the story arc so that it feels complete, meaningful, and satisfying within exactly {max_choices} steps (including the ending). The story should have a clear beginning, middle, and end.
 
 1. INTRODUCTION: A captivating opening that sets the scene (2-3 sentences)
 2. TEXT: The current story situation that presents the protagonist at a decision point (4-6 sentences)
@@ -296,30 +854,41 @@ Choices:
 Cultural_Info: [Brief cultural explanation if needed, otherwise omit]
 
 Make the story immersive and true to the epic's themes while allowing for player agency."""
+        budget.charge("instructions", instructions)
+        if preamble is None:
+            intro = f"""You are a master storyteller creating an interactive adventure based on the epic tale of {story_name}.
+
+Story Content:
+"""
+            budget.charge("instructions", intro)
+        else:
+            budget.note("cached", preamble)
+        
+        # Chapter summary first (dense), then as much of the story opening as the budget leaves
+        chapter = budget.fit("chapter", f"{chapter_context}\n\n") if chapter_context else ""
+        if preamble is None:
+            preamble = f"""{intro}{budget.fit("story", story_content[:START_EXCERPT_CHARS])}...
+
+"""
+        self.record_prompt_tokens("start", budget)
+        return preamble + chapter + instructions
     
-    def create_continue_prompt(self, story_content: str, story_name: str, choice_text: str, history: List[Dict], choices_made: int = 0, max_choices: int = 15) -> str:
+    def create_continue_prompt(self, story_content: str, story_name: str, choice_text: str, history: List[Dict], choices_made: int = 0, max_choices: int = 15, preamble: Optional[str] = None, history_summary: Optional[Dict[str, Any]] = None, chapter_context: Optional[str] = None, budget: Optional[PromptBudget] = None) -> str:
         """Create prompt for continuing a story (English only, no summary/lesson required)"""
-        history_text = ""
-        if history:
-            history_text = "Previous story progression:\n"
-            for i, entry in enumerate(history[-3:], 1):  # Last 3 entries for context
-                history_text += f"{i}. {entry.get('node_text', '')} -> Choice: {entry.get('choice_text', '')}\n"
+        budget = budget or self.prompt_budgeter.new_budget()
         choices_remaining = max_choices - choices_made
         should_end = choices_remaining <= 0
         mood_options = "neutral, tense, happy"
+        # The local scorer rates the path itself; only ask the model for a rating without it
+        rate_similarity = SIMILARITY_SCORER == "gemini"
         ending_instruction = ""
         if should_end:
             ending_instruction = f"""
-This should be the ENDING of the story. Provide a satisfying conclusion. The ending should feel complete and meaningful, not abrupt. Rate the similarity to the original epic."""
-        return f"""Continue this interactive story based on the epic of {story_name}.
-
-Original Story Context:
-{story_content[:2000]}...
-
-{history_text}
-
-The protagonist chose: "{choice_text}"
-Choices made so far: {choices_made}/{max_choices}
+This should be the ENDING of the story. Provide a satisfying conclusion. The ending should feel complete and meaningful, not abrupt.{' Rate the similarity to the original epic.' if rate_similarity else ''}"""
+        similarity_format = """
+Similarity: [Rate 0.0-1.0 how closely the user's choices followed the original epic story. 1.0 = exactly like original, 0.5 = some similarities, 0.0 = completely different path]""" if rate_similarity else ""
+        choice_line = f'The protagonist chose: "{choice_text}"'
+        instructions = f"""Choices made so far: {choices_made}/{max_choices}
 {ending_instruction}
 
 Based on this choice, continue the story. Plan the story arc so that the narrative fits exactly {max_choices} steps, with a clear ending. {'' if should_end else f'You have {choices_remaining} choices remaining before the story must end.'}
@@ -337,41 +906,69 @@ Cultural_Info: [Brief cultural explanation if needed for this part, otherwise om
 
 For ENDING (when no choices remain OR natural story conclusion), provide:
 Text: [4-6 sentences describing the conclusion]
-Mood: [one word - ONLY: {mood_options}]
-Similarity: [Rate 0.0-1.0 how closely the user's choices followed the original epic story. 1.0 = exactly like original, 0.5 = some similarities, 0.0 = completely different path]
+Mood: [one word - ONLY: {mood_options}]{similarity_format}
 Cultural_Info: [Brief cultural explanation if needed, otherwise omit]
 
 Choose the format based on choices remaining and natural story progression. Make it engaging and true to the epic's spirit."""
-    
-# Initialize story manager
-story_manager = StoryManager()
+        budget.charge("choice", choice_line)
+        budget.charge("instructions", instructions)
+        if preamble is None:
+            intro = f"""Continue this interactive story based on the epic of {story_name}.
 
-@app.get("/")
-async def root():
-    """Root endpoint with API information"""
-    return {
-        "message": "Interactive Storytelling API",
-        "version": "1.0.0",
-        "available_stories": list(AVAILABLE_STORIES.keys()),
-        "endpoints": {
-            "start_story": "/stories/start",
-            "continue_story": "/stories/continue",
-            "available_stories": "/stories/list"
-        }
-    }
+Original Story Context:
+"""
+        else:
+            budget.note("cached", preamble)
+            intro = preamble + """Continue this interactive story.
 
-@app.get("/stories/list")
-async def list_stories():
-    """Get list of available stories"""
-    return {
-        "available_stories": list(AVAILABLE_STORIES.keys()),
-        "story_files": {name: filename for name, filename in AVAILABLE_STORIES.items()}
-    }
+Passages most relevant to this scene:
+"""
+        budget.charge("instructions", intro[len(preamble or ""):])
+        
+        # History gets its share of what the instructions leave, then the chapter summary, then the story context
+        history_text = self.fit_history(budget, history, history_summary, int(budget.remaining * PROMPT_HISTORY_SHARE))
+        chapter = budget.fit("chapter", f"\n\n{chapter_context}") if chapter_context else ""
+        context = budget.fit("story", story_content[:CONTINUE_EXCERPT_CHARS])
+        self.record_prompt_tokens("continue", budget)
+        return f"""{intro}{context}...{chapter}
 
-@app.post("/stories/start", response_model=StoryResponse)
-async def start_story(request: StartStoryRequest):
-    """Start a new interactive story session"""
-    try:
+{history_text}
+
+{choice_line}
+{instructions}"""
+    
+    def fit_history(self, budget: PromptBudget, history: List[Dict], history_summary: Optional[Dict[str, Any]], tokens: int) -> str:
+        """History section of a continue prompt within `tokens`: the summary, then as many of the newest steps as fit"""
+        estimator = budget.estimator
+        tokens = min(tokens, budget.remaining)
+        text = ""
+        if history_summary and history_summary.get("text"):
+            # Summary of older steps plus the raw steps it does not cover yet (bounded if it lags behind)
+            text = estimator.truncate(f"Story so far:\n{history_summary['text']}\n", tokens)
+            steps = history[history_summary.get("through", 0):][-2 * HISTORY_RECENT_STEPS:]
+            title = "\nMost recent steps:\n"
+        else:
+            steps = history[-PROMPT_HISTORY_MAX_STEPS:]
+            title = "Previous story progression:\n"
+        
+        # Whole steps only, newest first, numbered in story order
+        left = tokens - estimator.estimate(text) - estimator.estimate(title)
+        lines: List[str] = []
+        for entry in reversed(steps):
+            line = f"{entry.get('node_text', '')} -> Choice: {entry.get('choice_text', '')}\n"
+            cost = estimator.estimate(line) + 1
+            if cost > left:
+                break
+            lines.insert(0, line)
+            left -= cost
+        if lines:
+            text += title + "".join(f"{i}. {line}" for i, line in enumerate(lines, 1))
+        if text:
+            budget.charge("history", text)
+        return text
+    
+    async def load_start_story(self, request: StartStoryRequest) -> CachedStory:
+        """Validate a start request and load its story"""
         # Validate max_choices
         if request.max_choices < 10 or request.max_choices > 50:
             raise HTTPException(
@@ -379,21 +976,113 @@ async def start_story(request: StartStoryRequest):
                 detail="max_choices must be between 10 and 50"
             )
         
-        # Read story content
-        story_content = await story_manager.read_story_file(request.story_name)
+        # Read story content (cached, with precomputed excerpt)
+        return await self.get_story(request.story_name)
+    
+    async def build_start_prompt(self, request: StartStoryRequest, story: CachedStory) -> str:
+        """Build the opening prompt for a start request"""
+        with metrics.stage("prompt"):
+            return self.create_start_prompt(
+                story.excerpt(START_EXCERPT_CHARS), request.story_name, request.max_choices,
+                preamble=self.create_story_preamble(story, request.story_name),
+                chapter_context=await self.get_chapter_context(story)
+            )
+    
+    async def start_turn(self, request: StartStoryRequest) -> Dict[str, Any]:
+        """Generate (or take a pooled) opening and create the session"""
+        # Validate request
+        story = await self.load_start_story(request)
         
-        # Create prompt for Gemini API
-        prompt = story_manager.create_start_prompt(story_content, request.story_name, request.max_choices)
+        # Serve a pre-generated opening, or build the opening prompt and call Gemini API
+        gemini_response = self.take_pooled_opening(request)
+        if gemini_response is None:
+            prompt = await self.build_start_prompt(request, story)
+            gemini_response = await self.call_gemini_api(prompt)
         
-        # Call Gemini API
-        gemini_response = await story_manager.call_gemini_api(prompt)
+        # Save session and prepare response
+        return await self.create_session(request, gemini_response)
+    
+    async def submit_job(self, lane: str, run) -> JSONResponse:
+        """Queue a story turn and answer 202 with its job id, or 429 if the queue is full"""
+        async def run_job() -> Dict[str, Any]:
+            metrics.begin_background(f"{lane}_job")
+            return jsonable_encoder(StoryResponse(**await run()))
         
+        try:
+            job = await self.job_queue.submit(lane, run_job)
+        except QueueFull as e:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many story requests queued, please retry later",
+                headers={"Retry-After": str(int(e.retry_after + 0.999))}
+            )
+        status_url = f"/stories/jobs/{job.id}"
+        return JSONResponse(
+            status_code=202,
+            content={**job.to_dict(), "status_url": status_url},
+            headers={"Location": status_url}
+        )
+    
+    async def publish_job(self, job: Job):
+        """Store a job's state in the session backend, so any worker process can answer its status"""
+        await self.session_store.put_job(job.id, job.to_dict(), JOB_RESULT_TTL)
+    
+    async def wait_shared_job(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Published state of a job run by another worker, polled until it finishes or `timeout` seconds pass"""
+        deadline = time.monotonic() + timeout
+        while True:
+            data = await self.session_store.get_job(job_id)
+            remaining = deadline - time.monotonic()
+            if data is None or data.get("status") in ("done", "failed") or remaining <= 0:
+                return data
+            await asyncio.sleep(min(JOB_SHARED_POLL_INTERVAL, remaining))
+    
+    def canonical_story_name(self, story_name: str) -> str:
+        """Catalog name (file stem) of the story an alias points to"""
+        entry = self.story_catalog.resolve(story_name)
+        return entry.name if entry else story_name.lower()
+    
+    def opening_pool_key(self, story_name: str, max_choices: int) -> Optional[PoolKey]:
+        bucket = self.opening_pool.bucket_for(max_choices)
+        if bucket is None:
+            return None
+        return self.canonical_story_name(story_name), bucket
+    
+    def take_pooled_opening(self, request: StartStoryRequest) -> Optional[Dict[str, Any]]:
+        """Pop a pre-generated opening for the request's story and bucket, if one is ready"""
+        if not OPENING_POOL_ENABLED:
+            return None
+        key = self.opening_pool_key(request.story_name, request.max_choices)
+        return self.opening_pool.pop(key) if key else None
+    
+    async def generate_opening(self, key: PoolKey) -> Dict[str, Any]:
+        """Generate one opening node for the pool"""
+        metrics.begin_background("opening_pool")
+        story_name, max_choices = key
+        story = await self.get_story(story_name)
+        prompt = self.create_start_prompt(
+            story.excerpt(START_EXCERPT_CHARS), story_name, max_choices,
+            preamble=self.create_story_preamble(story, story_name),
+            chapter_context=await self.get_chapter_context(story)
+        )
+        # Refills of one pool run concurrently with the same prompt; each must be its own opening
+        return await self.call_gemini_api(prompt, coalesce=False)
+    
+    def pin_warm_openings(self):
+        """Keep the OPENING_POOL_WARM story:max_choices pools filled from startup"""
+        for entry in OPENING_POOL_WARM:
+            story_name, _, max_choices = entry.partition(":")
+            if self.story_catalog.resolve(story_name) is None:
+                continue
+            key = self.opening_pool_key(story_name, int(max_choices or 15))
+            if key:
+                self.opening_pool.pin(key)
+    
+    async def create_session(self, request: StartStoryRequest, gemini_response: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist a new session for the opening node and build the response data"""
         # Generate session ID
         session_id = str(uuid.uuid4())
         
-        # Load previous answers
-        previous_answers = await story_manager.load_previous_answers()
-        
         # Save initial session data
         session_data = {
             "story_name": request.story_name,
@@ -405,11 +1094,11 @@ async def start_story(request: StartStoryRequest):
             "updated_at": datetime.now().isoformat()
         }
         
-        previous_answers[session_id] = session_data
-        await story_manager.save_previous_answers(previous_answers)
+        await self.save_session(session_id, session_data)
+        self.schedule_prefetch(session_id, session_data)
         
         # Prepare response
-        response_data = {
+        return {
             "session_id": session_id,
             "introduction": gemini_response.get("introduction", ""),
             "text": gemini_response.get("text", ""),
@@ -418,33 +1107,19 @@ async def start_story(request: StartStoryRequest):
             "cultural_info": gemini_response.get("cultural_info"),
             "choices_remaining": request.max_choices
         }
-        
-        return StoryResponse(**response_data)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error starting story: {str(e)}"
-        )
-
-@app.post("/stories/continue", response_model=StoryResponse)
-async def continue_story(request: ContinueStoryRequest):
-    """Continue an existing story session"""
-    try:
-        # Load previous answers
-        previous_answers = await story_manager.load_previous_answers()
+    
+    async def load_continue_session(self, request: ContinueStoryRequest) -> Dict[str, Any]:
+        """Load and validate the session for a continue request"""
+        # Load session
+        session_data = await self.load_session(request.session_id)
         
         # Check if session exists
-        if request.session_id not in previous_answers:
+        if session_data is None:
             raise HTTPException(
                 status_code=404,
                 detail="Session not found"
             )
         
-        session_data = previous_answers[request.session_id]
-        
         # Verify story name matches
         if session_data["story_name"] != request.story_name:
             raise HTTPException(
@@ -462,21 +1137,211 @@ async def continue_story(request: ContinueStoryRequest):
                 detail="Story has already reached maximum choices limit"
             )
         
-        # Read story content
-        story_content = await story_manager.read_story_file(request.story_name)
+        return session_data
+    
+    async def continue_turn(self, request: ContinueStoryRequest) -> Dict[str, Any]:
+        """Run one continue turn; duplicates of an in-flight or just finished turn share its result"""
+        # Load and validate session
+        session_data = await self.load_continue_session(request)
+        
+        # Only the same choice for the same turn is a duplicate (the next turn may repeat the choice text)
+        turn = request.choices_made if request.choices_made is not None else session_data.get("choices_made", 0)
+        key = (request.session_id, turn, " ".join(request.choice_text.split()).lower())
+        return await self.session_locks.run_once(key, lambda: self.run_continue_turn(request, session_data))
+    
+    async def run_continue_turn(self, request: ContinueStoryRequest, session_data: Dict[str, Any]) -> Dict[str, Any]:
+        async with self.session_locks.hold(request.session_id):
+            session_data = await self.reload_for_turn(request, session_data)
+            
+            # Serve a prefetched or cached continuation, or build the prompt and call Gemini API
+            gemini_response = await self.take_prefetched(request.session_id, session_data, request.choice_text)
+            if gemini_response is None:
+                gemini_response = self.get_cached_continuation(session_data, request.choice_text)
+            if gemini_response is None:
+                prompt = await self.build_continue_prompt(session_data, request.choice_text)
+                gemini_response = await self.call_gemini_api(prompt)
+                self.cache_continuation(session_data, request.choice_text, gemini_response)
+            
+            # Update session and prepare response
+            return await self.apply_continue(request, session_data, gemini_response)
+    
+    async def reload_for_turn(self, request: ContinueStoryRequest, session_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Re-read the session under its lock and reject the turn if another one was applied meanwhile"""
+        current = await self.load_continue_session(request)
+        expected = request.choices_made if request.choices_made is not None else session_data.get("choices_made", 0)
+        if current.get("choices_made", 0) != expected:
+            raise HTTPException(
+                status_code=409,
+                detail="Session was updated by another request"
+            )
+        return current
+    
+    async def build_continue_prompt(self, session_data: Dict[str, Any], choice_text: str) -> str:
+        """Build the continue prompt for a choice made at the session's current node"""
+        story_name = session_data["story_name"]
+        
+        # Retrieve the story passages relevant to the current scene and choice
+        story = await self.get_story(story_name)
+        query = f"{session_data['current_node'].get('text', '')}\n{choice_text}"
+        with metrics.stage("retrieve"):
+            story_context = await self.get_continue_context(story, query)
+            chapter_context = await self.get_chapter_context(
+                story, query, session_data.get("choices_made", 0) / session_data.get("max_choices", 15)
+            )
         
         # Create continue prompt
-        prompt = story_manager.create_continue_prompt(
-            story_content,
-            request.story_name,
-            request.choice_text,
-            session_data["history"],
-            current_choices,
-            max_choices
+        with metrics.stage("prompt"):
+            return self.create_continue_prompt(
+                story_context,
+                story_name,
+                choice_text,
+                session_data["history"],
+                session_data.get("choices_made", 0),
+                session_data.get("max_choices", 15),
+                preamble=self.create_story_preamble(story, story_name),
+                history_summary=session_data.get("history_summary"),
+                chapter_context=chapter_context
+            )
+    
+    def schedule_prefetch(self, session_id: str, session_data: Dict[str, Any]):
+        """Generate the continuations of the offered choices in the background"""
+        if not PREFETCH_ENABLED:
+            return
+        choices = session_data["current_node"].get("choices") or []
+        if not choices or session_data.get("choices_made", 0) >= session_data.get("max_choices", 15):
+            return
+        
+        # Snapshot the session compactly: the live dict is mutated when the next turn is applied
+        snapshot_record = SessionRecord.from_dict(session_data)
+        
+        async def generate(choice_text: str) -> Dict[str, Any]:
+            metrics.begin_background("prefetch")
+            snapshot = snapshot_record.to_dict()
+            cached = self.get_cached_continuation(snapshot, choice_text)
+            if cached is not None:
+                return cached
+            prompt = await self.build_continue_prompt(snapshot, choice_text)
+            gemini_response = await self.call_gemini_api(prompt)
+            self.cache_continuation(snapshot, choice_text, gemini_response)
+            return gemini_response
+        
+        self.prefetcher.schedule(session_id, session_data.get("choices_made", 0), choices, generate)
+    
+    def continuation_key(self, session_data: Dict[str, Any], choice_text: str) -> Optional[str]:
+        """Cache key of the node following a choice, or None if it must not be shared (e.g. endings)"""
+        if not CONTINUATION_CACHE_ENABLED:
+            return None
+        choices_made = session_data.get("choices_made", 0)
+        max_choices = session_data.get("max_choices", 15)
+        if choices_made + 1 >= max_choices:
+            return None  # Endings rate the player's whole path
+        return self.continuation_cache.make_key(
+            self.canonical_story_name(session_data["story_name"]),
+            max_choices,
+            choices_made,
+            session_data["current_node"].get("text", ""),
+            choice_text
         )
+    
+    def get_cached_continuation(self, session_data: Dict[str, Any], choice_text: str) -> Optional[Dict[str, Any]]:
+        key = self.continuation_key(session_data, choice_text)
+        return self.continuation_cache.get(key) if key else None
+    
+    def cache_continuation(self, session_data: Dict[str, Any], choice_text: str, gemini_response: Dict[str, Any]):
+        """Share a generated continuation (call before the session is advanced)"""
+        key = self.continuation_key(session_data, choice_text)
+        if key and gemini_response.get("choices"):  # Skip unparsed fallbacks
+            self.continuation_cache.put(key, gemini_response)
+    
+    def create_summary_prompt(self, story_name: str, previous_summary: str, steps: List[Dict]) -> str:
+        """Create prompt folding new history steps into a session's running summary"""
+        steps_text = ""
+        for i, entry in enumerate(steps, 1):
+            steps_text += f"{i}. {entry.get('node_text', '')} -> Choice: {entry.get('choice_text', '')}\n"
+        max_words = HISTORY_SUMMARY_MAX_CHARS // 6
+        return f"""You are keeping the running summary of an interactive story based on the epic of {story_name}.
+
+Summary so far:
+{previous_summary or "(nothing yet)"}
+
+New steps to add:
+{steps_text}
+Rewrite the summary so it covers the story so far in at most {max_words} words. Keep characters, places, promises, items and unresolved threads; drop descriptive detail. Reply with the summary text only."""
+    
+    def schedule_history_summary(self, session_id: str, session_data: Dict[str, Any]):
+        """Fold steps older than the last HISTORY_RECENT_STEPS into the session summary in the background"""
+        if not HISTORY_SUMMARY_ENABLED or session_id in self.summary_tasks:
+            return  # A running update folds everything pending when it reloads the session
+        summary = session_data.get("history_summary") or {}
+        if len(session_data["history"]) - HISTORY_RECENT_STEPS <= summary.get("through", 0):
+            return
+        if session_data.get("choices_made", 0) >= session_data.get("max_choices", 15):
+            return  # Story is over; nothing will read the summary
         
-        # Call Gemini API
-        gemini_response = await story_manager.call_gemini_api(prompt)
+        task = asyncio.create_task(self.update_history_summary(session_id))
+        self.summary_tasks[session_id] = task
+        task.add_done_callback(lambda done: self.summary_tasks.pop(session_id, None))
+    
+    async def update_history_summary(self, session_id: str):
+        """Generate the new summary, then store it if no newer summary was stored meanwhile"""
+        metrics.begin_background("history_summary")
+        try:
+            session_data = await self.load_session(session_id)
+            if session_data is None:
+                return
+            summary = session_data.get("history_summary") or {}
+            through = len(session_data["history"]) - HISTORY_RECENT_STEPS
+            steps = session_data["history"][summary.get("through", 0):through]
+            if not steps:
+                return
+            
+            prompt = self.create_summary_prompt(session_data["story_name"], summary.get("text", ""), steps)
+            with metrics.stage("summarize"):
+                result = await self.resilience.call(
+                    lambda: self.gemini_client.generate_content({"contents": [{"parts": [{"text": prompt}]}]}),
+                    hedge=False
+                )
+            text = (extract_candidate_text(result) or "").strip()
+            if not text:
+                return
+            
+            # Stored beside the session: turns being applied meanwhile (here or on other workers) do not conflict
+            summary = {"text": text[:HISTORY_SUMMARY_MAX_CHARS], "through": through}
+            if await self.session_store.put_summary(session_id, summary):
+                for channel in self.session_channels.get(session_id, ()):
+                    channel.record.history_summary = summary
+        except Exception:
+            pass  # The summary is best effort; prompts fall back to the raw recent steps
+    
+    async def take_prefetched(self, session_id: str, session_data: Dict[str, Any], choice_text: str) -> Optional[Dict[str, Any]]:
+        """Return a prefetched continuation for the choice, if one was generated"""
+        if not PREFETCH_ENABLED:
+            return None
+        with metrics.stage("prefetch_wait"):
+            return await self.prefetcher.take(session_id, session_data.get("choices_made", 0), choice_text)
+    
+    async def apply_continue(self, request: ContinueStoryRequest, session_data: Dict[str, Any], gemini_response: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a turn's node to the session, retrying once on a fresh copy after a version conflict"""
+        choices_made = session_data.get("choices_made", 0)
+        try:
+            return await self.apply_continue_once(request, session_data, gemini_response)
+        except HTTPException as e:
+            if e.status_code != 409:
+                raise
+        
+        # Written by another worker since it was loaded; fine (the node is already paid for) unless a turn was applied
+        current = await self.load_session(request.session_id)
+        if current is None or current.get("choices_made", 0) != choices_made:
+            raise HTTPException(
+                status_code=409,
+                detail="Session was updated by another request"
+            )
+        return await self.apply_continue_once(request, current, gemini_response)
+    
+    async def apply_continue_once(self, request: ContinueStoryRequest, session_data: Dict[str, Any], gemini_response: Dict[str, Any]) -> Dict[str, Any]:
+        """Record the chosen step and new node in the session and build the response data"""
+        current_choices = session_data.get("choices_made", 0)
+        max_choices = session_data.get("max_choices", 15)
         
         # Update session history
         history_entry = {
@@ -491,9 +1356,17 @@ async def continue_story(request: ContinueStoryRequest):
         session_data["choices_made"] = current_choices + 1
         session_data["updated_at"] = datetime.now().isoformat()
         
+        # Score the ending locally (also replacing a rating the model gave for an early ending)
+        if SIMILARITY_SCORER == "local" and (current_choices + 1 >= max_choices or "story_similarity" in gemini_response):
+            similarity = await self.score_similarity(session_data)
+            if similarity is not None:
+                gemini_response = {**gemini_response, "story_similarity": similarity}
+                session_data["current_node"] = gemini_response
+        
         # Save updated session data
-        previous_answers[request.session_id] = session_data
-        await story_manager.save_previous_answers(previous_answers)
+        await self.save_session(request.session_id, session_data)
+        self.schedule_prefetch(request.session_id, session_data)
+        self.schedule_history_summary(request.session_id, session_data)
         
         # Prepare response
         choices_remaining = max_choices - (current_choices + 1)
@@ -512,6 +1385,76 @@ async def continue_story(request: ContinueStoryRequest):
         if "story_similarity" in gemini_response:
             response_data["story_similarity"] = gemini_response["story_similarity"]
         
+        return response_data
+    
+# Initialize story manager
+story_manager = StoryManager()
+
+@app.get("/")
+async def root():
+    """Root endpoint with API information"""
+    return {
+        "message": "Interactive Storytelling API",
+        "version": "1.0.0",
+        "available_stories": story_manager.story_catalog.names(),
+        "endpoints": {
+            "start_story": "/stories/start",
+            "continue_story": "/stories/continue",
+            "start_story_stream": "/stories/start/stream",
+            "continue_story_stream": "/stories/continue/stream",
+            "session_websocket": "/stories/ws/{session_id}",
+            "available_stories": "/stories/list",
+            "job_status": "/stories/jobs/{job_id}",
+            "metrics": "/metrics",
+            "health": "/health"
+        }
+    }
+
+@app.get("/stories/list")
+async def list_stories():
+    """Get list of available stories"""
+    return {
+        "available_stories": story_manager.story_catalog.names(),
+        "story_files": story_manager.story_catalog.files(),
+        "stories": [entry.public() for entry in story_manager.story_catalog.entries()]
+    }
+
+def use_job_mode(mode: Optional[str]) -> bool:
+    """Whether a start/continue request runs as a job (?mode=job|sync, default JOB_MODE_DEFAULT)"""
+    if mode not in (None, "job", "sync"):
+        raise HTTPException(status_code=400, detail="mode must be 'job' or 'sync'")
+    if mode == "job" and not JOB_MODE_ENABLED:
+        raise HTTPException(status_code=400, detail="Job mode is not enabled")
+    return JOB_MODE_ENABLED and (mode == "job" or (mode is None and JOB_MODE_DEFAULT))
+
+@app.post("/stories/start", response_model=StoryResponse, responses={202: {"description": "Job accepted (job mode)"}})
+async def start_story(request: StartStoryRequest, mode: Optional[str] = None):
+    """Start a new interactive story session (?mode=job returns a job id to poll instead)"""
+    if use_job_mode(mode):
+        return await story_manager.submit_job("start", lambda: story_manager.start_turn(request))
+    try:
+        # Generate the opening and save the session
+        response_data = await story_manager.start_turn(request)
+        
+        return StoryResponse(**response_data)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error starting story: {str(e)}"
+        )
+
+@app.post("/stories/continue", response_model=StoryResponse, responses={202: {"description": "Job accepted (job mode)"}})
+async def continue_story(request: ContinueStoryRequest, mode: Optional[str] = None):
+    """Continue an existing story session (?mode=job returns a job id to poll instead)"""
+    if use_job_mode(mode):
+        return await story_manager.submit_job("continue", lambda: story_manager.continue_turn(request))
+    try:
+        # Run the turn under the session lock (duplicate requests share one result)
+        response_data = await story_manager.continue_turn(request)
+        
         return StoryResponse(**response_data)
         
     except HTTPException:
@@ -522,19 +1465,349 @@ async def continue_story(request: ContinueStoryRequest):
             detail=f"Error continuing story: {str(e)}"
         )
 
+@app.get("/stories/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0)):
+    """Job status and, once done, its story response; `wait` long-polls up to JOB_LONG_POLL_MAX seconds"""
+    job = await story_manager.job_queue.wait(job_id, min(wait, JOB_LONG_POLL_MAX))
+    if job is not None:
+        return job.to_dict()
+    
+    # Submitted to another worker process: its published state
+    data = await story_manager.wait_shared_job(job_id, min(wait, JOB_LONG_POLL_MAX))
+    if data is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found (unknown or expired)"
+        )
+    return data
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {dumps(jsonable_encoder(data)).decode('utf-8')}\n\n"
+
+async def story_events(prompt: str, finalize) -> AsyncIterator[Tuple[str, Any]]:
+    """Relay Gemini output as (event, data) pairs, then persist the turn and send the full response"""
+    parser = IncrementalStoryParser()
+    chunks = []
+    try:
+        async for chunk in story_manager.stream_gemini_api(prompt):
+            chunks.append(chunk)
+            for field, value in parser.feed(chunk):
+                yield field, {"delta": value} if field in ("introduction", "text") else {"value": value}
+        for field, value in parser.finish():
+            yield field, {"value": value}
+        
+        if not chunks:
+            raise HTTPException(
+                status_code=500,
+                detail="Invalid response from Gemini API"
+            )
+        
+        text = "".join(chunks)
+        RESPONSE_CHARS.observe(len(text), kind="stream")
+        with metrics.stage("parse"):
+            gemini_response = story_manager.parse_gemini_response(text)
+        response_data = await finalize(gemini_response)
+        yield "done", StoryResponse(**response_data)
+    except HTTPException as e:
+        yield "error", {"detail": e.detail}
+    except Exception as e:
+        yield "error", {"detail": f"Error streaming story: {str(e)}"}
+
+async def ready_events(gemini_response: Dict[str, Any], finalize) -> AsyncIterator[Tuple[str, Any]]:
+    """Send an already generated node (e.g. prefetched) as (event, data) pairs"""
+    try:
+        for field in ("introduction", "text"):
+            if gemini_response.get(field):
+                yield field, {"delta": gemini_response[field]}
+        for field in ("mood", "choices", "cultural_info", "story_similarity"):
+            if field in gemini_response:
+                yield field, {"value": gemini_response[field]}
+        
+        response_data = await finalize(gemini_response)
+        yield "done", StoryResponse(**response_data)
+    except HTTPException as e:
+        yield "error", {"detail": e.detail}
+    except Exception as e:
+        yield "error", {"detail": f"Error streaming story: {str(e)}"}
+
+async def continue_events(request: ContinueStoryRequest, session_data: Dict[str, Any], finalize) -> AsyncIterator[Tuple[str, Any]]:
+    """Events of one continue turn: a prefetched or cached node if there is one, else streamed from Gemini"""
+    async def finalize_generated(gemini_response: Dict[str, Any]) -> Dict[str, Any]:
+        story_manager.cache_continuation(session_data, request.choice_text, gemini_response)
+        return await finalize(gemini_response)
+    
+    try:
+        ready = await story_manager.take_prefetched(request.session_id, session_data, request.choice_text)
+        if ready is None:
+            ready = story_manager.get_cached_continuation(session_data, request.choice_text)
+        if ready is not None:
+            turn_events = ready_events(ready, finalize)
+        else:
+            prompt = await story_manager.build_continue_prompt(session_data, request.choice_text)
+            turn_events = story_events(prompt, finalize_generated)
+    except HTTPException as e:
+        yield "error", {"detail": e.detail}
+        return
+    
+    async for event in turn_events:
+        yield event
+
+async def sse_events(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[str]:
+    """Format (event, data) pairs as Server-Sent Events"""
+    async for event, data in events:
+        yield format_sse(event, data)
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@app.post("/stories/start/stream")
+async def start_story_stream(request: StartStoryRequest):
+    """Start a new story session, streaming the opening as Server-Sent Events"""
+    story = await story_manager.load_start_story(request)
+    
+    async def finalize(gemini_response: Dict[str, Any]) -> Dict[str, Any]:
+        return await story_manager.create_session(request, gemini_response)
+    
+    pooled = story_manager.take_pooled_opening(request)
+    if pooled is not None:
+        events = ready_events(pooled, finalize)
+    else:
+        events = story_events(await story_manager.build_start_prompt(request, story), finalize)
+    
+    return StreamingResponse(
+        sse_events(events),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@app.post("/stories/continue/stream")
+async def continue_story_stream(request: ContinueStoryRequest):
+    """Continue a story session, streaming the next node as Server-Sent Events"""
+    session_data = await story_manager.load_continue_session(request)
+    
+    async def events() -> AsyncIterator[Tuple[str, Any]]:
+        # Hold the session lock for the whole stream so concurrent turns cannot interleave
+        async with story_manager.session_locks.hold(request.session_id):
+            try:
+                current = await story_manager.reload_for_turn(request, session_data)
+            except HTTPException as e:
+                yield "error", {"detail": e.detail}
+                return
+            
+            async def finalize(gemini_response: Dict[str, Any]) -> Dict[str, Any]:
+                return await story_manager.apply_continue(request, current, gemini_response)
+            
+            async for event in continue_events(request, current, finalize):
+                yield event
+    
+    return StreamingResponse(
+        sse_events(events()),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+class SessionChannel:
+    """One player's WebSocket, keeping the session resident between turns.
+    
+    Client messages are {"choice_text": "..."} (or {"type": "ping"}). Server
+    messages are {"event", "data"} with the SSE event names: "session" once
+    connected, the node fields, "done" and "error" for each turn, plus
+    "prefetched" {"choice_text", "node"} pushed as soon as the continuation of
+    an offered choice is ready. Saves made in this process (other turns,
+    history summaries) refresh the resident copy; writes stay versioned, so
+    a change made by another worker is caught at save time instead. Between
+    turns the copy is kept as a compact SessionRecord.
+    """
+    
+    def __init__(self, websocket: WebSocket, session_id: str, session_data: Dict[str, Any]):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.session_data = session_data
+        self._send_lock = asyncio.Lock()
+        self._announcer: Optional[asyncio.Task] = None
+    
+    @property
+    def session_data(self) -> Dict[str, Any]:
+        """A fresh session document built from the resident record"""
+        return self.record.to_dict()
+    
+    @session_data.setter
+    def session_data(self, session_data: Dict[str, Any]):
+        self.record = SessionRecord.from_dict(session_data)
+    
+    async def send(self, event: str, data: Any):
+        # Turn events and prefetch announcements come from different tasks
+        async with self._send_lock:
+            await self.websocket.send_text(dumps({"event": event, "data": jsonable_encoder(data)}).decode("utf-8"))
+    
+    def describe(self) -> Dict[str, Any]:
+        """The session and its current node, sent when the channel opens"""
+        node = self.record.current_node
+        choices_made = self.record.choices_made or 0
+        max_choices = self.record.max_choices or 15
+        current = {
+            "text": node.get("text", ""),
+            "mood": node.get("mood", "neutral"),
+            "cultural_info": node.get("cultural_info"),
+            "choices_remaining": max_choices - choices_made
+        }
+        if choices_made == 0:
+            current["introduction"] = node.get("introduction", "")
+        if node.get("choices") and choices_made < max_choices:
+            current["choices"] = node["choices"]
+        if "story_similarity" in node:
+            current["story_similarity"] = node["story_similarity"]
+        return {
+            "session_id": self.session_id,
+            "story_name": self.record.story_name,
+            "choices_made": choices_made,
+            "max_choices": max_choices,
+            "node": current
+        }
+    
+    async def run(self):
+        """Serve messages until the client disconnects or stays idle for WEBSOCKET_IDLE_TIMEOUT seconds"""
+        await self.send("session", self.describe())
+        self.announce_prefetched()
+        while True:
+            try:
+                message = await asyncio.wait_for(self.websocket.receive_json(), WEBSOCKET_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                await self.websocket.close(code=1000)
+                return
+            except json.JSONDecodeError:
+                await self.send("error", {"detail": "Messages must be JSON"})
+                continue
+            
+            if not isinstance(message, dict):
+                await self.send("error", {"detail": "Messages must be JSON objects"})
+            elif message.get("type") == "ping":
+                await self.send("pong", {})
+            elif not isinstance(message.get("choice_text"), str) or not message["choice_text"].strip():
+                await self.send("error", {"detail": "choice_text is required"})
+            elif not await self.play(message["choice_text"]):
+                await self.websocket.close(code=4404)
+                return
+    
+    async def play(self, choice_text: str) -> bool:
+        """Run one turn on the resident session, streaming its events; False if the session is gone"""
+        if self._announcer is not None:
+            self._announcer.cancel()
+        request = ContinueStoryRequest(
+            story_name=self.record.story_name,
+            session_id=self.session_id,
+            choice_text=choice_text
+        )
+        
+        outcome = "error"
+        async with story_manager.session_locks.hold(self.session_id):
+            session_data = self.session_data
+            if session_data.get("choices_made", 0) >= session_data.get("max_choices", 15):
+                await self.send("error", {"detail": "Story has already reached maximum choices limit"})
+            else:
+                async for event, data in continue_events(request, session_data, self.finalizer(request, session_data)):
+                    if event == "done":
+                        outcome = "ok"
+                    await self.send(event, data)
+            WEBSOCKET_TURNS.inc(outcome=outcome)
+            
+            if outcome == "error":
+                # The resident copy may be stale; take the stored one
+                session_data = await story_manager.load_session(self.session_id)
+                if session_data is None:
+                    await self.send("error", {"detail": "Session not found"})
+                    return False
+                story_manager.keep_resident(self.session_id, session_data)
+        
+        self.announce_prefetched()
+        return True
+    
+    def finalizer(self, request: ContinueStoryRequest, session_data: Dict[str, Any]):
+        """Apply a turn's node to the resident session (the save refreshes the resident copy)"""
+        async def finalize(gemini_response: Dict[str, Any]) -> Dict[str, Any]:
+            return await story_manager.apply_continue(request, session_data, gemini_response)
+        
+        return finalize
+    
+    def announce_prefetched(self):
+        """Push the continuation of each offered choice to the client once it is generated"""
+        if not PREFETCH_ENABLED:
+            return
+        choices = self.record.current_node.get("choices") or []
+        choices_made = self.record.choices_made or 0
+        if not choices or choices_made >= (self.record.max_choices or 15):
+            return
+        
+        def pending() -> Dict[asyncio.Task, str]:
+            tasks = {choice: story_manager.prefetcher.peek(self.session_id, choices_made, choice) for choice in choices}
+            return {task: choice for choice, task in tasks.items() if task is not None}
+        
+        tasks = pending()
+        if not tasks:
+            # The session was started or last played on another worker; prefetch where it is played now
+            story_manager.schedule_prefetch(self.session_id, self.session_data)
+            tasks = pending()
+        if tasks:
+            self._announcer = asyncio.create_task(self._announce(tasks))
+    
+    async def _announce(self, tasks: Dict[asyncio.Task, str]):
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    choice_text = tasks.pop(task)
+                    if not task.cancelled() and task.exception() is None:
+                        await self.send("prefetched", {"choice_text": choice_text, "node": task.result()})
+        except Exception:
+            pass  # Announcements are best effort (e.g. the client already disconnected)
+    
+    def close(self):
+        if self._announcer is not None:
+            self._announcer.cancel()
+
+@app.websocket("/stories/ws/{session_id}")
+async def story_websocket(websocket: WebSocket, session_id: str):
+    """Play a session over one WebSocket (see SessionChannel for the messages)"""
+    await websocket.accept()
+    metrics.begin_background("story_websocket")
+    try:
+        session_data = await story_manager.load_session(session_id)
+    except HTTPException as e:
+        await websocket.send_json({"event": "error", "data": {"detail": e.detail}})
+        await websocket.close(code=1011)
+        return
+    if session_data is None:
+        await websocket.send_json({"event": "error", "data": {"detail": "Session not found"}})
+        await websocket.close(code=4404)
+        return
+    
+    channel = SessionChannel(websocket, session_id, session_data)
+    channels = story_manager.session_channels.setdefault(session_id, set())
+    channels.add(channel)
+    try:
+        await channel.run()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        channels.discard(channel)
+        if not channels:
+            story_manager.session_channels.pop(session_id, None)
+        channel.close()
+
 @app.get("/stories/session/{session_id}")
 async def get_session(session_id: str):
     """Get session information"""
     try:
-        previous_answers = await story_manager.load_previous_answers()
+        session_data = await story_manager.load_session(session_id)
         
-        if session_id not in previous_answers:
+        if session_data is None:
             raise HTTPException(
                 status_code=404,
                 detail="Session not found"
             )
         
-        return previous_answers[session_id]
+        # Same JSON as the default response, without the generic encoder pass over the whole history
+        return Response(content=dumps(session_document(session_data)), media_type="application/json")
         
     except HTTPException:
         raise
@@ -548,16 +1821,12 @@ async def get_session(session_id: str):
 async def delete_session(session_id: str):
     """Delete a story session"""
     try:
-        previous_answers = await story_manager.load_previous_answers()
-        
-        if session_id not in previous_answers:
+        if not await story_manager.remove_session(session_id):
             raise HTTPException(
                 status_code=404,
                 detail="Session not found"
             )
-        
-        del previous_answers[session_id]
-        await story_manager.save_previous_answers(previous_answers)
+        story_manager.prefetcher.discard_session(session_id)
         
         return {"message": "Session deleted successfully"}
         
@@ -569,14 +1838,49 @@ async def delete_session(session_id: str):
             detail=f"Error deleting session: {str(e)}"
         )
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics (text exposition format)"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "gemini_api_configured": bool(GEMINI_API_KEY)
-    }
+    """Readiness check: 503 unless storage is reachable and Gemini is configured"""
+    storage = await story_manager.check_storage()
+    upstream = story_manager.check_upstream()
+    ready = storage["status"] == "ok" and upstream["status"] != "unconfigured"
+    if not ready:
+        status = "unavailable"
+    elif upstream["status"] == "degraded":
+        status = "degraded"  # Still ready: pooled/prefetched nodes and reads keep working
+    else:
+        status = "healthy"
+    
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content=jsonable_encoder({
+            "status": status,
+            "ready": ready,
+            "timestamp": datetime.now().isoformat(),
+            "checks": {
+                "storage": storage,
+                "upstream": upstream
+            },
+            "gemini_api_configured": bool(GEMINI_API_KEY),
+            "gemini_in_flight": story_manager.gemini_client.in_flight,
+            "session_backend": story_manager.session_store.backend,
+            "session_store": story_manager.session_store.stats,
+            "archived_sessions": storage.get("archived_sessions"),
+            "deduplicated_turns": story_manager.session_locks.deduplicated,
+            "single_flight": story_manager.single_flight.stats() if GEMINI_SINGLE_FLIGHT_ENABLED else None,
+            "prompt_budget": story_manager.prompt_budgeter.stats(),
+            "prefetch": story_manager.prefetcher.stats() if PREFETCH_ENABLED else None,
+            "context_cache": story_manager.context_cache.stats() if CONTEXT_CACHE_ENABLED else None,
+            "continuation_cache": story_manager.continuation_cache.stats() if CONTINUATION_CACHE_ENABLED else None,
+            "job_queue": story_manager.job_queue.stats() if JOB_MODE_ENABLED else None,
+            "opening_pool": story_manager.opening_pool.stats() if OPENING_POOL_ENABLED else None
+        })
+    )
 
 if __name__ == "__main__":
     import uvicorn  
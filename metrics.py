@@ -0,0 +1,234 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 1500, 2000, 3000, 4000, 8000, 16000)
+
+# Request-scoped state: what the current task is handling and its Server-Timing entries
+_current: contextvars.ContextVar[Optional["RequestTimings"]] = contextvars.ContextVar("metrics_request", default=None)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        if not self.labelnames and not self._values:
+            lines.append(f"{self.name} 0")
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> ([count per bucket], sum, count)
+        self._series: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (bucket_counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, inf)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time (e.g. existing hit/miss counters)"""
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Any], labelnames: Tuple[str, ...] = (),
+                 metric_type: str = "gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+        self.labelnames = labelnames
+        self.metric_type = metric_type
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        value = self.read()
+        samples = value.items() if isinstance(value, dict) else [((), value)]
+        for key, sample in samples:
+            if sample is None:
+                continue
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(sample)}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Any], labelnames: Tuple[str, ...] = (),
+              metric_type: str = "gauge") -> Gauge:
+        return self._metrics.setdefault(name, Gauge(name, help_text, read, labelnames, metric_type))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+stage_seconds = registry.histogram(
+    "story_stage_duration_seconds", "Time spent in each stage of a story request", ("handler", "stage")
+)
+
+
+class RequestTimings:
+    """Stage timings of one request (or background job); `handler` names it in metric labels"""
+
+    def __init__(self, scope: Optional[Dict[str, Any]] = None, name: Optional[str] = None, report: bool = True):
+        self.scope = scope
+        self.name = name
+        self.report = report
+        self.entries: List[Tuple[str, float]] = []
+        self.values: Dict[str, float] = {}
+
+    @property
+    def handler(self) -> str:
+        if self.name:
+            return self.name
+        endpoint = (self.scope or {}).get("endpoint")
+        return getattr(endpoint, "__name__", "unmatched")
+
+    def header(self) -> str:
+        totals: Dict[str, float] = {}
+        for name, elapsed in self.entries:
+            totals[name] = totals.get(name, 0.0) + elapsed
+        parts = [f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in totals.items()]
+        parts.extend(f'{name};desc="{value:g}"' for name, value in self.values.items())
+        return ", ".join(parts)
+
+
+def begin_background(name: str):
+    """Label stage metrics of a background task (prefetch, pool refill) without touching any response"""
+    _current.set(RequestTimings(name=name, report=False))
+
+
+def record_stage(name: str, elapsed: float):
+    current = _current.get()
+    stage_seconds.observe(elapsed, handler=current.handler if current else "background", stage=name)
+    if current is not None and current.report:
+        current.entries.append((name, elapsed))
+
+
+def annotate(name: str, value: float):
+    """Report a value of the current request (e.g. its prompt tokens) in the Server-Timing header"""
+    current = _current.get()
+    if current is not None and current.report:
+        current.values[name] = value
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as one stage of the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request and (optionally) adding a Server-Timing header"""
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+        self.requests = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency until the response starts",
+            ("method", "handler", "status")
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        current = RequestTimings(scope)
+        _current.set(current)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                self.requests.observe(
+                    time.perf_counter() - started,
+                    method=scope["method"],
+                    handler=current.handler,
+                    status=message["status"],
+                )
+                if self.server_timing and (current.entries or current.values):
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", current.header().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,256 @@
+"""Local stand-in for the Gemini generateContent API.
+
+Point the story server at it with
+    GEMINI_API_URL=http://127.0.0.1:9099/v1beta/models/mock:generateContent
+and any non-empty GEMINI_API_KEY. Both `:generateContent` and
+`:streamGenerateContent?alt=sse` are served, as well as `cachedContents`
+(create, TTL update, delete) so context caching can be exercised; uncached
+prompt text adds `--prefill-per-kchar` seconds of latency. Latency, error
+rate, stalls and the response format are configurable from the command line
+(or MOCK_GEMINI_* environment variables), e.g.
+
+    python mock_gemini.py --latency lognormal --latency-mean 1.5 --error-rate 0.02 --hang-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from story_parser import MOOD_OPTIONS
+
+SCENES = [
+    ("Koroghlu rides toward Chanlibel as a storm gathers over the plains.",
+     "Chanlibel is the mountain fortress where Koroghlu gathered his companions."),
+    ("Qirat stops at the edge of the river, ears turned toward the far bank.",
+     "Qirat, Koroghlu's horse, is said to have been raised from the sea stallions."),
+    ("Eyvaz waits by the caravanserai, unsure whom to trust.",
+     "Eyvaz became Koroghlu's adopted son and one of the bravest of his men."),
+    ("Bamsi Beyrek returns after sixteen years and finds the feast already begun.",
+     "The Book of Dede Gorgud collects twelve Oghuz tales told by the elder Dede Gorgud."),
+    ("The ashiq lifts his saz and the whole camp falls silent.",
+     "Ashiqs are travelling bards whose songs carry the dastans from village to village."),
+]
+CHOICES = [
+    "Ride into the storm", "Wait in the cave", "Call for Eyvaz", "Sing to Qirat",
+    "Turn back home", "Send a messenger to the khan", "Follow the river north",
+    "Challenge the stranger", "Hide the treasure", "Ask the elders for advice",
+]
+
+
+class MockSettings:
+    """Mock behaviour, read from MOCK_GEMINI_* env vars and overridable from the CLI"""
+
+    def __init__(self):
+        self.latency = os.getenv("MOCK_GEMINI_LATENCY", "fixed")  # fixed | uniform | lognormal
+        self.latency_mean = float(os.getenv("MOCK_GEMINI_LATENCY_MEAN", 0.5))
+        self.latency_spread = float(os.getenv("MOCK_GEMINI_LATENCY_SPREAD", 0.5))
+        self.error_rate = float(os.getenv("MOCK_GEMINI_ERROR_RATE", 0))
+        self.error_status = int(os.getenv("MOCK_GEMINI_ERROR_STATUS", 503))
+        self.hang_rate = float(os.getenv("MOCK_GEMINI_HANG_RATE", 0))  # Fraction of calls that stall
+        self.hang_seconds = float(os.getenv("MOCK_GEMINI_HANG_SECONDS", 60))
+        self.response_format = os.getenv("MOCK_GEMINI_FORMAT", "auto")  # auto | text | json | markdown
+        self.stream_chunk_chars = int(os.getenv("MOCK_GEMINI_STREAM_CHUNK", 24))
+        self.stream_chunk_delay = float(os.getenv("MOCK_GEMINI_STREAM_DELAY", 0.02))
+        self.seed = os.getenv("MOCK_GEMINI_SEED")
+        self.prefill_per_kchar = float(os.getenv("MOCK_GEMINI_PREFILL_PER_KCHAR", 0))  # Seconds per 1000 uncached chars
+        self.cache_min_chars = int(os.getenv("MOCK_GEMINI_CACHE_MIN_CHARS", 4096))  # Smaller prefixes are refused
+
+    def sample_latency(self, rng: random.Random) -> float:
+        if self.latency == "uniform":
+            return max(0.0, rng.uniform(self.latency_mean - self.latency_spread, self.latency_mean + self.latency_spread))
+        if self.latency == "lognormal":
+            # Parameterized so the distribution's mean is latency_mean; spread is sigma
+            sigma = self.latency_spread
+            mu = math.log(max(self.latency_mean, 1e-6)) - sigma * sigma / 2
+            return rng.lognormvariate(mu, sigma)
+        return self.latency_mean
+
+
+settings = MockSettings()
+rng = random.Random(settings.seed)
+counters = {"requests": 0, "stream_requests": 0, "errors": 0, "hangs": 0, "prompt_chars": 0, "cached_chars": 0}
+# cachedContents/<id> -> (text, expires at)
+cached_contents: Dict[str, Tuple[str, float]] = {}
+app = FastAPI(title="Mock Gemini API")
+
+
+def prompt_text(payload: Dict[str, Any]) -> str:
+    return "".join(part.get("text", "") for content in payload.get("contents", []) for part in content.get("parts", []))
+
+
+def canned_story(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick a scene shaped like the prompt asks: opening, continuation or ending"""
+    prompt = prompt_text(payload)
+    text, cultural_info = rng.choice(SCENES)
+    story = {"text": text, "mood": rng.choice(MOOD_OPTIONS), "cultural_info": cultural_info}
+    if "INTRODUCTION" in prompt:
+        story["introduction"] = "The old tale opens once more, and the saz begins to play."
+    if "should be the ENDING" in prompt:
+        story["story_similarity"] = round(rng.random(), 2)
+    else:
+        story["choices"] = rng.sample(CHOICES, 5)
+    return story
+
+
+def render(story: Dict[str, Any], payload: Dict[str, Any]) -> str:
+    response_format = settings.response_format
+    if response_format == "auto":
+        config = payload.get("generationConfig", {})
+        response_format = "json" if config.get("responseMimeType") == "application/json" else "text"
+    if response_format == "json":
+        return json.dumps(story, ensure_ascii=False)
+    bold = "**" if response_format == "markdown" else ""
+    lines = []
+    if story.get("introduction"):
+        lines.append(f"{bold}Introduction:{bold} {story['introduction']}")
+    lines.append(f"{bold}Text:{bold} {story['text']}")
+    lines.append(f"{bold}Mood:{bold} {story['mood']}")
+    if story.get("choices"):
+        lines.append(f"{bold}Choices:{bold}")
+        lines.extend(f"{i}. {choice}" for i, choice in enumerate(story["choices"], 1))
+    lines.append(f"{bold}Cultural_Info:{bold} {story['cultural_info']}")
+    if "story_similarity" in story:
+        lines.append(f"{bold}Similarity:{bold} {story['story_similarity']}")
+    return "\n".join(lines)
+
+
+def candidate(text: str, usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    result = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+    if usage:
+        result["usageMetadata"] = usage
+    return result
+
+
+def error_response(status: int, message: str) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"error": {"code": status, "message": message}})
+
+
+def parse_ttl(ttl: str) -> float:
+    return float(ttl.rstrip("s"))
+
+
+def chunks(text: str) -> List[str]:
+    size = max(1, settings.stream_chunk_chars)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@app.post("/v1beta/models/{model}")
+async def generate(model: str, request: Request):
+    """Serves both `<model>:generateContent` and `<model>:streamGenerateContent`"""
+    payload = await request.json()
+    streaming = model.endswith(":streamGenerateContent")
+    counters["requests"] += 1
+    if streaming:
+        counters["stream_requests"] += 1
+
+    prompt_chars = len(prompt_text(payload))
+    cached_chars = 0
+    if payload.get("cachedContent"):
+        cached = cached_contents.get(payload["cachedContent"])
+        if cached is None or cached[1] < time.time():
+            return error_response(403, "CachedContent not found (or permission denied)")
+        cached_chars = len(cached[0])
+    counters["prompt_chars"] += prompt_chars
+    counters["cached_chars"] += cached_chars
+    usage = {"promptTokenCount": (prompt_chars + cached_chars) // 4, "cachedContentTokenCount": cached_chars // 4}
+
+    # Time to first byte (base latency plus prefill of the uncached prompt, or a stall), then an optional injected failure
+    delay = settings.sample_latency(rng) + settings.prefill_per_kchar * prompt_chars / 1000
+    if rng.random() < settings.hang_rate:
+        counters["hangs"] += 1
+        delay = settings.hang_seconds
+    await asyncio.sleep(delay)
+    if rng.random() < settings.error_rate:
+        counters["errors"] += 1
+        return JSONResponse(
+            status_code=settings.error_status,
+            content={"error": {"code": settings.error_status, "message": "Injected mock failure", "status": "UNAVAILABLE"}},
+        )
+
+    if "running summary" in prompt_text(payload):
+        text = f"{rng.choice(SCENES)[0]} The companions remember every choice made so far."
+    else:
+        text = render(canned_story(payload), payload)
+    if not streaming:
+        return candidate(text, usage)
+
+    async def events():
+        for chunk in chunks(text):
+            yield f"data: {json.dumps(candidate(chunk, usage), ensure_ascii=False)}\r\n\r\n"
+            await asyncio.sleep(settings.stream_chunk_delay)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1beta/cachedContents")
+async def create_cached_content(request: Request):
+    payload = await request.json()
+    text = prompt_text(payload)
+    if len(text) < settings.cache_min_chars:
+        return error_response(400, f"Cached content is too small (min {settings.cache_min_chars} chars)")
+    name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+    cached_contents[name] = (text, time.time() + parse_ttl(payload.get("ttl", "3600s")))
+    return {"name": name, "model": payload.get("model"), "usageMetadata": {"totalTokenCount": len(text) // 4}}
+
+
+@app.patch("/v1beta/cachedContents/{cache_id}")
+async def update_cached_content(cache_id: str, request: Request):
+    name = f"cachedContents/{cache_id}"
+    if name not in cached_contents:
+        return error_response(404, "CachedContent not found")
+    payload = await request.json()
+    cached_contents[name] = (cached_contents[name][0], time.time() + parse_ttl(payload.get("ttl", "3600s")))
+    return {"name": name}
+
+
+@app.delete("/v1beta/cachedContents/{cache_id}")
+async def delete_cached_content(cache_id: str):
+    if cached_contents.pop(f"cachedContents/{cache_id}", None) is None:
+        return error_response(404, "CachedContent not found")
+    return {}
+
+
+@app.get("/mock/stats")
+async def stats():
+    return {**counters, "cached_contents": len(cached_contents)}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local mock of the Gemini generateContent API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9099)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default=settings.latency)
+    parser.add_argument("--latency-mean", type=float, default=settings.latency_mean, help="Seconds")
+    parser.add_argument("--latency-spread", type=float, default=settings.latency_spread,
+                        help="Half-width for uniform, sigma for lognormal")
+    parser.add_argument("--error-rate", type=float, default=settings.error_rate, help="Fraction of failed calls (0-1)")
+    parser.add_argument("--error-status", type=int, default=settings.error_status)
+    parser.add_argument("--hang-rate", type=float, default=settings.hang_rate, help="Fraction of calls that stall")
+    parser.add_argument("--hang-seconds", type=float, default=settings.hang_seconds)
+    parser.add_argument("--format", dest="response_format", choices=["auto", "text", "json", "markdown"],
+                        default=settings.response_format,
+                        help="auto answers JSON when the request asks for application/json")
+    parser.add_argument("--stream-chunk", dest="stream_chunk_chars", type=int, default=settings.stream_chunk_chars)
+    parser.add_argument("--stream-delay", dest="stream_chunk_delay", type=float, default=settings.stream_chunk_delay)
+    parser.add_argument("--seed", default=settings.seed)
+    parser.add_argument("--prefill-per-kchar", type=float, default=settings.prefill_per_kchar,
+                        help="Extra seconds of latency per 1000 uncached prompt chars")
+    parser.add_argument("--cache-min-chars", type=int, default=settings.cache_min_chars,
+                        help="Reject cachedContents smaller than this")
+    args = parser.parse_args()
+
+    for name, value in vars(args).items():
+        if hasattr(settings, name):
+            setattr(settings, name, value)
+    rng.seed(settings.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,241 @@
+"""Local stand-in for the subset of Redis used by the session backend.
+
+Speaks RESP2 or RESP3 (after HELLO 3) and keeps everything in memory; enough
+to run the story server with SESSION_BACKEND=redis (and several workers)
+without a Redis install:
+
+    python mock_redis.py --port 6399 &
+    SESSION_BACKEND=redis REDIS_URL=redis://127.0.0.1:6399/0 uvicorn main:app --workers 4
+
+Supported: HELLO, PING, GET, SET (NX/EX/PX), DEL, EXPIRE, PEXPIRE, TTL, HGET,
+HMGET, HSET, HGETALL, DBSIZE, FLUSHALL, WATCH/UNWATCH/MULTI/EXEC/DISCARD, plus no-op
+SELECT and CLIENT.
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Store:
+    def __init__(self):
+        self.values: Dict[str, Any] = {}  # str or dict (hash)
+        self.expires: Dict[str, float] = {}
+        self.versions: Dict[str, int] = {}  # Bumped on every write, checked by EXEC for WATCHed keys
+
+    def alive(self, key: str) -> bool:
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.time():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+            self.touch(key)
+        return key in self.values
+
+    def touch(self, key: str):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def version(self, key: str) -> int:
+        self.alive(key)
+        return self.versions.get(key, 0)
+
+
+class Error(Exception):
+    pass
+
+
+def encode(value: Any, resp3: bool = False) -> bytes:
+    if value is None:
+        return b"_\r\n" if resp3 else b"$-1\r\n"
+    if isinstance(value, Error):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, bool):
+        return b":1\r\n" if value else b":0\r\n"
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, dict):
+        if not resp3:
+            return encode([item for pair in value.items() for item in pair])
+        return b"%" + str(len(value)).encode() + b"\r\n" + b"".join(encode(k, resp3) + encode(v, resp3) for k, v in value.items())
+    if isinstance(value, list):
+        return b"*" + str(len(value)).encode() + b"\r\n" + b"".join(encode(item, resp3) for item in value)
+    if isinstance(value, Status):
+        return f"+{value.text}\r\n".encode()
+    data = value if isinstance(value, bytes) else str(value).encode("utf-8", "surrogateescape")
+    return b"$" + str(len(data)).encode() + b"\r\n" + data + b"\r\n"
+
+
+class Status:
+    def __init__(self, text: str):
+        self.text = text
+
+
+OK = Status("OK")
+
+
+def execute(store: Store, command: str, args: List[str]) -> Any:
+    if command == "PING":
+        return Status("PONG") if not args else args[0]
+    if command in ("SELECT", "CLIENT"):
+        return OK
+    if command == "GET":
+        if not store.alive(args[0]):
+            return None
+        value = store.values[args[0]]
+        if isinstance(value, dict):
+            raise Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+    if command == "SET":
+        key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+        if "NX" in options and store.alive(key):
+            return None
+        store.values[key] = value
+        store.expires.pop(key, None)
+        for flag, scale in (("EX", 1.0), ("PX", 0.001)):
+            if flag in options:
+                store.expires[key] = time.time() + float(args[2 + options.index(flag) + 1]) * scale
+        store.touch(key)
+        return OK
+    if command == "DEL":
+        removed = 0
+        for key in args:
+            if store.alive(key):
+                del store.values[key]
+                store.expires.pop(key, None)
+                store.touch(key)
+                removed += 1
+        return removed
+    if command in ("EXPIRE", "PEXPIRE"):
+        if not store.alive(args[0]):
+            return 0
+        store.expires[args[0]] = time.time() + float(args[1]) * (1.0 if command == "EXPIRE" else 0.001)
+        return 1
+    if command == "TTL":
+        if not store.alive(args[0]):
+            return -2
+        expires = store.expires.get(args[0])
+        return -1 if expires is None else int(expires - time.time())
+    if command == "HGET":
+        if not store.alive(args[0]):
+            return None
+        return store.values[args[0]].get(args[1])
+    if command == "HMGET":
+        if not store.alive(args[0]):
+            return [None] * (len(args) - 1)
+        return [store.values[args[0]].get(field) for field in args[1:]]
+    if command == "HGETALL":
+        if not store.alive(args[0]):
+            return []
+        return [item for pair in store.values[args[0]].items() for item in pair]
+    if command == "HSET":
+        store.alive(args[0])
+        value = store.values.setdefault(args[0], {})
+        added = 0
+        for field, item in zip(args[1::2], args[2::2]):
+            added += field not in value
+            value[field] = item
+        store.touch(args[0])
+        return added
+    if command == "DBSIZE":
+        return sum(1 for key in list(store.values) if store.alive(key))
+    if command == "FLUSHALL":
+        for key in list(store.values):
+            store.touch(key)
+        store.values.clear()
+        store.expires.clear()
+        return OK
+    raise Error(f"ERR unknown command '{command}'")
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[str]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.decode().split()  # Inline command (e.g. from telnet)
+    args = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        # Values may be binary; surrogateescape keeps their bytes intact
+        args.append((await reader.readexactly(size + 2))[:-2].decode("utf-8", "surrogateescape"))
+    return args
+
+
+def serve(store: Store):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        watched: Dict[str, int] = {}
+        queued: Optional[List[Tuple[str, List[str]]]] = None
+        resp3 = False
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                command, rest = args[0].upper(), args[1:]
+                if command == "HELLO":
+                    protocol = int(rest[0]) if rest else 2
+                    if protocol in (2, 3):
+                        resp3 = protocol == 3
+                        reply = {"server": "redis", "version": "7.0.0", "proto": protocol, "mode": "standalone", "role": "master"}
+                    else:
+                        reply = Error("NOPROTO unsupported protocol version")
+                elif command == "WATCH":
+                    watched.update({key: store.version(key) for key in rest})
+                    reply = OK
+                elif command == "UNWATCH":
+                    watched.clear()
+                    reply = OK
+                elif command == "MULTI":
+                    queued = []
+                    reply = OK
+                elif command == "DISCARD":
+                    queued = None
+                    watched.clear()
+                    reply = OK
+                elif command == "EXEC":
+                    if queued is None:
+                        reply = Error("ERR EXEC without MULTI")
+                    elif any(store.version(key) != version for key, version in watched.items()):
+                        reply = None  # Aborted: a watched key changed
+                    else:
+                        reply = []
+                        for name, command_args in queued:
+                            try:
+                                reply.append(execute(store, name, command_args))
+                            except Error as e:
+                                reply.append(e)
+                    queued = None
+                    watched.clear()
+                elif queued is not None:
+                    queued.append((command, rest))
+                    reply = Status("QUEUED")
+                else:
+                    try:
+                        reply = execute(store, command, rest)
+                    except Error as e:
+                        reply = e
+                    except (IndexError, ValueError):
+                        reply = Error(f"ERR wrong number of arguments for '{command.lower()}' command")
+                writer.write(encode(reply, resp3))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def main(host: str, port: int):
+    server = await asyncio.start_server(serve(Store()), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an in-memory stand-in for the Redis commands the session store uses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6399)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Set, Tuple
+
+PoolKey = Tuple[str, int]
+
+
+class OpeningPool:
+    """Background-refilled pool of pre-generated opening nodes.
+
+    Openings are interchangeable per (story, max_choices bucket), so a start
+    request can pop a ready node instead of waiting for a full generation.
+    Keys are refilled up to `target_depth` while they are in use (or pinned),
+    entries older than `max_age` are evicted, and keys idle for `idle_ttl`
+    stop being refilled.
+    """
+
+    def __init__(self, buckets: Iterable[int], target_depth: int = 3, max_age: float = 3600,
+                 idle_ttl: float = 1800, max_concurrent_refills: int = 2):
+        self.buckets = sorted(buckets)
+        self.target_depth = target_depth
+        self.max_age = max_age
+        self.idle_ttl = idle_ttl
+        self._entries: Dict[PoolKey, Deque[Tuple[float, Dict[str, Any]]]] = {}
+        self._last_used: Dict[PoolKey, float] = {}
+        self._pinned: Set[PoolKey] = set()
+        self._pending: Dict[PoolKey, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(max_concurrent_refills)
+        self._generate: Optional[Callable[[PoolKey], Awaitable[Dict[str, Any]]]] = None
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+        self.evicted = 0
+
+    def bucket_for(self, max_choices: int) -> Optional[int]:
+        """Smallest configured bucket that covers `max_choices`"""
+        for bucket in self.buckets:
+            if bucket >= max_choices:
+                return bucket
+        return None
+
+    def pin(self, key: PoolKey):
+        """Keep a key filled even when nobody has requested it yet (e.g. before a class starts)"""
+        self._pinned.add(key)
+        self._last_used.setdefault(key, time.monotonic())
+        self.refill(key)
+
+    def pop(self, key: PoolKey) -> Optional[Dict[str, Any]]:
+        """Take a ready opening for `key`, scheduling a refill either way"""
+        self._last_used[key] = time.monotonic()
+        self._evict_expired(key)
+        queue = self._entries.get(key)
+        node = queue.popleft()[1] if queue else None
+        if node is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        self.refill(key)
+        return node
+
+    def refill(self, key: PoolKey):
+        if self._generate is None:
+            return
+        missing = self.target_depth - len(self._entries.get(key, ())) - self._pending.get(key, 0)
+        for _ in range(missing):
+            self._pending[key] = self._pending.get(key, 0) + 1
+            task = asyncio.create_task(self._fill(key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fill(self, key: PoolKey):
+        try:
+            async with self._semaphore:
+                node = await self._generate(key)
+            self._entries.setdefault(key, deque()).append((time.monotonic(), node))
+            self.generated += 1
+        except Exception:
+            self.failures += 1
+        finally:
+            self._pending[key] -= 1
+
+    def _evict_expired(self, key: PoolKey):
+        queue = self._entries.get(key)
+        cutoff = time.monotonic() - self.max_age
+        while queue and queue[0][0] < cutoff:
+            queue.popleft()
+            self.evicted += 1
+
+    async def run(self, generate: Callable[[PoolKey], Awaitable[Dict[str, Any]]], interval: float = 5):
+        """Refill loop: keep active keys at target depth and drop idle ones"""
+        self._generate = generate
+        for key in self._pinned:
+            self.refill(key)
+        try:
+            while True:
+                now = time.monotonic()
+                for key, last_used in list(self._last_used.items()):
+                    if key not in self._pinned and now - last_used > self.idle_ttl:
+                        self.evicted += len(self._entries.pop(key, ()))
+                        del self._last_used[key]
+                        continue
+                    self._evict_expired(key)
+                    self.refill(key)
+                await asyncio.sleep(interval)
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "ready": {f"{story}:{bucket}": len(queue) for (story, bucket), queue in self._entries.items()},
+            "refilling": sum(self._pending.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "failures": self.failures,
+            "evicted": self.evicted,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,175 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+INDEX_VERSION = 1
+
+# Azerbaijani letters folded to the Latin spellings used in English retellings
+# ("Çənlibel" -> "canlibel", "Koroğlu" -> "koroglu"), applied to both sides.
+_FOLD_TABLE = str.maketrans({
+    "ə": "a", "ı": "i", "ö": "o", "ü": "u", "ğ": "g", "ş": "s", "ç": "c",
+    "â": "a", "î": "i", "û": "u",
+})
+_DIGRAPHS = (("gh", "g"), ("sh", "s"), ("ch", "c"), ("kh", "x"))
+_TOKEN_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+
+# Prefix length used as a cheap stemmer for agglutinative suffixes
+STEM_LENGTH = 6
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from had has have he her his i in is it its of on or she that the
+their them they this to was were what which who will with you your
+ve da de ki bu o bir ne ile ama hem ise icin gibi daha sonra onun ona onu bele hec
+idi oldu olan olub var yox men sen biz siz onlar
+""".split())
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase with Azerbaijani dotted/dotless I rules, then fold letters and digraphs"""
+    text = text.replace("İ", "i").replace("I", "ı").lower()
+    text = text.translate(_FOLD_TABLE)
+    for digraph, letter in _DIGRAPHS:
+        text = text.replace(digraph, letter)
+    return text
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalize and split text into prefix-stemmed terms, dropping stopwords"""
+    terms = []
+    for token in _TOKEN_RE.findall(normalize_text(text)):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        terms.append(token[:STEM_LENGTH])
+    return terms
+
+
+def chunk_text(text: str, chunk_chars: int = 800) -> List[str]:
+    """Split text into passages of roughly `chunk_chars`, on paragraph and sentence boundaries"""
+    sentences = []
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.strip()
+        if paragraph:
+            sentences.extend(s for s in _SENTENCE_RE.split(paragraph) if s)
+
+    chunks = []
+    current: List[str] = []
+    size = 0
+    for sentence in sentences:
+        if current and size + len(sentence) > chunk_chars:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        current.append(sentence)
+        size += len(sentence) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class PassageIndex:
+    """BM25 index over the passages of one story file"""
+
+    def __init__(self, passages: List[str], postings: Dict[str, List[Tuple[int, int]]],
+                 lengths: List[int], source_mtime_ns: int = 0, source_size: int = 0, chunk_chars: int = 0,
+                 k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.postings = postings
+        self.lengths = lengths
+        self.source_mtime_ns = source_mtime_ns
+        self.source_size = source_size
+        self.chunk_chars = chunk_chars
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        count = len(passages)
+        self.idf = {
+            term: math.log(1 + (count - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in postings.items()
+        }
+
+    @classmethod
+    def build(cls, text: str, chunk_chars: int = 800, source_mtime_ns: int = 0, source_size: int = 0) -> "PassageIndex":
+        passages = chunk_text(text, chunk_chars)
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for idx, passage in enumerate(passages):
+            terms = tokenize(passage)
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, []).append((idx, tf))
+        return cls(passages, postings, lengths, source_mtime_ns, source_size, chunk_chars)
+
+    def search(self, query: str, top_k: int = 4) -> List[Tuple[int, float]]:
+        """Return up to `top_k` (passage index, score) pairs, best first"""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for idx, tf in plist:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[idx] / self.avg_length)
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def context_for(self, query: str, budget_chars: int, top_k: int = 4) -> Optional[str]:
+        """Join the best matching passages (in story order) within a character budget"""
+        selected: Dict[int, str] = {}
+        used = 0
+        for idx, _score in self.search(query, top_k):
+            passage = self.passages[idx]
+            if used + len(passage) > budget_chars:
+                if selected:
+                    continue
+                passage = passage[:budget_chars]
+            selected[idx] = passage
+            used += len(passage) + 5
+        if not selected:
+            return None
+        return "\n...\n".join(selected[idx] for idx in sorted(selected))
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": INDEX_VERSION,
+            "source_mtime_ns": self.source_mtime_ns,
+            "source_size": self.source_size,
+            "chunk_chars": self.chunk_chars,
+            "passages": self.passages,
+            "lengths": self.lengths,
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PassageIndex":
+        postings = {term: [tuple(p) for p in plist] for term, plist in data["postings"].items()}
+        return cls(data["passages"], postings, data["lengths"], data["source_mtime_ns"], data["source_size"],
+                   data["chunk_chars"])
+
+
+def load_or_build_index(story_path: str, index_dir: str, chunk_chars: int = 800) -> PassageIndex:
+    """Load a persisted index for `story_path`, rebuilding it if the story or the chunk size changed"""
+    stat = os.stat(story_path)
+    index_path = os.path.join(index_dir, os.path.basename(story_path) + ".index.json")
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if (data.get("version") == INDEX_VERSION
+                and data.get("source_mtime_ns") == stat.st_mtime_ns
+                and data.get("source_size") == stat.st_size
+                and data.get("chunk_chars") == chunk_chars):
+            return PassageIndex.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with open(story_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    index = PassageIndex.build(text, chunk_chars, stat.st_mtime_ns, stat.st_size)
+    os.makedirs(index_dir, exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"  # Per process: workers may build the same index at once
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, index_path)
+    return index
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+PrefetchKey = Tuple[str, int, str]
+
+
+def _consume_exception(task: asyncio.Task):
+    # Failed or discarded prefetches are expected; don't log "exception never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+class ContinuationPrefetcher:
+    """Speculatively generates the continuation of every offered choice.
+
+    Results are keyed by (session_id, choices_made, choice_text). Scheduling a
+    new turn for a session discards that session's older entries, and taking
+    an entry cancels its still-running siblings.
+    """
+
+    def __init__(self, max_per_session: int = 5, max_in_flight: int = 10, max_entries: int = 500, ttl: float = 900):
+        self.max_per_session = max_per_session
+        self.max_in_flight = max_in_flight
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._tasks: Dict[PrefetchKey, asyncio.Task] = {}
+        self._created: Dict[PrefetchKey, float] = {}
+        self._by_session: Dict[str, Set[PrefetchKey]] = {}
+        self.scheduled = 0
+        self.skipped = 0
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    @staticmethod
+    def make_key(session_id: str, choices_made: int, choice_text: str) -> PrefetchKey:
+        return session_id, choices_made, " ".join(choice_text.split()).lower()
+
+    @property
+    def in_flight(self) -> int:
+        return sum(1 for task in self._tasks.values() if not task.done())
+
+    def schedule(self, session_id: str, choices_made: int, choices: List[str],
+                 generate: Callable[[str], Awaitable[Dict[str, Any]]]):
+        """Start background generation for up to `max_per_session` choices"""
+        self.discard_session(session_id)
+        self._expire()
+        for choice_text in choices[:self.max_per_session]:
+            if self.in_flight >= self.max_in_flight or len(self._tasks) >= self.max_entries:
+                self.skipped += 1
+                continue
+            key = self.make_key(session_id, choices_made, choice_text)
+            task = asyncio.create_task(generate(choice_text))
+            task.add_done_callback(_consume_exception)
+            self._tasks[key] = task
+            self._created[key] = time.monotonic()
+            self._by_session.setdefault(session_id, set()).add(key)
+            self.scheduled += 1
+
+    async def take(self, session_id: str, choices_made: int, choice_text: str) -> Optional[Dict[str, Any]]:
+        """Return the prefetched continuation for a choice (waiting if it is still running)"""
+        key = self.make_key(session_id, choices_made, choice_text)
+        task = self._tasks.pop(key, None)
+        self._created.pop(key, None)
+        if session_id in self._by_session:
+            self._by_session[session_id].discard(key)
+        self.discard_session(session_id)
+        if task is None:
+            self.misses += 1
+            return None
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            self.misses += 1
+            return None
+        except Exception:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def peek(self, session_id: str, choices_made: int, choice_text: str) -> Optional[asyncio.Task]:
+        """The generation task for a choice without taking it (e.g. to announce it once ready)"""
+        return self._tasks.get(self.make_key(session_id, choices_made, choice_text))
+
+    def discard_session(self, session_id: str):
+        """Cancel and drop every prefetched entry of a session"""
+        for key in self._by_session.pop(session_id, set()):
+            task = self._tasks.pop(key, None)
+            self._created.pop(key, None)
+            if task is not None:
+                task.cancel()
+                self.discarded += 1
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for key in [key for key, created in self._created.items() if created < cutoff]:
+            task = self._tasks.pop(key)
+            del self._created[key]
+            self._by_session.get(key[0], set()).discard(key)
+            task.cancel()
+            self.discarded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "in_flight": self.in_flight,
+            "stored": len(self._tasks),
+            "hits": self.hits,
+            "misses": self.misses,
+            "discarded": self.discarded,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,134 @@
+import math
+from typing import Any, Callable, Dict, Optional
+
+
+class TokenEstimator:
+    """Fast local estimate of the tokens a text costs upstream.
+
+    Counts characters per token separately for ASCII (English instructions
+    and generated nodes) and other scripts (Azerbaijani story text, which
+    splits into more tokens), then applies a scale calibrated online from
+    the prompt token counts Gemini reports.
+    """
+
+    def __init__(self, chars_per_token: float = 4.0, non_ascii_chars_per_token: float = 1.5, smoothing: float = 0.1):
+        self.chars_per_token = chars_per_token
+        self.non_ascii_chars_per_token = non_ascii_chars_per_token
+        self.smoothing = smoothing
+        self.scale = 1.0
+        self.calibrations = 0
+
+    def _raw(self, text: str) -> float:
+        ascii_chars = len(text.encode("ascii", "ignore"))
+        return ascii_chars / self.chars_per_token + (len(text) - ascii_chars) / self.non_ascii_chars_per_token
+
+    def estimate(self, text: str) -> int:
+        return math.ceil(self._raw(text) * self.scale) if text else 0
+
+    def calibrate(self, text: str, reported_tokens: int):
+        """Move the scale toward the ratio of a reported token count to the raw estimate of its text"""
+        raw = self._raw(text)
+        if raw <= 0 or reported_tokens <= 0:
+            return
+        ratio = min(4.0, max(0.25, reported_tokens / raw))
+        self.scale += self.smoothing * (ratio - self.scale)
+        self.calibrations += 1
+
+    def truncate(self, text: str, tokens: int) -> str:
+        """Longest prefix of `text` estimated to fit in `tokens`"""
+        if tokens <= 0:
+            return ""
+        estimated = self.estimate(text)
+        if estimated <= tokens:
+            return text
+        # Assume the density of the whole text, then walk back over any denser stretch
+        end = len(text) * tokens // estimated
+        while end > 0 and self.estimate(text[:end]) > tokens:
+            end = end * 9 // 10
+        return text[:end]
+
+
+class PromptBudget:
+    """Token budget of one prompt and the tokens charged to each of its sections"""
+
+    def __init__(self, total: int, estimator: TokenEstimator):
+        self.total = total
+        self.estimator = estimator
+        self.sections: Dict[str, int] = {}
+        self.unbudgeted: Dict[str, int] = {}  # e.g. the context-cached prefix
+
+    @property
+    def used(self) -> int:
+        return sum(self.sections.values())
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.used)
+
+    def charge(self, section: str, text: str) -> int:
+        """Count a required section against the budget, even beyond it"""
+        tokens = self.estimator.estimate(text)
+        self.sections[section] = self.sections.get(section, 0) + tokens
+        return tokens
+
+    def fit(self, section: str, text: str, tokens: Optional[int] = None) -> str:
+        """Trim an optional section to `tokens` (default: all that remains) and charge it"""
+        limit = self.remaining if tokens is None else min(tokens, self.remaining)
+        fitted = self.estimator.truncate(text, limit)
+        if fitted:
+            self.charge(section, fitted)
+        return fitted
+
+    def note(self, section: str, text: str):
+        """Record a section sent outside the budget"""
+        self.unbudgeted[section] = self.unbudgeted.get(section, 0) + self.estimator.estimate(text)
+
+    def report(self) -> Dict[str, Any]:
+        return {"budget": self.total, "used": self.used, "sections": {**self.sections, **self.unbudgeted}}
+
+
+class PromptBudgeter:
+    """Hands out per-request prompt budgets sized by the recent upstream latency.
+
+    While the observed p95 latency is within `latency_slo` seconds every
+    prompt gets `max_tokens`. Above it the budget shrinks in proportion
+    (slo / p95), down to `min_tokens`, so prompts carry less context while
+    the upstream is slow and grow back as it recovers.
+    """
+
+    def __init__(self, estimator: TokenEstimator, max_tokens: int, min_tokens: int, latency_slo: float,
+                 latency_p95: Callable[[], Optional[float]]):
+        self.estimator = estimator
+        self.max_tokens = max_tokens
+        self.min_tokens = min(min_tokens, max_tokens)
+        self.latency_slo = latency_slo
+        self.latency_p95 = latency_p95
+        self.issued = 0
+        self.shrunk = 0
+
+    def limit(self) -> int:
+        p95 = self.latency_p95()
+        if not p95 or self.latency_slo <= 0 or p95 <= self.latency_slo:
+            return self.max_tokens
+        return max(self.min_tokens, int(self.max_tokens * self.latency_slo / p95))
+
+    def new_budget(self) -> PromptBudget:
+        limit = self.limit()
+        self.issued += 1
+        if limit < self.max_tokens:
+            self.shrunk += 1
+        return PromptBudget(limit, self.estimator)
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency_p95()
+        return {
+            "max_tokens": self.max_tokens,
+            "min_tokens": self.min_tokens,
+            "current_tokens": self.limit(),
+            "latency_slo_s": self.latency_slo,
+            "latency_p95_s": round(p95, 3) if p95 is not None else None,
+            "issued": self.issued,
+            "shrunk": self.shrunk,
+            "estimator_scale": round(self.estimator.scale, 3),
+            "calibrations": self.estimator.calibrations,
+        }
@@ -42,6 +42,10 @@ if ! grep -q "GEMINI_API_KEY=AIzaSy" .env; then
     echo "Please add your Gemini API key to the .env file."
 fi
 
+# Precompute chapter summaries (only rebuilds stories that changed)
+echo "📚 Building chapter summaries..."
+python story_chapters.py
+
 echo ""
 echo "🚀 Starting the API server..."
 echo "📍 Server will be available at: http://localhost:8000"
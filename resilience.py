@@ -0,0 +1,293 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Upstream is considered unhealthy; the call was not attempted"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """No attempt finished within the request deadline"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures, 429 and 5xx are worth another attempt; other errors are not"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class RetryBudget:
+    """Token bucket limiting retries and hedges to a fraction of calls.
+
+    Every call deposits `ratio` tokens, the bucket also refills at
+    `min_per_second` so low traffic can still retry, and each retry or hedge
+    withdraws one token.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 20):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._updated = time.monotonic()
+        self.exhausted = 0
+
+    def _refill(self, amount: float = 0.0):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + amount + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive upstream failures and fails fast for `reset_timeout`.
+
+    After the timeout the circuit is half-open: calls go through again, the
+    first success closes it and the first failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = "half_open"
+        return True
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.consecutive_failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.opened += 1
+
+
+class ResilientCaller:
+    """Deadline, hedging, jittered retries (within a retry budget) and a circuit breaker around upstream calls.
+
+    A hedge is a second identical attempt fired when the first has not
+    answered after the recent p`hedge_percentile` latency; whichever finishes
+    first wins and the other is cancelled.
+    """
+
+    def __init__(self, deadline: float = 25, max_attempts: int = 3, base_backoff: float = 0.25,
+                 max_backoff: float = 4, hedge_enabled: bool = True, hedge_percentile: float = 95,
+                 hedge_min_delay: float = 1.0, hedge_min_samples: int = 20,
+                 budget: Optional[RetryBudget] = None, breaker: Optional[CircuitBreaker] = None):
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()  # Whole calls; drives hedging
+        self.first_item_latency = LatencyTracker()  # Streamed calls, until their first item
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadlines_exceeded = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None until enough latencies were observed"""
+        if not self.hedge_enabled or len(self.latency) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.percentile(self.hedge_percentile))
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.retry_after())
+
+    async def _backoff_or_raise(self, attempt: int, deadline_at: float, error: BaseException):
+        """Sleep a full-jitter backoff before attempt `attempt + 1`, or re-raise if no retry is allowed"""
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        if (attempt >= self.max_attempts or time.monotonic() + delay >= deadline_at
+                or not self.breaker.allow() or not self.budget.withdraw()):
+            raise error
+        self.retries += 1
+        await asyncio.sleep(delay)
+
+    async def call(self, operation: Callable[[], Awaitable[T]], hedge: bool = True) -> T:
+        """Run `operation` (a factory, called once per attempt) until one attempt succeeds"""
+        self._check_circuit()
+        self.calls += 1
+        self.budget.deposit()
+        deadline_at = time.monotonic() + self.deadline
+        try:
+            return await asyncio.wait_for(self._attempts(operation, hedge, deadline_at), self.deadline)
+        except asyncio.TimeoutError:
+            self.deadlines_exceeded += 1
+            self.breaker.record_failure()
+            raise DeadlineExceeded(f"No response within {self.deadline:.0f}s")
+
+    async def _attempts(self, operation: Callable[[], Awaitable[T]], hedge: bool, deadline_at: float) -> T:
+        attempt = 1
+        while True:
+            try:
+                return await self._hedged(operation) if hedge else await self._timed(operation)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                await self._backoff_or_raise(attempt, deadline_at, e)
+                attempt += 1
+
+    async def _timed(self, operation: Callable[[], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        try:
+            result = await operation()
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.record_failure()
+            raise
+        self.latency.record(time.monotonic() - started)
+        self.breaker.record_success()
+        return result
+
+    async def _hedged(self, operation: Callable[[], Awaitable[T]]) -> T:
+        primary = asyncio.ensure_future(self._timed(operation))
+        pending = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, pending = await asyncio.wait(pending, timeout=delay)
+                if not done and self.breaker.allow() and self.budget.withdraw():
+                    self.hedges += 1
+                    pending.add(asyncio.ensure_future(self._timed(operation)))
+                pending |= done
+
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Relay a streamed call; retries (no hedging) happen only before the first item arrives.
+
+        The deadline bounds the time to the first item.
+        """
+        self._check_circuit()
+        self.calls += 1
+        self.budget.deposit()
+        deadline_at = time.monotonic() + self.deadline
+        attempt = 1
+        while True:
+            started = time.monotonic()
+            stream = open_stream()
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline_at - started))
+                break
+            except StopAsyncIteration:
+                self.breaker.record_success()
+                return
+            except asyncio.TimeoutError:
+                await stream.aclose()
+                self.deadlines_exceeded += 1
+                self.breaker.record_failure()
+                raise DeadlineExceeded(f"No response within {self.deadline:.0f}s")
+            except Exception as e:
+                await stream.aclose()
+                if not is_retryable(e):
+                    raise
+                self.breaker.record_failure()
+                await self._backoff_or_raise(attempt, deadline_at, e)
+                attempt += 1
+
+        self.first_item_latency.record(time.monotonic() - started)
+        yield first
+        try:
+            async for item in stream:
+                yield item
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(95)
+        first_item_p95 = self.first_item_latency.percentile(95)
+        return {
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "circuit_rejected": self.breaker.rejected,
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadlines_exceeded": self.deadlines_exceeded,
+            "retry_budget_tokens": round(self.budget.tokens, 2),
+            "retry_budget_exhausted": self.budget.exhausted,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "first_item_p95_ms": round(first_item_p95 * 1000, 1) if first_item_p95 is not None else None,
+        }
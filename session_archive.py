@@ -0,0 +1,129 @@
+import asyncio
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from session_codec import decode_session
+from session_store import SessionStore
+
+
+class SessionArchive:
+    """Cold storage for finished or idle sessions.
+
+    Sessions are appended to gzip segment files (one gzip member per session,
+    so a single record can be decompressed on its own) and located through a
+    small SQLite index of (segment, offset, length). Segments are append-only
+    and roll over once they reach `segment_max_bytes`.
+    """
+
+    def __init__(self, archive_dir: str, segment_max_bytes: int = 64 * 1024 * 1024):
+        self.archive_dir = archive_dir
+        self.segment_max_bytes = segment_max_bytes
+        os.makedirs(archive_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(archive_dir, "index.db"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS archived_sessions ("
+            "session_id TEXT PRIMARY KEY, "
+            "segment TEXT NOT NULL, "
+            "offset INTEGER NOT NULL, "
+            "length INTEGER NOT NULL, "
+            "archived_at REAL)"
+        )
+
+    def _current_segment(self) -> str:
+        segments = sorted(name for name in os.listdir(self.archive_dir) if name.startswith("segment-"))
+        if segments:
+            latest = segments[-1]
+            if os.path.getsize(os.path.join(self.archive_dir, latest)) < self.segment_max_bytes:
+                return latest
+            number = int(latest[len("segment-"):].split(".")[0]) + 1
+        else:
+            number = 1
+        return f"segment-{number:06d}.jsonl.gz"
+
+    def append_sync(self, rows: List[Tuple[str, Any]]) -> int:
+        """Append (session_id, session as stored in the hot store) rows and index them"""
+        if not rows:
+            return 0
+        with self._lock:
+            segment = self._current_segment()
+            index_rows = []
+            with open(os.path.join(self.archive_dir, segment), 'ab') as f:
+                offset = f.tell()
+                for session_id, data in rows:
+                    record = json.dumps({"session_id": session_id, "data": decode_session(data)}, ensure_ascii=False)
+                    member = gzip.compress((record + "\n").encode("utf-8"))
+                    f.write(member)
+                    index_rows.append((session_id, segment, offset, len(member), time.time()))
+                    offset += len(member)
+                f.flush()
+                os.fsync(f.fileno())
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO archived_sessions (session_id, segment, offset, length, archived_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                index_rows,
+            )
+        return len(rows)
+
+    def get_sync(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT segment, offset, length FROM archived_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        segment, offset, length = row
+        with open(os.path.join(self.archive_dir, segment), 'rb') as f:
+            f.seek(offset)
+            member = f.read(length)
+        return json.loads(gzip.decompress(member).decode("utf-8"))["data"]
+
+    def delete_sync(self, session_id: str) -> bool:
+        """Drop a session from the index (segment bytes stay until segments are rewritten)"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM archived_sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM archived_sessions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_sync, session_id)
+
+    async def delete(self, session_id: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.delete_sync, session_id)
+
+
+def compact_sessions_sync(store: SessionStore, archive: SessionArchive, idle_before: str,
+                          completed_before: str, batch_size: int = 500) -> int:
+    """Move completed and idle sessions from the hot store into the archive.
+
+    Rows are archived (and fsynced) before they are removed from the hot
+    store, and only removed if they were not updated in the meantime.
+    """
+    moved = 0
+    after = ""
+    while True:
+        rows = store.select_archivable_sync(idle_before, completed_before, batch_size, after)
+        if not rows:
+            return moved
+        archive.append_sync([(session_id, data) for session_id, data, _ in rows])
+        moved += store.delete_unchanged_sync([(session_id, updated_at) for session_id, _, updated_at in rows])
+        if len(rows) < batch_size:
+            return moved
+        # Page on: rows skipped because they were updated meanwhile stay in the store and must not be archived again
+        after = rows[-1][0]
@@ -0,0 +1,226 @@
+"""Compact session model and codec used by the session stores.
+
+The session document (the schema served by GET /stories/session/{id}) is
+held as a SessionRecord: history entries are Step objects rather than
+dicts (node texts sit in `nodes`, referenced by id; within one history they
+are nearly always distinct, so this saves little on its own), moods are
+interned and timestamps are integers. `to_dict` rebuilds the exact document,
+key order included. Most of the stored size reduction comes from the
+keyless array layout and the compression below.
+
+Stored records are that model as a compact JSON array, zlib-compressed once
+it is larger than COMPRESS_MIN_BYTES. Documents stored as plain JSON by
+earlier versions still decode.
+"""
+import json
+import sys
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library encoder is used instead
+    orjson = None
+
+CODEC_VERSION = 1
+COMPRESS_MIN_BYTES = 256
+COMPRESS_LEVEL = 1  # Most of the size reduction of higher levels at a fraction of the CPU
+COMPRESSED_TAG = b"Z"
+
+# Top-level keys in the order the story endpoints create them
+SESSION_KEYS = ("story_name", "max_choices", "choices_made", "history", "current_node",
+                "created_at", "updated_at")
+# Carried by a loaded session (after the document keys) but stored beside the document by the
+# session stores, and never served
+METADATA_KEYS = ("version", "history_summary")
+STEP_KEYS = ("node_text", "choice_text", "mood", "timestamp")
+MOODS = ("neutral", "tense", "happy")
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), check_circular=False)
+
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON, as FastAPI renders responses (orjson when installed)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits
+    return _encoder.encode(data).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def pack_time(value: Any) -> Any:
+    """Naive ISO timestamp strings as integer microseconds since the epoch (other strings unchanged)"""
+    if not isinstance(value, str):
+        return value
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if moment.tzinfo is not None or moment.isoformat() != value:
+        return value  # Would not round-trip to the same string
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def unpack_time(value: Any) -> Any:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return (_EPOCH + value * _MICROSECOND).isoformat()
+    return value
+
+
+def pack_mood(mood: Any) -> Any:
+    try:
+        return MOODS.index(mood)
+    except ValueError:
+        return mood
+
+
+def unpack_mood(mood: Any) -> Any:
+    if isinstance(mood, int):
+        return MOODS[mood]
+    return sys.intern(mood) if isinstance(mood, str) else mood
+
+
+class Step:
+    """One history entry; `node` is the id of its node text in SessionRecord.nodes"""
+
+    __slots__ = ("node", "choice", "mood", "at")
+
+    def __init__(self, node: int, choice: str, mood: Any, at: Any):
+        self.node = node
+        self.choice = choice
+        self.mood = mood
+        self.at = at
+
+    def to_dict(self, nodes: List[str]) -> Dict[str, Any]:
+        return {"node_text": nodes[self.node], "choice_text": self.choice, "mood": self.mood,
+                "timestamp": unpack_time(self.at)}
+
+
+class SessionRecord:
+    """Compact in-memory form of one session document"""
+
+    __slots__ = ("story_name", "max_choices", "choices_made", "nodes", "steps", "current_node",
+                 "created_at", "updated_at", "version", "history_summary", "extra", "order")
+
+    def __init__(self):
+        self.story_name: Optional[str] = None
+        self.max_choices: Optional[int] = None
+        self.choices_made: Optional[int] = None
+        self.nodes: List[str] = []
+        # Step, or the entry itself when it does not have the usual fields
+        self.steps: List[Union[Step, Dict[str, Any]]] = []
+        self.current_node: Optional[Dict[str, Any]] = None
+        self.created_at: Any = None
+        self.updated_at: Any = None
+        self.version: Optional[int] = None
+        self.history_summary: Optional[Dict[str, Any]] = None
+        self.extra: Optional[Dict[str, Any]] = None  # Keys this model does not know
+        self.order: Optional[Tuple[str, ...]] = None  # Key order, when not the default one
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionRecord":
+        record = cls()
+        node_ids: Dict[str, int] = {}
+        for key, value in data.items():
+            if key == "history":
+                for entry in value:
+                    if (isinstance(entry, dict) and tuple(entry) == STEP_KEYS and isinstance(entry["node_text"], str)
+                            and isinstance(entry["timestamp"], str)):
+                        text = entry["node_text"]
+                        node = node_ids.get(text)
+                        if node is None:
+                            node = node_ids[text] = len(record.nodes)
+                            record.nodes.append(text)
+                        record.steps.append(Step(node, entry["choice_text"], unpack_mood(entry["mood"]),
+                                                 pack_time(entry["timestamp"])))
+                    else:
+                        record.steps.append(entry)
+            elif key == "current_node":
+                if isinstance(value, dict) and isinstance(value.get("mood"), str):
+                    value = {**value, "mood": sys.intern(value["mood"])}
+                record.current_node = value
+            elif key in ("created_at", "updated_at"):
+                setattr(record, key, pack_time(value))
+            elif key in SESSION_KEYS or key in METADATA_KEYS:
+                setattr(record, key, value)
+            else:
+                if record.extra is None:
+                    record.extra = {}
+                record.extra[key] = value
+        order = tuple(data)
+        if order != record.default_order():
+            record.order = order
+        return record
+
+    def default_order(self) -> Tuple[str, ...]:
+        metadata = tuple(key for key in METADATA_KEYS if getattr(self, key) is not None)
+        return SESSION_KEYS + tuple(self.extra or ()) + metadata
+
+    def history(self) -> List[Dict[str, Any]]:
+        return [step.to_dict(self.nodes) if isinstance(step, Step) else step for step in self.steps]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The session document this record was built from"""
+        data: Dict[str, Any] = {}
+        for key in self.order or self.default_order():
+            if key == "history":
+                data[key] = self.history()
+            elif key in ("created_at", "updated_at"):
+                data[key] = unpack_time(getattr(self, key))
+            elif key in SESSION_KEYS or key in METADATA_KEYS:
+                data[key] = getattr(self, key)
+            else:
+                data[key] = self.extra[key]
+        return data
+
+    def pack(self) -> List[Any]:
+        """JSON-ready array form of the record"""
+        steps = [[step.node, step.choice, pack_mood(step.mood), step.at] if isinstance(step, Step) else step
+                 for step in self.steps]
+        return [CODEC_VERSION, self.story_name, self.max_choices, self.choices_made, self.nodes, steps,
+                self.current_node, self.created_at, self.updated_at, self.version, self.history_summary,
+                self.extra, list(self.order) if self.order is not None else None]
+
+    @classmethod
+    def unpack(cls, packed: List[Any]) -> "SessionRecord":
+        if packed[0] != CODEC_VERSION:
+            raise ValueError(f"Unsupported session record version {packed[0]}")
+        record = cls()
+        (_, record.story_name, record.max_choices, record.choices_made, record.nodes, steps,
+         record.current_node, record.created_at, record.updated_at, record.version, record.history_summary,
+         record.extra, order) = packed
+        record.steps = [Step(step[0], step[1], unpack_mood(step[2]), step[3]) if isinstance(step, list) else step
+                        for step in steps]
+        if isinstance(record.current_node, dict) and isinstance(record.current_node.get("mood"), str):
+            record.current_node["mood"] = sys.intern(record.current_node["mood"])
+        record.order = tuple(order) if order is not None else None
+        return record
+
+
+def session_document(data: Dict[str, Any]) -> Dict[str, Any]:
+    """A loaded session without its metadata: what is stored as the document and served"""
+    return {key: value for key, value in data.items() if key not in METADATA_KEYS}
+
+
+def encode_session(data: Dict[str, Any]) -> bytes:
+    """Session document -> stored bytes"""
+    encoded = dumps(SessionRecord.from_dict(data).pack())
+    if len(encoded) >= COMPRESS_MIN_BYTES:
+        return COMPRESSED_TAG + zlib.compress(encoded, COMPRESS_LEVEL)
+    return encoded
+
+
+def decode_session(stored: Union[bytes, str]) -> Dict[str, Any]:
+    """Stored bytes (or a legacy JSON document) -> session document"""
+    if isinstance(stored, bytes) and stored[:1] == COMPRESSED_TAG:
+        stored = zlib.decompress(stored[1:])
+    value = loads(stored)
+    return value if isinstance(value, dict) else SessionRecord.unpack(value).to_dict()
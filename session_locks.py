@@ -0,0 +1,58 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SessionLocks:
+    """Per-session asyncio locks plus de-duplication of identical turns.
+
+    `hold(session_id)` serializes turns of one session. `run_once(key, ...)`
+    makes a duplicate request (double click, client retry) wait for and share
+    the result of the identical request that is in flight or that completed
+    less than `dedupe_window` seconds ago.
+    """
+
+    def __init__(self, dedupe_window: float = 5.0):
+        self.dedupe_window = dedupe_window
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._holders: Dict[str, int] = {}
+        self._recent: Dict[Hashable, Tuple[float, asyncio.Future]] = {}
+        self.deduplicated = 0
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        self._holders[session_id] = self._holders.get(session_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._holders[session_id] -= 1
+            if not self._holders[session_id]:
+                del self._holders[session_id]
+                del self._locks[session_id]
+
+    async def run_once(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.monotonic()
+        for stale in [k for k, (finished, _) in self._recent.items() if finished and now - finished > self.dedupe_window]:
+            del self._recent[stale]
+
+        entry = self._recent.get(key)
+        if entry is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(entry[1])
+
+        future = asyncio.ensure_future(factory())
+        self._recent[key] = (0.0, future)
+
+        def on_done(done: asyncio.Future):
+            if done.cancelled() or done.exception() is not None:
+                # Failed turns are not shared with later retries
+                if self._recent.get(key, (0.0, None))[1] is done:
+                    del self._recent[key]
+            else:
+                self._recent[key] = (time.monotonic(), done)
+
+        future.add_done_callback(on_done)
+        return await asyncio.shield(future)
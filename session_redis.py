@@ -0,0 +1,129 @@
+"""Redis session backend for running several workers or nodes against shared state.
+
+Select it with SESSION_BACKEND=redis and REDIS_URL (needs `pip install redis`).
+Each session is a hash {data, version, updated_at, summary} under
+`<prefix>session:<id>`, with `data` encoded by session_codec and `summary` (the
+history summary, as JSON) written apart from the versioned document.
+Writes are compare-and-set on `version` (WATCH/MULTI/EXEC), so a turn based on a
+stale read fails with VersionConflict (HTTP 409) instead of overwriting another
+worker's turn. Sessions expire `ttl` seconds after their last write instead of
+being archived.
+
+Running several workers:
+
+    # one host: SQLite in WAL mode is shared safely between processes
+    uvicorn main:app --workers 4
+    # several hosts (or containers): sessions in Redis
+    SESSION_BACKEND=redis REDIS_URL=redis://redis:6379/0 uvicorn main:app --workers 4
+
+Caches (stories, continuations, prefetch, opening pool) and metrics stay
+per process. Job-mode turns run in the worker that accepted them, and their
+state is stored under `<prefix>job:<id>` (in the `jobs` table with SQLite),
+so any worker can answer a status request or long-poll. Only one process at
+a time runs session compaction.
+For local testing, `python mock_redis.py` serves the subset of Redis used here.
+"""
+from typing import Any, Dict, Optional
+
+from session_codec import dumps, loads
+from session_store import VersionConflict, load_row, prepare_write
+
+
+class RedisSessionStore:
+    """Session store on Redis with optimistic versioning (same async API as SessionStore)"""
+
+    backend = "redis"
+    archivable = False  # Idle sessions expire through the key TTL
+
+    def __init__(self, url: str, prefix: str = "silkscript:", ttl: Optional[float] = None):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_BACKEND=redis requires the redis package (pip install redis)") from e
+        self._redis_errors = redis
+        self._client = redis.from_url(url)  # Binary replies: session data is compressed
+        self.prefix = prefix
+        self.ttl = int(ttl) if ttl else None
+        self.stats = {"commits": 0, "rows_written": 0, "bytes_written": 0, "conflicts": 0}
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}session:{session_id}"
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        data, version, summary = await self._client.hmget(self._key(session_id), "data", "version", "summary")
+        return load_row(data, version, summary) if data is not None else None
+
+    async def put(self, session_id: str, data: Dict[str, Any]):
+        """Write the session if its stored version is still the one it was read at (else VersionConflict)"""
+        key = self._key(session_id)
+        encoded, expected = prepare_write(data)
+        async with self._client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                stored = await pipe.hget(key, "version")
+                if stored is not None and int(stored) != expected:
+                    raise VersionConflict(session_id)
+                pipe.multi()
+                pipe.hset(key, mapping={
+                    "data": encoded,
+                    "version": expected + 1,
+                    "updated_at": data.get("updated_at") or "",
+                })
+                if self.ttl:
+                    pipe.expire(key, self.ttl)
+                await pipe.execute()
+            except self._redis_errors.WatchError:
+                self.stats["conflicts"] += 1
+                raise VersionConflict(session_id)
+            except VersionConflict:
+                self.stats["conflicts"] += 1
+                raise
+        self.stats["commits"] += 1
+        self.stats["rows_written"] += 1
+        self.stats["bytes_written"] += len(encoded)
+
+    async def put_summary(self, session_id: str, summary: Dict[str, Any]) -> bool:
+        """Store a history summary unless one covering as many steps is stored; the version is left alone"""
+        key = self._key(session_id)
+        async with self._client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                version, stored = await pipe.hmget(key, "version", "summary")
+                if version is None or (stored is not None and loads(stored).get("through", 0) >= summary["through"]):
+                    return False  # Session gone, or a summary covering as many steps is stored
+                pipe.multi()
+                pipe.hset(key, "summary", dumps(summary))
+                await pipe.execute()
+            except self._redis_errors.WatchError:
+                return False  # A turn was saved meanwhile; the next update folds its steps in
+        return True
+
+    async def delete(self, session_id: str) -> bool:
+        return await self._client.delete(self._key(session_id)) > 0
+
+    async def ping(self) -> bool:
+        return bool(await self._client.ping())
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew a named lease shared by every worker using this Redis"""
+        key = f"{self.prefix}lease:{name}"
+        if await self._client.set(key, owner, nx=True, px=int(ttl * 1000)):
+            return True
+        if await self._client.get(key) == owner.encode():
+            await self._client.pexpire(key, int(ttl * 1000))
+            return True
+        return False
+
+    async def put_job(self, job_id: str, data: Dict[str, Any], ttl: float):
+        """Store a job's state for `ttl` seconds"""
+        await self._client.set(f"{self.prefix}job:{job_id}", dumps(data), px=int(ttl * 1000))
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = await self._client.get(f"{self.prefix}job:{job_id}")
+        return loads(data) if data is not None else None
+
+    async def flush(self):
+        pass  # Writes are not buffered
+
+    async def aclose(self):
+        await self._client.aclose()
@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from session_codec import decode_session, dumps, encode_session, loads, session_document
+
+# Pending row: (encoded data, updated_at, expected version, completed) or None for a delete
+PendingRow = Optional[Tuple[bytes, Optional[str], int, bool]]
+
+
+class VersionConflict(Exception):
+    """The session was written by another request (or worker) since it was read"""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Session {session_id} was updated concurrently")
+        self.session_id = session_id
+
+
+def prepare_write(data: Dict[str, Any]) -> Tuple[bytes, int]:
+    """Bump the session's version for a compare-and-set write; returns (encoded document, expected stored version)"""
+    expected = data.get("version", 0)
+    data["version"] = expected + 1
+    return encode_session(session_document(data)), expected
+
+
+def load_row(encoded: Any, version: Optional[int], summary: Any = None) -> Dict[str, Any]:
+    """Decode a stored document and attach the version it is stored at and its history summary"""
+    data = decode_session(encoded)
+    # Both override values written into the document by earlier releases
+    data["version"] = int(version or 0)
+    if summary is not None:
+        data["history_summary"] = loads(summary)
+    return data
+
+
+def is_completed(data: Dict[str, Any]) -> bool:
+    return data.get("choices_made", 0) >= data.get("max_choices", 15)
+
+
+class SessionStore:
+    """SQLite (WAL mode) store holding one encoded document per story session.
+
+    Each session keeps exactly the schema previously stored under its id in
+    previous_answers.json (encoded by session_codec; rows written as plain
+    JSON still read), so reads and writes touch a single row instead of
+    re-parsing and rewriting every session.
+
+    With `commit_interval > 0`, async writes are buffered and committed as
+    one transaction per interval (group commit); each writer still waits for
+    the commit that includes its row, and reads see buffered writes.
+
+    Writes are compare-and-set on the session's `version`, so several worker
+    processes can share the database: a write based on a stale read raises
+    VersionConflict instead of overwriting the other worker's turn.
+    """
+
+    backend = "sqlite"
+    archivable = True  # Supports select_archivable_sync/delete_unchanged_sync for compaction
+
+    def __init__(self, db_path: str, commit_interval: float = 0.0, busy_timeout: float = 5.0):
+        self.db_path = db_path
+        self.commit_interval = commit_interval
+        self._lock = threading.Lock()
+        # Buffered writes: session_id -> pending row
+        self._pending: Dict[str, PendingRow] = {}
+        self._committing: Dict[str, PendingRow] = {}
+        self._waiters: List[Tuple[str, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self.stats = {"commits": 0, "rows_written": 0, "bytes_written": 0, "conflicts": 0}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        # Other worker processes may hold the write lock briefly; wait instead of failing
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, "
+            "data TEXT NOT NULL, "
+            "updated_at TEXT, "
+            "version INTEGER NOT NULL DEFAULT 0, "
+            "completed INTEGER NOT NULL DEFAULT 0, "
+            "summary TEXT)"  # History summary as JSON, written apart from the versioned document
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+        for column, definition in (("version", "INTEGER NOT NULL DEFAULT 0"), ("completed", "INTEGER NOT NULL DEFAULT 0"),
+                                   ("summary", "TEXT")):
+            if column not in columns:
+                try:
+                    self._conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} {definition}")
+                except sqlite3.OperationalError:
+                    pass  # Added by another worker meanwhile
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        # Story job states, readable by every worker process (expired rows are dropped on write)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    # Synchronous primitives (run in the default executor from async code)
+
+    def get_sync(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, version, summary FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return load_row(*row) if row else None
+
+    def get_summary_sync(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def put_summary_sync(self, session_id: str, summary: Dict[str, Any]) -> bool:
+        """Store a history summary unless one covering as many steps is stored; the version is left alone"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE sessions SET summary = ? WHERE session_id = ? "
+                "AND (summary IS NULL OR json_extract(summary, '$.through') < ?)",
+                (dumps(summary).decode("utf-8"), session_id, summary["through"]),
+            )
+        return cursor.rowcount > 0
+
+    def put_sync(self, session_id: str, data: Dict[str, Any]):
+        encoded, expected = prepare_write(data)
+        if self.write_batch_sync({session_id: (encoded, data.get("updated_at"), expected, is_completed(data))}):
+            raise VersionConflict(session_id)
+
+    def write_batch_sync(self, batch: Dict[str, PendingRow]) -> Set[str]:
+        """Apply buffered upserts/deletes in a single transaction; returns the sessions whose version moved on"""
+        upserts = [(sid, row) for sid, row in batch.items() if row is not None]
+        deletes = [(sid,) for sid, row in batch.items() if row is None]
+        conflicts = set()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sid, (data, updated_at, expected, completed) in upserts:
+                    cursor = self._conn.execute(
+                        "INSERT INTO sessions (session_id, data, updated_at, version, completed) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, "
+                        "updated_at = excluded.updated_at, version = excluded.version, completed = excluded.completed "
+                        "WHERE sessions.version = ?",
+                        (sid, data, updated_at, expected + 1, completed, expected),
+                    )
+                    if cursor.rowcount == 0:
+                        conflicts.add(sid)
+                if deletes:
+                    self._conn.executemany("DELETE FROM sessions WHERE session_id = ?", deletes)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.stats["commits"] += 1
+        self.stats["rows_written"] += len(batch) - len(conflicts)
+        self.stats["bytes_written"] += sum(len(row[0]) for sid, row in upserts if sid not in conflicts)
+        self.stats["conflicts"] += len(conflicts)
+        return conflicts
+
+    def delete_sync(self, session_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def select_archivable_sync(self, idle_before: str, completed_before: str, limit: int,
+                               after: str = "") -> List[Tuple[str, Any, Optional[str]]]:
+        """Sessions idle since `idle_before`, or completed and untouched since `completed_before`, by id after `after`"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT session_id, data, updated_at FROM sessions "
+                "WHERE session_id > ? AND (updated_at < ? OR (updated_at < ? AND (completed = 1 OR "
+                "(typeof(data) = 'text' AND json_extract(data, '$.choices_made') >= json_extract(data, '$.max_choices'))))) "
+                "ORDER BY session_id LIMIT ?",
+                (after, idle_before, completed_before, limit),
+            ).fetchall()
+
+    def delete_unchanged_sync(self, rows: List[Tuple[str, Optional[str]]]) -> int:
+        """Delete (session_id, updated_at) rows, skipping sessions updated since they were read"""
+        rows = [(sid, updated_at) for sid, updated_at in rows if sid not in self._pending and sid not in self._committing]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("DELETE FROM sessions WHERE session_id = ? AND updated_at IS ?", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def ping_sync(self) -> bool:
+        """Cheap round-trip used by the readiness check"""
+        with self._lock:
+            return self._conn.execute("SELECT 1").fetchone()[0] == 1
+
+    def acquire_lease_sync(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew a named lease shared by every process using this database"""
+        key = f"lease:{name}"
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+                holder, _, expires = (row[0] if row else "").rpartition("|")
+                if row and holder != owner and float(expires or 0) > now:
+                    self._conn.execute("COMMIT")
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, f"{owner}|{now + ttl}")
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def put_job_sync(self, job_id: str, data: Dict[str, Any], ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, data, expires_at) VALUES (?, ?, ?)", (job_id, dumps(data), now + ttl)
+            )
+
+    def get_job_sync(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM jobs WHERE job_id = ? AND expires_at >= ?", (job_id, time.time())
+            ).fetchone()
+        return loads(row[0]) if row else None
+
+    def import_json_file(self, json_path: str, overwrite: bool = False) -> int:
+        """Import sessions from a legacy previous_answers.json file in one transaction"""
+        with open(json_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        sessions = json.loads(content) if content.strip() else {}
+
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        rows = [
+            (session_id, encode_session(session_document(data)), data.get("updated_at"), data.get("version", 0),
+             is_completed(data), dumps(data["history_summary"]).decode("utf-8") if data.get("history_summary") else None)
+            for session_id, data in sessions.items()
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    f"{verb} INTO sessions (session_id, data, updated_at, version, completed, summary) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                imported = self._conn.total_changes - before
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return imported
+
+    def close(self):
+        if self._pending:
+            self.write_batch_sync(self._pending)
+            self._pending = {}
+        with self._lock:
+            self._conn.close()
+
+    async def aclose(self):
+        await self.flush()
+        self.close()
+
+    # Async API
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        for buffered in (self._pending, self._committing):
+            if session_id in buffered:
+                row = buffered[session_id]
+                if row is None:
+                    return None
+                loop = asyncio.get_running_loop()
+                summary = await loop.run_in_executor(None, self.get_summary_sync, session_id)
+                return load_row(row[0], row[2] + 1, summary)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_sync, session_id)
+
+    async def put(self, session_id: str, data: Dict[str, Any]):
+        """Write the session if its stored version is still the one it was read at (else VersionConflict)"""
+        if self.commit_interval <= 0:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.put_sync, session_id, data)
+            return
+        encoded, expected = prepare_write(data)
+        self._pending[session_id] = (encoded, data.get("updated_at"), expected, is_completed(data))
+        await self._wait_for_commit(session_id)
+
+    async def delete(self, session_id: str) -> bool:
+        if self.commit_interval <= 0:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.delete_sync, session_id)
+        existed = await self.get(session_id) is not None
+        self._pending[session_id] = None
+        await self._wait_for_commit(session_id)
+        return existed
+
+    async def ping(self) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.ping_sync)
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.acquire_lease_sync, name, owner, ttl)
+
+    async def put_summary(self, session_id: str, summary: Dict[str, Any]) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.put_summary_sync, session_id, summary)
+
+    async def put_job(self, job_id: str, data: Dict[str, Any], ttl: float):
+        """Store a job's state for `ttl` seconds"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.put_job_sync, job_id, data, ttl)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_job_sync, job_id)
+
+    async def _wait_for_commit(self, session_id: str):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((session_id, waiter))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        await waiter
+
+    async def _flush_loop(self):
+        """Commit buffered writes once per interval until no writer is waiting"""
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            await asyncio.sleep(self.commit_interval)
+            self._committing, self._pending = self._pending, {}
+            waiters, self._waiters = self._waiters, []
+            try:
+                conflicts = set()
+                if self._committing:
+                    conflicts = await loop.run_in_executor(None, self.write_batch_sync, self._committing)
+            except Exception as e:
+                for _, waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            else:
+                for session_id, waiter in waiters:
+                    if waiter.done():
+                        continue
+                    if session_id in conflicts:
+                        waiter.set_exception(VersionConflict(session_id))
+                    else:
+                        waiter.set_result(None)
+            finally:
+                self._committing = {}
+
+    async def flush(self):
+        """Wait until every buffered write has been committed"""
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import previous_answers.json into the session store")
+    parser.add_argument("json_file", nargs="?", default=os.path.join("data", "previous_answers.json"))
+    parser.add_argument("--db", default=os.path.join("data", "sessions.db"), help="SQLite session database")
+    parser.add_argument("--overwrite", action="store_true", help="Replace sessions that already exist")
+    args = parser.parse_args()
+
+    store = SessionStore(args.db)
+    count = store.import_json_file(args.json_file, overwrite=args.overwrite)
+    store.set_meta("legacy_import", os.path.abspath(args.json_file))
+    print(f"Imported {count} sessions from {args.json_file} into {args.db} ({store.count()} total)")
+    store.close()
@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Flight:
+    __slots__ = ("task", "callers", "waiting")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.callers = 0  # Callers that joined, including the one that started it
+        self.waiting = 0
+
+
+class SingleFlight:
+    """Runs concurrent calls with the same key once and shares the outcome.
+
+    A caller arriving while an identical call is in flight waits for that
+    call instead of starting its own, and gets its result or exception.
+    A flight is shared by at most `max_fan_out` callers; the next caller
+    starts a new flight, which later arrivals join. The call keeps running
+    while any caller still waits (e.g. after the one that started it went
+    away) and is cancelled once none does.
+    """
+
+    def __init__(self, max_fan_out: int = 32):
+        self.max_fan_out = max_fan_out
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.flights = 0
+        self.coalesced = 0
+        self.overflows = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return (result, shared), where `shared` is True if another caller's call produced it"""
+        flight = self._flights.get(key)
+        shared = flight is not None and flight.callers < self.max_fan_out
+        if shared:
+            self.coalesced += 1
+        else:
+            if flight is not None:
+                self.overflows += 1
+            flight = self._start(key, factory)
+
+        flight.callers += 1
+        flight.waiting += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiting -= 1
+            if not flight.waiting and not flight.task.done():
+                flight.task.cancel()
+
+    def _start(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> _Flight:
+        flight = _Flight(asyncio.ensure_future(factory()))
+        self._flights[key] = flight
+        self.flights += 1
+
+        def on_done(done: asyncio.Future):
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if not done.cancelled():
+                done.exception()  # Retrieved by the waiters; don't log "exception never retrieved"
+
+        flight.task.add_done_callback(on_done)
+        return flight
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_fan_out": self.max_fan_out,
+            "in_flight": len(self._flights),
+            "flights": self.flights,
+            "coalesced": self.coalesced,
+            "overflows": self.overflows,
+        }
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from story_chapters import artifact_path, read_artifact
+
+CATALOG_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+STORY_EXTENSION = ".txt"
+
+
+class CatalogEntry:
+    """One story file: names it answers to plus stat, checksum and precomputed metadata"""
+
+    def __init__(self, filename: str, path: str, name: str, title: str, aliases: List[str], size: int,
+                 mtime_ns: int, checksum: str, lines: int, chapters: Optional[int] = None,
+                 chapters_mtime_ns: int = 0, description: Optional[str] = None):
+        self.filename = filename
+        self.path = path
+        self.name = name
+        self.title = title
+        self.aliases = aliases
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.checksum = checksum
+        self.lines = lines
+        self.chapters = chapters
+        self.chapters_mtime_ns = chapters_mtime_ns
+        self.description = description
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    def public(self) -> Dict[str, Any]:
+        """Fields shown by /stories/list"""
+        return {
+            "name": self.name,
+            "title": self.title,
+            "aliases": self.aliases,
+            "file": self.filename,
+            "size": self.size,
+            "checksum": self.checksum,
+            "lines": self.lines,
+            "chapters": self.chapters,
+            "description": self.description,
+        }
+
+
+def file_checksum(path: str) -> Tuple[str, int]:
+    """sha256 and line count of a file, read in blocks so large stories are never held in memory"""
+    digest = hashlib.sha256()
+    lines = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+            lines += block.count(b"\n")
+    return digest.hexdigest(), lines
+
+
+class StoryCatalog:
+    """Stories discovered in `stories_dir`, named by file stem plus manifest aliases.
+
+    The optional `manifest.json` in the stories directory maps file names to
+    {"title", "aliases", "description"}. Checksums and metadata are persisted
+    in `index_path` and only recomputed for files whose mtime or size
+    changed, so startup cost does not grow with the size of the corpus;
+    story text itself is loaded on first use by the story cache. `run`
+    rescans periodically and reports added, changed and removed files.
+    """
+
+    def __init__(self, stories_dir: str, index_path: Optional[str] = None, chapters_dir: Optional[str] = None):
+        self.stories_dir = stories_dir
+        self.index_path = index_path
+        self.chapters_dir = chapters_dir
+        self._entries: Dict[str, CatalogEntry] = {}  # filename -> entry
+        self._names: Dict[str, CatalogEntry] = {}    # lowercase name or alias -> entry
+        self._manifest_mtime_ns = 0
+        self.scans = 0
+        self._load_index()
+
+    def _load_index(self):
+        if not self.index_path:
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CATALOG_VERSION:
+                self._entries = {filename: CatalogEntry(**entry) for filename, entry in data["entries"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            self._entries = {}
+
+    def _save_index(self):
+        if not self.index_path:
+            return
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": CATALOG_VERSION,
+                "entries": {filename: entry.to_dict() for filename, entry in self._entries.items()},
+            }, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.stories_dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return manifest if isinstance(manifest, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _chapter_count(self, path: str, size: int, mtime_ns: int) -> Optional[int]:
+        """Number of chapters in a current chapters artifact for the story, if there is one"""
+        chapters = read_artifact(path, self.chapters_dir)
+        if chapters is None or chapters.source_size != size or chapters.source_mtime_ns != mtime_ns:
+            return None
+        return len(chapters)
+
+    def scan(self) -> Set[str]:
+        """Rescan the stories directory (blocking; run off the event loop) and return changed file names"""
+        try:
+            manifest_mtime_ns = os.stat(os.path.join(self.stories_dir, MANIFEST_FILENAME)).st_mtime_ns
+        except OSError:
+            manifest_mtime_ns = 0
+        manifest = self._read_manifest()
+        manifest_changed = manifest_mtime_ns != self._manifest_mtime_ns
+
+        entries: Dict[str, CatalogEntry] = {}
+        changed: Set[str] = set()
+        try:
+            listing = sorted(os.scandir(self.stories_dir), key=lambda item: item.name)
+        except OSError:
+            listing = []
+        for item in listing:
+            if not item.name.endswith(STORY_EXTENSION) or not item.is_file():
+                continue
+            stat = item.stat()
+            meta = manifest.get(item.name) or {}
+            previous = self._entries.get(item.name)
+            if previous is not None and previous.size == stat.st_size and previous.mtime_ns == stat.st_mtime_ns:
+                checksum, lines = previous.checksum, previous.lines
+            else:
+                checksum, lines = file_checksum(item.path)
+                changed.add(item.name)
+
+            chapters, chapters_mtime_ns = (previous.chapters, previous.chapters_mtime_ns) if previous else (None, 0)
+            if self.chapters_dir:
+                try:
+                    current_mtime_ns = os.stat(artifact_path(item.path, self.chapters_dir)).st_mtime_ns
+                except OSError:
+                    current_mtime_ns = 0
+                if item.name in changed or current_mtime_ns != chapters_mtime_ns:
+                    chapters = self._chapter_count(item.path, stat.st_size, stat.st_mtime_ns) if current_mtime_ns else None
+                    chapters_mtime_ns = current_mtime_ns
+                    changed.add(item.name)
+
+            stem = item.name[:-len(STORY_EXTENSION)].lower()
+            entries[item.name] = CatalogEntry(
+                filename=item.name,
+                path=item.path,
+                name=stem,
+                title=meta.get("title") or stem.replace("_", " ").title(),
+                aliases=[alias.lower() for alias in meta.get("aliases", []) if alias.lower() != stem],
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                checksum=checksum,
+                lines=lines,
+                chapters=chapters,
+                chapters_mtime_ns=chapters_mtime_ns,
+                description=meta.get("description"),
+            )
+        changed |= set(self._entries) - set(entries)
+        if manifest_changed:
+            changed |= set(entries)
+
+        # File stems take precedence over aliases; the first story claiming an alias keeps it
+        names = {entry.name: entry for entry in entries.values()}
+        for entry in entries.values():
+            for alias in entry.aliases:
+                names.setdefault(alias, entry)
+
+        self._entries, self._names = entries, names
+        self._manifest_mtime_ns = manifest_mtime_ns
+        self.scans += 1
+        if changed or self.scans == 1:
+            self._save_index()
+        return changed
+
+    def resolve(self, story_name: str) -> Optional[CatalogEntry]:
+        return self._names.get(story_name.lower())
+
+    def names(self) -> List[str]:
+        """Every name and alias stories can be requested by"""
+        return list(self._names)
+
+    def files(self) -> Dict[str, str]:
+        """Name or alias -> story file name"""
+        return {name: entry.filename for name, entry in self._names.items()}
+
+    def entries(self) -> List[CatalogEntry]:
+        return list(self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def run(self, interval: float, on_change: Optional[Callable[[Set[str]], Awaitable[None]]] = None):
+        """Rescan every `interval` seconds, reporting changed file names (cancel to stop)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                changed = await loop.run_in_executor(None, self.scan)
+            except OSError:
+                continue
+            if changed and on_change is not None:
+                await on_change(changed)
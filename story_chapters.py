@@ -0,0 +1,293 @@
+"""Offline chapter segmentation and summaries for story files.
+
+Long stories (koroghlu.txt is a multi-episode epic) are split into chapters
+at episode openers, and each chapter gets a compact summary, its key
+characters and its most distinctive terms. The result is written as a
+versioned JSON artifact per story that the server loads at startup instead
+of the raw text:
+
+    python story_chapters.py                  # extractive summaries, no API calls
+    python story_chapters.py --llm            # summaries by the configured Gemini model
+    python story_chapters.py --force koroghlu.txt
+
+Summaries are cached by chapter digest, so rebuilding after an edit only
+summarizes the chapters that changed.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from passage_index import normalize_text, tokenize
+
+CHAPTERS_VERSION = 1
+
+# Names are short, so case suffixes ("Eyvaz", "Eyvazı", "Eyvazın") are folded with a shorter prefix than STEM_LENGTH
+NAME_STEM_LENGTH = 5
+
+# Paragraph openings storytellers use to begin a new episode ("They say...", "One day...", "The master says...")
+_EPISODE_OPENER_RE = re.compile(r"^(?:Deyirlər|Günlərin bir(?:i|inci)?(?: günü)?|Ustad belə deyir|Bir gün,)", re.IGNORECASE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+# Capitalized words that are not names even in mid-sentence (interjections, address words)
+_NOT_NAMES = frozenset("""
+ay ey amma bəli ha hə yox allah xudaya həə
+""".split())
+
+
+def segment_chapters(text: str, min_chars: int = 8000, max_chars: int = 40000) -> List[Tuple[int, int]]:
+    """Split text into (start, end) chapter spans at episode openers, within the size bounds"""
+    paragraphs = [(m.start(), m.group()) for m in re.finditer(r"[^\n]+", text) if m.group().strip()]
+    if not paragraphs:
+        return []
+
+    spans = []
+    start = paragraphs[0][0]
+    for offset, paragraph in paragraphs[1:]:
+        size = offset - start
+        if (size >= min_chars and _EPISODE_OPENER_RE.match(paragraph.strip())) or size >= max_chars:
+            spans.append((start, offset))
+            start = offset
+    spans.append((start, len(text)))
+
+    # Fold a short tail into the previous chapter
+    if len(spans) > 1 and spans[-1][1] - spans[-1][0] < min_chars // 2:
+        spans[-2:] = [(spans[-2][0], spans[-1][1])]
+    return spans
+
+
+def key_characters(text: str, limit: int = 8) -> List[str]:
+    """Most frequent names: capitalized words outside sentence starts, grouped by stem"""
+    forms: Dict[str, Counter] = {}
+    for line in text.split("\n"):
+        for sentence in _SENTENCE_RE.split(line.strip().lstrip("–-—\"“« ")):
+            words = _WORD_RE.findall(sentence)
+            for word in words[1:]:
+                if len(word) < 3 or not word[0].isupper() or word.lower() in _NOT_NAMES:
+                    continue
+                stem = normalize_text(word)[:NAME_STEM_LENGTH]
+                forms.setdefault(stem, Counter())[word] += 1
+    ranked = sorted(forms.values(), key=lambda counts: sum(counts.values()), reverse=True)
+    # Show the shortest frequent spelling (the bare name rather than a suffixed form)
+    return [min(counts.most_common(3), key=lambda item: len(item[0]))[0] for counts in ranked[:limit]]
+
+
+def extractive_summary(text: str, max_chars: int = 600) -> str:
+    """The opening sentence plus the sentences densest in the chapter's frequent terms, in story order"""
+    # Narrative sentences only: verse lines and "X said:" dialogue introductions carry no plot
+    sentences = [
+        s.strip() for line in text.split("\n") for s in _SENTENCE_RE.split(line)
+        if len(s.strip()) >= 60 and not s.strip().endswith(":")
+    ]
+    if not sentences:
+        return text[:max_chars].strip()
+    frequencies = Counter(tokenize(text))
+
+    def score(sentence: str) -> float:
+        terms = set(tokenize(sentence))
+        return sum(math.log(1 + frequencies[term]) for term in terms) / math.sqrt(len(terms) + 1)
+
+    chosen = {0}
+    used = len(sentences[0])
+    for idx in sorted(range(1, len(sentences)), key=lambda i: score(sentences[i]), reverse=True):
+        if used + len(sentences[idx]) + 1 > max_chars:
+            continue
+        chosen.add(idx)
+        used += len(sentences[idx]) + 1
+    return " ".join(sentences[idx] for idx in sorted(chosen))[:max_chars]
+
+
+class Chapter:
+    def __init__(self, index: int, start: int, end: int, digest: str, summary: str,
+                 characters: List[str], keywords: Dict[str, float], summarizer: str):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.digest = digest
+        self.summary = summary
+        self.characters = characters
+        self.keywords = keywords
+        self.summarizer = summarizer
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Chapter":
+        return cls(**data)
+
+
+class StoryChapters:
+    """Chapters of one story file with their summaries"""
+
+    def __init__(self, chapters: List[Chapter], source_mtime_ns: int = 0, source_size: int = 0):
+        self.chapters = chapters
+        self.source_mtime_ns = source_mtime_ns
+        self.source_size = source_size
+
+    def __len__(self) -> int:
+        return len(self.chapters)
+
+    def locate(self, query: str, progress: float = 0.0) -> Optional[Chapter]:
+        """Chapter whose distinctive terms best match `query`, else the one at `progress` (0-1) through the story"""
+        if not self.chapters:
+            return None
+        scores = [sum(chapter.keywords.get(term, 0.0) for term in set(tokenize(query))) for chapter in self.chapters]
+        best = max(range(len(scores)), key=lambda i: scores[i])
+        if scores[best] > 0:
+            return self.chapters[best]
+        return self.chapters[min(len(self.chapters) - 1, int(progress * len(self.chapters)))]
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": CHAPTERS_VERSION,
+            "source_mtime_ns": self.source_mtime_ns,
+            "source_size": self.source_size,
+            "chapters": [chapter.to_dict() for chapter in self.chapters],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "StoryChapters":
+        return cls([Chapter.from_dict(c) for c in data["chapters"]], data["source_mtime_ns"], data["source_size"])
+
+
+def chapter_keywords(chapter_terms: List[Counter], limit: int = 40) -> List[Dict[str, float]]:
+    """Top tf-idf terms of each chapter (terms spread across every chapter score zero)"""
+    document_frequency = Counter(term for terms in chapter_terms for term in terms)
+    count = len(chapter_terms)
+    keywords = []
+    for terms in chapter_terms:
+        weights = {term: tf * math.log(count / document_frequency[term]) for term, tf in terms.items()}
+        top = sorted(weights.items(), key=lambda item: item[1], reverse=True)[:limit]
+        keywords.append({term: round(weight, 3) for term, weight in top if weight > 0})
+    return keywords
+
+
+Summarizer = Callable[[str], Awaitable[str]]
+
+
+async def build_chapters(story_path: str, summarize: Optional[Summarizer] = None, summarizer_name: str = "extractive",
+                         previous: Optional[StoryChapters] = None, min_chars: int = 8000, max_chars: int = 40000,
+                         summary_chars: int = 600) -> StoryChapters:
+    """Segment and summarize a story, reusing summaries of unchanged chapters from `previous`"""
+    stat = os.stat(story_path)
+    with open(story_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    spans = segment_chapters(text, min_chars, max_chars)
+    cached = {(c.digest, c.summarizer): c.summary for c in (previous.chapters if previous else [])}
+
+    chapters = []
+    keywords = chapter_keywords([Counter(tokenize(text[start:end])) for start, end in spans])
+    for index, (start, end) in enumerate(spans):
+        body = text[start:end]
+        digest = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        summary = cached.get((digest, summarizer_name))
+        if summary is None:
+            summary = await summarize(body) if summarize else extractive_summary(body, summary_chars)
+        chapters.append(Chapter(index, start, end, digest, summary, key_characters(body), keywords[index], summarizer_name))
+    return StoryChapters(chapters, stat.st_mtime_ns, stat.st_size)
+
+
+def artifact_path(story_path: str, artifact_dir: str) -> str:
+    return os.path.join(artifact_dir, os.path.basename(story_path) + ".chapters.json")
+
+
+def read_artifact(story_path: str, artifact_dir: str) -> Optional[StoryChapters]:
+    """Read the persisted chapters of `story_path` (possibly stale), or None if missing or another version"""
+    try:
+        with open(artifact_path(story_path, artifact_dir), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != CHAPTERS_VERSION:
+            return None
+        return StoryChapters.from_dict(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def load_chapters(story_path: str, artifact_dir: str) -> Optional[StoryChapters]:
+    """Persisted chapters of `story_path`, or None if there is no artifact for its current contents"""
+    chapters = read_artifact(story_path, artifact_dir)
+    if chapters is None:
+        return None
+    stat = os.stat(story_path)
+    if chapters.source_mtime_ns != stat.st_mtime_ns or chapters.source_size != stat.st_size:
+        return None
+    return chapters
+
+
+def write_artifact(story_path: str, artifact_dir: str, chapters: StoryChapters):
+    os.makedirs(artifact_dir, exist_ok=True)
+    path = artifact_path(story_path, artifact_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(chapters.to_dict(), f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def gemini_summarizer(api_url: str, api_key: str, summary_words: int) -> Tuple[Summarizer, Callable[[], Awaitable[None]]]:
+    """Summarizer calling the Gemini API, plus the coroutine function closing its client"""
+    from gemini_client import GeminiClient, extract_candidate_text
+
+    client = GeminiClient(api_url, api_key, read_timeout=120.0, max_concurrency=4)
+
+    async def summarize(body: str) -> str:
+        prompt = f"""Write a compact English summary of this chapter of an epic, in at most {summary_words} words. Name the characters, places and the main events in order. Reply with the summary text only.
+
+Chapter:
+{body}"""
+        result = await client.generate_content({"contents": [{"parts": [{"text": prompt}]}]})
+        text = (extract_candidate_text(result) or "").strip()
+        if not text:
+            raise ValueError("Empty summary from Gemini")
+        return text
+
+    return summarize, client.aclose
+
+
+async def build_all(args: argparse.Namespace):
+    summarize, close = None, None
+    if args.llm:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        api_url, api_key = os.getenv("GEMINI_API_URL"), os.getenv("GEMINI_API_KEY")
+        if not api_url or not api_key:
+            raise SystemExit("--llm needs GEMINI_API_URL and GEMINI_API_KEY")
+        summarize, close = gemini_summarizer(api_url, api_key, args.summary_chars // 6)
+    summarizer_name = f"gemini:{os.getenv('GEMINI_API_URL', '').split('/models/')[-1].split(':')[0]}" if args.llm else "extractive"
+
+    try:
+        filenames = args.stories or sorted(f for f in os.listdir(args.stories_dir) if f.endswith(".txt"))
+        for filename in filenames:
+            story_path = os.path.join(args.stories_dir, filename)
+            if not args.force and load_chapters(story_path, args.output_dir) is not None:
+                print(f"{filename}: up to date")
+                continue
+            previous = None if args.force else read_artifact(story_path, args.output_dir)
+            chapters = await build_chapters(
+                story_path, summarize, summarizer_name, previous, args.min_chars, args.max_chars, args.summary_chars
+            )
+            write_artifact(story_path, args.output_dir, chapters)
+            print(f"{filename}: {len(chapters)} chapters -> {artifact_path(story_path, args.output_dir)}")
+    finally:
+        if close is not None:
+            await close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Segment stories into chapters and precompute their summaries")
+    parser.add_argument("stories", nargs="*", help="Story files in --stories-dir (default: all .txt files)")
+    parser.add_argument("--stories-dir", default="stories")
+    parser.add_argument("--output-dir", default=os.path.join("data", "chapters"), help="Where the artifacts are written")
+    parser.add_argument("--llm", action="store_true", help="Summarize with the Gemini API (GEMINI_API_URL/KEY)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the artifact is current, ignoring cached summaries")
+    parser.add_argument("--min-chars", type=int, default=8000, help="Smallest chapter before an episode opener starts a new one")
+    parser.add_argument("--max-chars", type=int, default=40000, help="Largest chapter before it is cut at a paragraph")
+    parser.add_argument("--summary-chars", type=int, default=600)
+    asyncio.run(build_all(parser.parse_args()))
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+import aiofiles
+
+
+class CachedStory:
+    """Decoded story text plus precomputed prompt excerpts"""
+
+    def __init__(self, path: str, mtime_ns: int, size: int, content: str, excerpt_lengths: Iterable[int] = ()):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.content = content
+        self.checked_at = time.monotonic()
+        self._excerpts: Dict[int, str] = {length: content[:length] for length in excerpt_lengths}
+
+    def excerpt(self, length: int) -> str:
+        """Return the first `length` characters, memoized per length"""
+        if length not in self._excerpts:
+            self._excerpts[length] = self.content[:length]
+        return self._excerpts[length]
+
+
+class StoryCorpusCache:
+    """Process-wide cache of story files keyed by canonical (real) path.
+
+    Entries are revalidated against the file's mtime and size at most once
+    every `check_interval` seconds, so aliases pointing at the same file share
+    one entry and unchanged files are never re-read or re-decoded. At most
+    `max_entries` stories are kept; the least recently used one is dropped.
+    """
+
+    def __init__(self, excerpt_lengths: Iterable[int] = (), check_interval: float = 1.0, max_entries: int = 32):
+        self.excerpt_lengths = tuple(excerpt_lengths)
+        self.check_interval = check_interval
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedStory]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self, entry: CachedStory) -> bool:
+        now = time.monotonic()
+        if now - entry.checked_at < self.check_interval:
+            return True
+        try:
+            stat = os.stat(entry.path)
+        except OSError:
+            return False
+        if stat.st_mtime_ns == entry.mtime_ns and stat.st_size == entry.size:
+            entry.checked_at = now
+            return True
+        return False
+
+    async def get(self, filepath: str) -> CachedStory:
+        """Return the cached story for `filepath`, (re)loading it if it changed"""
+        path = os.path.realpath(filepath)
+        entry = self._entries.get(path)
+        if entry is not None and self._is_fresh(entry):
+            self.hits += 1
+            self._entries.move_to_end(path)
+            return entry
+
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            # Another request may have reloaded the file while we waited
+            entry = self._entries.get(path)
+            if entry is not None and self._is_fresh(entry):
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+            stat = os.stat(path)
+            async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+                content = await f.read()
+            entry = CachedStory(path, stat.st_mtime_ns, stat.st_size, content, self.excerpt_lengths)
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._locks.pop(evicted, None)
+            return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, filepath: Optional[str] = None):
+        """Drop one entry (or all entries) so the next access reloads from disk"""
+        if filepath is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(os.path.realpath(filepath), None)
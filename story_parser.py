@@ -0,0 +1,251 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Header names the model may use, mapped to StoryResponse fields
+FIELD_ALIASES = {
+    "introduction": "introduction",
+    "text": "text",
+    "story": "text",
+    "mood": "mood",
+    "choices": "choices",
+    "cultural_info": "cultural_info",
+    "cultural info": "cultural_info",
+    "similarity": "story_similarity",
+    "story_similarity": "story_similarity",
+}
+
+# Free-text fields forwarded to the client as they are generated
+STREAMED_FIELDS = ("introduction", "text")
+
+MOOD_OPTIONS = ("neutral", "tense", "happy")
+
+# Gemini responseSchema (OpenAPI subset) mirroring StoryResponse
+STORY_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "introduction": {"type": "STRING"},
+        "text": {"type": "STRING"},
+        "mood": {"type": "STRING", "enum": list(MOOD_OPTIONS)},
+        "choices": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "cultural_info": {"type": "STRING"},
+        "story_similarity": {"type": "NUMBER"},
+    },
+    "required": ["text", "mood"],
+}
+
+# `Field:` headers, tolerating markdown bold such as `**Text:**`
+_HEADER_RE = re.compile(
+    r"^\s*\**\s*(" + "|".join(re.escape(alias) for alias in sorted(FIELD_ALIASES, key=len, reverse=True)) + r")\s*\**\s*:\s*\**\s*",
+    re.IGNORECASE,
+)
+_CHOICE_MARKER_RE = re.compile(r"^(?:[-•*]|\d+[.)])\s*")
+_CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_SCORE_RE = re.compile(r"(\d+\.?\d*)\s*(%|/\s*(\d+\.?\d*))?")
+_MAX_HEADER_LENGTH = max(len(alias) for alias in FIELD_ALIASES)
+
+
+def match_header(line: str) -> Optional[Tuple[str, int]]:
+    """Return (field, value offset) if the line starts with a known `Field:` header"""
+    match = _HEADER_RE.match(line)
+    if match is None:
+        return None
+    return FIELD_ALIASES[match.group(1).lower()], match.end()
+
+
+def strip_choice_marker(line: str) -> str:
+    """Remove a leading bullet or list number from a choice line"""
+    return _CHOICE_MARKER_RE.sub("", line, count=1).strip()
+
+
+def parse_similarity(text: str) -> float:
+    """Parse a similarity rating like "0.75", "75%" or "7.5/10" into the 0-1 range"""
+    match = _SCORE_RE.search(text)
+    if match is None:
+        return 0.5
+    score = float(match.group(1))
+    if match.group(3) and float(match.group(3)) > 0:  # "7.5/10"
+        score = score / float(match.group(3))
+    elif match.group(2) or score > 10:  # "75%" or a bare percentage
+        score = score / 100
+    elif score > 1:  # Bare 0-10 scale
+        score = score / 10
+    return min(max(score, 0), 1)
+
+
+def field_value(field: str, values: List[str]) -> Any:
+    """Combine the collected lines of a field into its StoryResponse value"""
+    if field == "choices":
+        if len(values) == 1 and ";" in values[0]:
+            values = [choice.strip() for choice in values[0].split(";")]
+        return [choice for choice in values if choice]
+    if field == "story_similarity":
+        return parse_similarity(" ".join(values))
+    return "\n".join(values).strip()
+
+
+def parse_story_text(text: str) -> Dict[str, Any]:
+    """Single-pass parser for the `Field: value` story format"""
+    result: Dict[str, Any] = {}
+    field: Optional[str] = None
+    values: List[str] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        header = match_header(line)
+        if header is not None:
+            if field is not None:
+                result[field] = field_value(field, values)
+            field = header[0]
+            value = line[header[1]:].strip()
+            values = [value] if value else []
+        elif field == "choices":
+            values.append(strip_choice_marker(line))
+        elif field is not None:
+            values.append(line)
+    if field is not None:
+        result[field] = field_value(field, values)
+    return result
+
+
+def validate_story_json(data: Any) -> Dict[str, Any]:
+    """Validate a schema-constrained JSON story node in one pass (raises ValueError)"""
+    if not isinstance(data, dict):
+        raise ValueError("Story JSON must be an object")
+    result: Dict[str, Any] = {}
+    for field in ("introduction", "text", "mood", "cultural_info"):
+        value = data.get(field)
+        if isinstance(value, str) and value.strip():
+            result[field] = value.strip()
+    if "text" not in result:
+        raise ValueError("Story JSON has no text")
+    choices = data.get("choices")
+    if isinstance(choices, list):
+        result["choices"] = [str(choice).strip() for choice in choices if str(choice).strip()]
+    similarity = data.get("story_similarity", data.get("similarity"))
+    if isinstance(similarity, (int, float)) and not isinstance(similarity, bool):
+        result["story_similarity"] = parse_similarity(str(similarity))
+    elif isinstance(similarity, str):
+        result["story_similarity"] = parse_similarity(similarity)
+    return result
+
+
+def parse_story_response(text: str) -> Dict[str, Any]:
+    """Parse a model response: JSON (optionally fenced) first, then the text format"""
+    stripped = text.strip()
+    if stripped.startswith("{") or stripped.startswith("```"):
+        try:
+            return validate_story_json(json.loads(_CODE_FENCE_RE.sub("", stripped)))
+        except ValueError:
+            pass
+    return parse_story_text(text)
+
+
+class IncrementalStoryParser:
+    """Parse the `Field: value` story format from a stream of text chunks.
+
+    `feed()` returns events as soon as they can be decided: `(field, delta)`
+    for the free-text fields in STREAMED_FIELDS, and `(field, value)` for
+    mood, choices, cultural_info and story_similarity once that field is
+    complete. JSON responses (schema-constrained output) are left to the caller.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.field: Optional[str] = None
+        self.values: List[str] = []
+        self.is_json: Optional[bool] = None
+        # State of the (possibly incomplete) line at the head of the buffer
+        self._line_kind: Optional[str] = None
+        self._value_start = 0
+        self._emitted = 0
+        self._field_has_text = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.buffer += chunk
+        if self.is_json is None:
+            stripped = self.buffer.lstrip()
+            if not stripped:
+                return []
+            self.is_json = stripped.startswith(("{", "```"))
+        if self.is_json:
+            return []
+
+        events: List[Tuple[str, Any]] = []
+        while "\n" in self.buffer:
+            line, self.buffer = self.buffer.split("\n", 1)
+            events.extend(self._consume(line, complete=True))
+        if self.buffer:
+            events.extend(self._consume(self.buffer, complete=False))
+        return events
+
+    def finish(self) -> List[Tuple[str, Any]]:
+        """Flush the last line and close the final field"""
+        if self.is_json:
+            return []
+        events: List[Tuple[str, Any]] = []
+        if self.buffer:
+            events.extend(self._consume(self.buffer, complete=True))
+            self.buffer = ""
+        events.extend(self._close_field())
+        return events
+
+    def _could_be_header(self, text: str) -> bool:
+        lowered = text.lstrip("* ").lower()
+        return len(lowered) <= _MAX_HEADER_LENGTH and any(alias.startswith(lowered) for alias in FIELD_ALIASES)
+
+    def _consume(self, line: str, complete: bool) -> List[Tuple[str, Any]]:
+        events: List[Tuple[str, Any]] = []
+        if self._line_kind is None:
+            stripped = line.strip()
+            header = match_header(line)
+            if header is not None and not complete and not line[header[1]:].strip("* "):
+                # Header seen but its value (or closing markdown) has not arrived yet
+                return events
+            if header is not None:
+                events.extend(self._close_field())
+                self.field = header[0]
+                self._line_kind = "header"
+                self._value_start = header[1]
+            elif not complete and (not stripped or (":" not in stripped and self._could_be_header(stripped))):
+                # Not enough of the line yet to tell a header from body text
+                return events
+            else:
+                self._line_kind = "body"
+                self._value_start = 0
+
+        value = line[self._value_start:]
+        if self.field in STREAMED_FIELDS:
+            if self._emitted == 0:
+                lead = len(value) - len(value.lstrip())
+                self._value_start += lead
+                value = value[lead:]
+            if complete:
+                value = value.rstrip()
+            delta = value[self._emitted:]
+            if delta:
+                if self._emitted == 0 and self._field_has_text:
+                    delta = "\n" + delta
+                events.append((self.field, delta))
+                self._emitted = len(value)
+                self._field_has_text = True
+
+        if complete:
+            value = line[self._value_start:].strip()
+            if self.field == "choices" and self._line_kind == "body":
+                value = strip_choice_marker(value)
+            if value and self.field is not None:
+                self.values.append(value)
+            self._line_kind = None
+            self._value_start = 0
+            self._emitted = 0
+        return events
+
+    def _close_field(self) -> List[Tuple[str, Any]]:
+        field, values = self.field, self.values
+        self.field, self.values = None, []
+        self._field_has_text = False
+        if field is None or field in STREAMED_FIELDS:
+            return []
+        return [(field, field_value(field, values))]
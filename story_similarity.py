@@ -0,0 +1,182 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from passage_index import chunk_text, normalize_text
+
+SIMILARITY_VERSION = 2
+
+# Word-prefix character n-grams: suffix-tolerant for Azerbaijani and, after
+# folding, shared by names across languages ("Chanlibel" / "Çənlibel").
+# Three-letter words ("Ali", "xan") are kept whole; shorter prefixes of longer
+# words mostly match by coincidence.
+PREFIX_LENGTHS = (4, 5, 6)
+SHORT_WORD_LENGTH = 3
+SEGMENTS = 8
+# Cosine to its closest segment at which a step counts as 63% grounded. Calibrated on
+# played-length paths (4-6 sentence scenes, see test_story_similarity.py) of koroghlu:
+# a path retelling the epic scores about 0.82, one reusing its names in another plot 0.41
+REFERENCE = 0.025
+# Every step is weighed as if it had this many more n-grams the story does not use,
+# so a name or two on their own do not read as a faithful scene
+PRIOR_GRAMS = 16
+# Share of the score given to visiting the story's segments in their original order
+ORDER_WEIGHT = 0.2
+# Steps at least this grounded are located in the story for the order component
+LOCATE_THRESHOLD = 0.5
+
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+Vector = Dict[str, float]
+
+
+def prefix_grams(text: str) -> Counter:
+    """Counts of the 4-6 character prefixes of the words of normalized text (plus three-letter words)"""
+    grams: Counter = Counter()
+    for word in _WORD_RE.findall(normalize_text(text)):
+        if len(word) == SHORT_WORD_LENGTH:
+            grams[word] += 1
+        for length in PREFIX_LENGTHS:
+            if len(word) >= length:
+                grams[word[:length]] += 1
+    return grams
+
+
+def _normalize(vector: Vector) -> Vector:
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {gram: weight / norm for gram, weight in vector.items()} if norm else {}
+
+
+def _dot(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(gram, 0.0) for gram, weight in a.items())
+
+
+def _centroid(vectors: List[Vector]) -> Vector:
+    total: Counter = Counter()
+    for vector in vectors:
+        total.update(vector)
+    return _normalize(dict(total))
+
+
+class StorySimilarity:
+    """TF-IDF prefix n-gram model of one story file, scoring how closely a played path follows it.
+
+    Passages are vectorized once; the model keeps the idf table, the story
+    centroid and one centroid per contiguous segment. Each step is grounded
+    by its cosine to the closest segment, mapped smoothly onto 0-1 against
+    REFERENCE; n-grams the story does not use count in the step's norm, so
+    text about something else dilutes it. A path's score is its mean
+    grounding discounted by up to ORDER_WEIGHT when its grounded steps visit
+    the segments out of story order. Scores are deterministic.
+    """
+
+    def __init__(self, idf: Dict[str, float], centroid: Vector, segments: List[Vector],
+                 source_mtime_ns: int = 0, source_size: int = 0, chunk_chars: int = 0):
+        self.idf = idf
+        self.centroid = centroid
+        self.segments = segments
+        # Weight of n-grams the story never uses: as rare as its rarest ones
+        self.unknown_idf = max(idf.values(), default=1.0)
+        self.source_mtime_ns = source_mtime_ns
+        self.source_size = source_size
+        self.chunk_chars = chunk_chars
+
+    @classmethod
+    def build(cls, text: str, chunk_chars: int = 800, segments: int = SEGMENTS,
+              source_mtime_ns: int = 0, source_size: int = 0) -> "StorySimilarity":
+        counts = [prefix_grams(passage) for passage in chunk_text(text, chunk_chars)]
+        document_frequency: Counter = Counter()
+        for grams in counts:
+            document_frequency.update(grams.keys())
+        total = len(counts)
+        idf = {gram: math.log((1 + total) / (1 + df)) + 1 for gram, df in document_frequency.items()}
+
+        model = cls(idf, {}, [], source_mtime_ns, source_size, chunk_chars)
+        vectors = [model.weigh(grams) for grams in counts]
+        model.centroid = _centroid(vectors)
+        count = min(segments, len(vectors))
+        model.segments = [
+            _centroid(vectors[i * len(vectors) // count:(i + 1) * len(vectors) // count]) for i in range(count)
+        ]
+        return model
+
+    def weigh(self, grams: Counter) -> Vector:
+        """Unit tf-idf vector over the story's n-grams (others carry no signal about this story)"""
+        return _normalize({
+            gram: (1 + math.log(count)) * self.idf[gram] for gram, count in grams.items() if gram in self.idf
+        })
+
+    def vectorize(self, text: str) -> Vector:
+        """Tf-idf vector of a step over the story's n-grams, scaled by the step's full norm (see PRIOR_GRAMS)"""
+        weights = {gram: (1 + math.log(count)) * self.idf.get(gram, self.unknown_idf)
+                   for gram, count in prefix_grams(text).items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())
+                         + PRIOR_GRAMS * self.unknown_idf * self.unknown_idf)
+        return {gram: weight / norm for gram, weight in weights.items() if gram in self.idf}
+
+    def score(self, steps: List[str]) -> Optional[float]:
+        """Similarity (0-1) of a path given as the text of its steps; None for an empty path"""
+        steps = [step for step in steps if step.strip()]
+        if not steps:
+            return None
+        # Cosine of each step to each segment; a step is as grounded as its closest segment makes it
+        cosines = [[_dot(self.vectorize(step), segment) for segment in self.segments] for step in steps]
+        grounding = [1 - math.exp(-max(row, default=0.0) / REFERENCE) for row in cosines]
+
+        # Order: where in the story each well grounded step lands, and whether it moves forward
+        positions = [
+            max(range(len(row)), key=row.__getitem__)
+            for row, grounded in zip(cosines, grounding) if grounded >= LOCATE_THRESHOLD and row
+        ]
+        pairs = list(zip(positions, positions[1:]))
+        order = sum(1 for a, b in pairs if b >= a) / len(pairs) if pairs else 1.0
+
+        mean_grounding = sum(grounding) / len(grounding)
+        return round(mean_grounding * (1 - ORDER_WEIGHT + ORDER_WEIGHT * order), 3)
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": SIMILARITY_VERSION,
+            "source_mtime_ns": self.source_mtime_ns,
+            "source_size": self.source_size,
+            "chunk_chars": self.chunk_chars,
+            "idf": self.idf,
+            "centroid": self.centroid,
+            "segments": self.segments,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "StorySimilarity":
+        return cls(data["idf"], data["centroid"], data["segments"],
+                   data["source_mtime_ns"], data["source_size"], data["chunk_chars"])
+
+
+def load_or_build_model(story_path: str, model_dir: str, chunk_chars: int = 800) -> StorySimilarity:
+    """Load the persisted similarity model for `story_path`, rebuilding it if the story or the chunk size changed"""
+    stat = os.stat(story_path)
+    model_path = os.path.join(model_dir, os.path.basename(story_path) + ".similarity.json")
+    try:
+        with open(model_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if (data.get("version") == SIMILARITY_VERSION
+                and data.get("source_mtime_ns") == stat.st_mtime_ns
+                and data.get("source_size") == stat.st_size
+                and data.get("chunk_chars") == chunk_chars):
+            return StorySimilarity.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with open(story_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    model = StorySimilarity.build(text, chunk_chars, source_mtime_ns=stat.st_mtime_ns, source_size=stat.st_size)
+    os.makedirs(model_dir, exist_ok=True)
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(model.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, model_path)
+    return model
@@ -57,6 +57,42 @@ def test_start_story(story_name="koroghlu", language="english", max_choices=10):
         print(f"❌ Error: {e}")
         return None
 
+def test_start_story_stream(story_name="koroghlu", max_choices=10):
+    """Test starting a story through the Server-Sent Events endpoint"""
+    print(f"\n📡 Testing streaming start story ({story_name}, {max_choices} choices)...")
+    try:
+        payload = {
+            "story_name": story_name,
+            "max_choices": max_choices
+        }
+        response = requests.post(f"{BASE_URL}/stories/start/stream", json=payload, stream=True)
+        print(f"Status Code: {response.status_code}")
+        
+        if response.status_code != 200:
+            print("❌ Error starting streamed story:")
+            pprint(response.json())
+            return None
+        
+        events = []
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[6:])))
+        
+        print(f"✅ Events received: {len(events)}")
+        print(f"✅ Event types: {sorted(set(name for name, _ in events))}")
+        done = [data for name, data in events if name == "done"]
+        if done:
+            pprint(done[0])
+            return done[0].get("session_id")
+        print("❌ Stream ended without a done event")
+        return None
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return None
+
 def test_continue_story(session_id, story_name="koroghlu", choice="Go along the river"):
     """Test continuing a story"""
     print(f"\n📖 Testing continue story (choice: {choice})...")
@@ -160,6 +196,11 @@ def main():
     else:
         print("❌ Failed to start story. Cannot continue with remaining tests.")
     
+    # Test streaming variant
+    stream_session = test_start_story_stream("koroghlu", 10)
+    if stream_session:
+        print(f"✅ Streamed story started: {stream_session}")
+    
     # Test language parameter
     print(f"\n🌍 Testing Azerbaijani Language:")
     az_session = test_start_story("dedegorgud", "azerbaijani", 3)
@@ -0,0 +1,72 @@
+"""Offline checks of the local ending-similarity scorer against the bundled stories"""
+import os
+
+import pytest
+
+from story_similarity import StorySimilarity, load_or_build_model
+
+STORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stories", "koroghlu.txt")
+
+# Played-length paths (4-6 sentence scenes plus the choice taken), as the continue prompt asks for
+FAITHFUL_PATH = [
+    "For many years old Ali has grazed Hasan Khan's herd of horses, his beard turning white in the khan's service. One dawn he drives the herd down to the shore of the sea and sits resting against a rock. Suddenly two stallions rise out of the water and gallop among the mares. Ali watches in wonder, knowing that sea horses leave foals of rare strength. He marks the mares well before the stallions vanish back beneath the waves.\nRemember which mares the sea stallions chose",
+    "When the foals are born, Ali picks two thin, ugly colts and leads them to Hasan Khan as the finest of the herd. The khan laughs at the scrawny animals and thinks the old herder is mocking him. In his rage Hasan Khan orders Ali's eyes to be put out before the whole court. Ali's son Rovshan stands beside his blinded father, swearing to avenge the cruelty. Father and son leave the palace with nothing but the two colts.\nLead your blind father away from Hasan Khan's palace",
+    "Rovshan takes a new name, Koroghlu, the son of the blind man, so that no one forgets the khan's crime. Following his father's advice, he raises the grey colt in a dark stable for forty days. Ali tells him to bathe the horse in the spring where the stars are reflected. The colt grows into Qirat, a horse that runs like the wind. Koroghlu practises with sword and bow until he is ready.\nBathe Qirat in the spring under the stars",
+    "Koroghlu rides Qirat into the mountains and chooses the fortress of Chanlibel as his home. Brave young men, the delis, hear of his courage and gather around him. Together they defend the poor and take from cruel khans and merchants. Koroghlu sings to his saz about the freedom of the mountains. Soon songs about the outlaw of Chanlibel spread across the land.\nWelcome the delis to Chanlibel",
+    "One day Belli Ahmad returns from Istanbul with a letter from Nigar khanum, the daughter of the sultan. She writes that if Koroghlu is truly a hero, he must come to Istanbul and carry her away. She sends her armband as proof of her word. Koroghlu reads the letter twice and feels his heart burn. He saddles Qirat for the long road to Istanbul.\nRide to Istanbul to carry away Nigar khanum",
+    "A merchant arrives at Chanlibel and tells Koroghlu that Eyvaz has been captured by his enemies. Koroghlu turns to his delis and sings that Eyvaz is held in chains. The delis quickly arm themselves and saddle their horses. Qirat stamps the ground, eager for the road. Koroghlu rides out at the head of his men to free Eyvaz.\nLead the delis to rescue Eyvaz",
+    "Disguised as a watchman, Koroghlu is seized by Bolu bey, who does not recognise him. At last Koroghlu admits who he is and asks why he is being taken away. Bolu bey explains that Jamal pasha of Erzurum has promised his daughter Dunya khanum to whoever captures Koroghlu. Koroghlu laughs and warns him that no bey can hold him. He waits for the right moment to break free.\nOutwit Bolu bey on the road to Jamal pasha",
+]
+DIVERGENT_PATH = [
+    "Koroghlu wakes in a quiet harbour town far from any mountains. He trades his sword for a ledger and rents a small bakery near the docks. Every morning he kneads dough while fishermen line up for warm bread. The smell of cinnamon drifts through the narrow streets. He wonders whether a quiet life could ever satisfy him.\nOpen the bakery early for the fishermen",
+    "A ship's captain offers Koroghlu a place on a whaling voyage across the cold northern ocean. The crew sings as they haul ropes and mend sails in the freezing wind. Koroghlu learns to read the clouds and the colour of the water. Icebergs drift past like white palaces. After many weeks they return with empty holds but full stories.\nSign on for another voyage north",
+    "A travelling scholar teaches Koroghlu astronomy in a lonely observatory on a hill. They spend their nights mapping comets and measuring the distance to the moon. Koroghlu fills notebook after notebook with careful drawings of the sky. The scholar says he has a gift for patient observation. One night they discover a comet that no one has named.\nName the comet after the scholar",
+    "Koroghlu sells Qirat to a travelling circus and buys a bicycle with the money. He rides through the vineyards of a peaceful valley, stopping to help farmers with the harvest. The farmers pay him with grapes, cheese and stories. He sleeps under olive trees and wakes to the sound of goats. The valley feels like a place where nothing bad could happen.\nStay for the grape harvest festival",
+    "Koroghlu becomes a famous cook, and a king of a faraway island hires him for a royal feast. He prepares saffron rice, roasted fish and honey cakes for hundreds of guests. The king praises every dish and asks him to stay as head of the palace kitchens. Koroghlu teaches young apprentices his recipes. The island's markets begin selling spices in his name.\nAccept the post of royal cook",
+    "In the end Koroghlu retires to a lighthouse on a rocky cape. He keeps the lamp burning through storms and writes poems about the sea and the gulls. Ships passing at night flash their lights to greet him. Children from the village visit to hear his stories. He grows old peacefully, watching the waves.\nWrite a final poem about the sea",
+]
+UNRELATED_PATH = [
+    "The quarterly budget review showed that cloud infrastructure costs rose by twelve percent. The finance team asked every department to justify its largest expenses. Engineers proposed moving batch workloads to cheaper spot instances. Managers scheduled a follow-up meeting for next week. Everyone agreed that monitoring spending should be automated.\nAutomate the cost reports",
+    "Engineers migrated the database cluster to a new region over the weekend. They rebuilt the search indexes overnight and verified the replication lag. A few queries were slower than expected, so they tuned the cache settings. By Monday morning the dashboards showed normal latency. The incident channel stayed quiet.\nReview the slow queries",
+    "The marketing team launched a new campaign for the spring collection of running shoes. Short videos showed athletes training in city parks at sunrise. Early results suggested strong engagement among younger customers. The designers started sketching colours for the autumn line. The campaign budget was extended for another month.\nExtend the campaign",
+]
+
+
+@pytest.fixture(scope="module")
+def model():
+    with open(STORY_PATH, 'r', encoding='utf-8') as f:
+        return StorySimilarity.build(f.read(), 800)
+
+
+def test_faithful_path_outscores_divergent_and_unrelated(model):
+    faithful, divergent, unrelated = (model.score(path) for path in (FAITHFUL_PATH, DIVERGENT_PATH, UNRELATED_PATH))
+    assert faithful > divergent > unrelated
+    # The bands app.html reports: closely followed / moderately different / unique adventure
+    assert faithful >= 0.8
+    assert divergent < 0.5
+    assert unrelated < 0.2
+
+
+def test_names_alone_do_not_score_as_faithful(model):
+    assert model.score(["Koroghlu and Qirat"]) < 0.8
+
+
+def test_out_of_order_path_is_discounted(model):
+    assert model.score(FAITHFUL_PATH[::-1]) < model.score(FAITHFUL_PATH)
+
+
+def test_mixed_path_scores_between(model):
+    mixed = FAITHFUL_PATH[:3] + DIVERGENT_PATH[3:]
+    assert model.score(DIVERGENT_PATH) < model.score(mixed) < model.score(FAITHFUL_PATH)
+
+
+def test_empty_path_has_no_score(model):
+    assert model.score([]) is None
+    assert model.score(["  ", ""]) is None
+
+
+def test_persisted_model_scores_the_same(model, tmp_path):
+    built = load_or_build_model(STORY_PATH, str(tmp_path), 800)
+    loaded = load_or_build_model(STORY_PATH, str(tmp_path), 800)
+    assert built.score(FAITHFUL_PATH) == loaded.score(FAITHFUL_PATH) == model.score(FAITHFUL_PATH)
+    assert built.score(DIVERGENT_PATH) == loaded.score(DIVERGENT_PATH)